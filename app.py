@@ -3,20 +3,35 @@
 # Function: User system + Subject upload + AI Q&A chat + Quiz tracking
 # ==============================================================
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-import pymysql, re, os, json, textwrap
+from flask import Flask, render_template, request, redirect, url_for, session, flash, Response, stream_with_context, jsonify, g
+import pymysql, re, os, json, textwrap, logging, time
 from datetime import datetime, date
 from werkzeug.utils import secure_filename
-from text_extraction import extract_text
-from modules.vector_store import add_text_file_to_vector_db, get_vector_store
-from modules.chat_ai import get_ai_response_for_subject
-from langchain_ollama import OllamaLLM
-from datetime import date
+from database.connection import get_db_connection, pool_stats
+from modules.vector_store import count_chunks, embedding_cache_stats
+from modules.corpus import corpus_stats
+from modules.cleanup import purge_file, purge_subject
+from modules.ingestion import enqueue_ingestion, enqueue_batch_ingestion
+from modules.batch_upload import save_batch, unique_upload_path, UploadLimitError, BATCH_MAX_CONTENT_LENGTH
+from modules.dedup import file_sha256, find_file_by_hash
+from modules.jobs import start_workers, get_jobs, get_jobs_by_id
+from modules.stats import get_subject_stats, record_quiz_attempt
+from modules.chat_ai import get_ai_response_for_subject, stream_ai_response_for_subject
+from modules.practice.quiz import draw_quiz, enqueue_pool_refill
+from modules.global_search import search_all_subjects, GLOBAL_SEARCH_K
+from modules.llm_client import warm_up_models, WARM_UP_ON_START
+from modules.llm_scheduler import scheduler_stats
+from modules.metrics import (
+    configure_logging, register_collector, render_prometheus,
+    start_trace, end_trace, HTTP_SECONDS,
+)
 
 
 # ==============================================================
 # 🔹 FLASK APP CONFIGURATION
 # ==============================================================
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = "studybuddy_secret_key_2025"
 app.config["UPLOAD_FOLDER"] = "static/uploads"
@@ -30,18 +45,45 @@ for folder in [
 ]:
     os.makedirs(folder, exist_ok=True)
 
+_services_started = False
+
+
+def start_background_services():
+    """
+    Logging, model warm-up and the ingestion job workers (modules/jobs.py).
+    Called once per serving process — from gunicorn's post_worker_init hook
+    or `python app.py` — never at import, so extraction processes that
+    re-import this module don't start them too.
+    """
+    global _services_started
+    if _services_started:
+        return
+    _services_started = True
+    configure_logging()
+    if WARM_UP_ON_START:
+        warm_up_models()
+    start_workers()
+
 
 # ==============================================================
-# ⚙️ DATABASE CONNECTION
+# 📈 REQUEST TIMING (see modules/metrics.py)
 # ==============================================================
-def get_db_connection():
-    return pymysql.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="studybuddy_db",
-        cursorclass=pymysql.cursors.DictCursor,
-    )
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    g.trace_token = start_trace()
+
+
+@app.after_request
+def _record_request_time(response):
+    started = g.get("request_started")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method,
+                             status=response.status_code)
+        end_trace(g.trace_token, f"{request.method} {endpoint}", elapsed)
+    return response
 
 
 # ==============================================================
@@ -60,30 +102,25 @@ def register():
         email = request.form["email"]
         password = request.form["password"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username=%s OR email=%s", (username, email))
-        account = cursor.fetchone()
-
-        if account:
-            msg = "Account already exists!"
-        elif not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            msg = "Invalid email address!"
-        elif not re.match(r"[A-Za-z0-9]+", username):
-            msg = "Username must contain only letters and numbers!"
-        else:
-            cursor.execute(
-                "INSERT INTO users (username, email, password) VALUES (%s,%s,%s)",
-                (username, email, password),
-            )
-            conn.commit()
-            flash("✅ Registration successful! Please login.", "success")
-            cursor.close()
-            conn.close()
-            return redirect(url_for("login"))
-
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users WHERE username=%s OR email=%s", (username, email))
+            account = cursor.fetchone()
+
+            if account:
+                msg = "Account already exists!"
+            elif not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+                msg = "Invalid email address!"
+            elif not re.match(r"[A-Za-z0-9]+", username):
+                msg = "Username must contain only letters and numbers!"
+            else:
+                cursor.execute(
+                    "INSERT INTO users (username, email, password) VALUES (%s,%s,%s)",
+                    (username, email, password),
+                )
+                conn.commit()
+                flash("✅ Registration successful! Please login.", "success")
+                return redirect(url_for("login"))
 
     return render_template("register.html", msg=msg)
 
@@ -95,12 +132,10 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username=%s AND password=%s", (username, password))
-        account = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users WHERE username=%s AND password=%s", (username, password))
+            account = cursor.fetchone()
 
         if account:
             session["loggedin"] = True
@@ -122,35 +157,17 @@ def dashboard():
     user_id = session["user_id"]
     username = session["username"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Fetch all subjects
-    cursor.execute("SELECT * FROM subjects WHERE user_id=%s", (user_id,))
-    subjects = cursor.fetchall()
-
-    # Fetch quiz performance for each subject
-    subject_progress = []
-    for subj in subjects:
-        cursor.execute("""
-            SELECT 
-                COALESCE(SUM(score), 0) AS correct,
-                COALESCE(SUM(total - score), 0) AS wrong,
-                COUNT(*) AS attempts
-            FROM quiz_scores WHERE user_id=%s AND subject_id=%s
-        """, (user_id, subj["subject_id"]))
-        stats = cursor.fetchone() or {}
-        total = (stats["correct"] or 0) + (stats["wrong"] or 0)
-        success = round((stats["correct"] / total * 100), 1) if total > 0 else 0
-        subject_progress.append({
-            "id": subj["subject_id"],
-            "name": subj["subject_name"],
-            "correct": stats["correct"] or 0,
-            "wrong": stats["wrong"] or 0,
-            "success": success
-        })
-
-    conn.close()
+    # Quiz performance for every subject (one grouped query)
+    subject_progress = [
+        {
+            "id": st["subject_id"],
+            "name": st["subject_name"],
+            "correct": st["correct"],
+            "wrong": st["wrong"],
+            "success": st["success_rate"],
+        }
+        for st in get_subject_stats(user_id)
+    ]
 
     return render_template(
         "dashboard.html",
@@ -176,11 +193,10 @@ def subjects():
         return redirect(url_for("login"))
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM subjects WHERE user_id=%s", (user_id,))
-    subjects = cursor.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM subjects WHERE user_id=%s", (user_id,))
+        subjects = cursor.fetchall()
     return render_template("subjects.html", subjects=subjects)
 
 
@@ -193,14 +209,13 @@ def add_subject():
     description = request.form.get("description", "")
     user_id = session["user_id"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO subjects (user_id, subject_name, description) VALUES (%s,%s,%s)",
-        (user_id, subject_name, description),
-    )
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO subjects (user_id, subject_name, description) VALUES (%s,%s,%s)",
+            (user_id, subject_name, description),
+        )
+        conn.commit()
 
     flash("Subject added successfully!", "success")
     return redirect(url_for("subjects"))
@@ -210,11 +225,16 @@ def add_subject():
 def delete_subject(id):
     if "loggedin" not in session:
         return redirect(url_for("login"))
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM subjects WHERE subject_id=%s", (id,))
-    conn.commit()
-    conn.close()
+    try:
+        purge_subject(id)
+    except Exception as e:
+        logger.error("❌ ERROR purging subject: %s", e)
+        flash(f"❌ Could not remove the subject's data: {e}", "danger")
+        return redirect(url_for("subjects"))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM subjects WHERE subject_id=%s", (id,))
+        conn.commit()
     flash("Subject deleted successfully!", "danger")
     return redirect(url_for("subjects"))
 
@@ -223,12 +243,10 @@ def delete_subject(id):
 # 📂 SUBJECT DETAIL PAGE
 # ==============================================================
 def get_subject(subject_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
-    subject = cursor.fetchone()
-    conn.close()
-    return subject
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
+        return cursor.fetchone()
 
 
 @app.route("/subjects/<int:subject_id>")
@@ -236,15 +254,53 @@ def subject_detail(subject_id):
     if "loggedin" not in session:
         return redirect(url_for("login"))
     subject = get_subject(subject_id)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM subject_files WHERE subject_id=%s ORDER BY uploaded_at DESC",
-        (subject_id,),
-    )
-    files = cursor.fetchall()
-    conn.close()
-    return render_template("subject_detail.html", subject=subject, files=files, username=session["username"])
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM subject_files WHERE subject_id=%s ORDER BY uploaded_at DESC",
+            (subject_id,),
+        )
+        files = cursor.fetchall()
+
+    # latest ingestion job per file (jobs are newest first)
+    file_jobs = {}
+    for job in get_jobs(subject_id, limit=100):
+        if job["kind"] == "ingest_file":
+            file_jobs.setdefault(job["payload"].get("file_id"), job)
+        elif job["kind"] == "ingest_batch":
+            for f in job["payload"].get("files", []):
+                file_jobs.setdefault(f["file_id"], job)
+    return render_template("subject_detail.html", subject=subject, files=files,
+                           file_jobs=file_jobs, username=session["username"])
+
+
+@app.route("/subjects/<int:subject_id>/jobs")
+def subject_jobs(subject_id):
+    """
+    JSON status of the subject's recent background jobs, or of the jobs
+    listed in ?ids=1,2,3 (however old they are).
+    """
+    if "loggedin" not in session:
+        return jsonify({"error": "Please login first."}), 401
+    ids = request.args.get("ids")
+    if ids:
+        try:
+            jobs = get_jobs_by_id(subject_id, [int(i) for i in ids.split(",") if i.strip()])
+        except ValueError:
+            return jsonify({"error": "ids must be comma-separated job ids"}), 400
+    else:
+        jobs = get_jobs(subject_id)
+    return jsonify([
+        {
+            "id": j["id"],
+            "kind": j["kind"],
+            "file_id": j["payload"].get("file_id"),
+            "status": j["status"],
+            "attempts": j["attempts"],
+            "error": j["error"],
+        }
+        for j in jobs
+    ])
 
 
 @app.route("/subjects/<int:subject_id>/upload", methods=["POST"])
@@ -258,28 +314,113 @@ def subject_upload(subject_id):
         flash("No file selected!", "warning")
         return redirect(url_for("subject_detail", subject_id=subject_id))
 
-    filename = secure_filename(file.filename)
     subject_dir = os.path.join(app.config["UPLOAD_FOLDER"], str(subject_id))
     os.makedirs(subject_dir, exist_ok=True)
-    save_path = os.path.join(subject_dir, filename)
-    file.save(save_path)
-
-    extracted_path = extract_text(save_path)
-    os.makedirs(f"static/uploads/processed_texts/{subject_id}", exist_ok=True)
-    processed_dest = os.path.join(f"static/uploads/processed_texts/{subject_id}", os.path.basename(extracted_path))
-    os.replace(extracted_path, processed_dest)
-    add_text_file_to_vector_db(processed_dest, subject_id)
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO subject_files (subject_id, user_id, filename, filepath, uploaded_at) VALUES (%s,%s,%s,%s,%s)",
-        (subject_id, session["user_id"], filename, save_path, datetime.now()),
-    )
-    conn.commit()
-    conn.close()
-    flash("✅ File uploaded and indexed successfully!", "success")
+    # never overwrite an earlier upload (or its extracted text) with the same name
+    save_path = unique_upload_path(subject_dir, subject_id, secure_filename(file.filename))
+    filename = os.path.basename(save_path)
+    try:
+        file.save(save_path)
+    except Exception:
+        os.remove(save_path)
+        raise
+
+    # same content already uploaded to this subject? nothing to do
+    content_hash = file_sha256(save_path)
+    existing = find_file_by_hash(content_hash, subject_id=subject_id)
+    if existing:
+        if os.path.abspath(existing["filepath"]) != os.path.abspath(save_path):
+            os.remove(save_path)
+        flash(f"ℹ️ This file was already uploaded as {existing['filename']}.", "info")
+        return redirect(url_for("subject_detail", subject_id=subject_id))
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO subject_files (subject_id, user_id, filename, filepath, uploaded_at, content_hash) VALUES (%s,%s,%s,%s,%s,%s)",
+            (subject_id, session["user_id"], filename, save_path, datetime.now(), content_hash),
+        )
+        file_id = cursor.lastrowid
+        conn.commit()
+
+    # extraction + embedding run in the background job workers
+    enqueue_ingestion(file_id, subject_id, save_path, content_hash)
+    flash("✅ File uploaded! Indexing runs in the background.", "success")
+    return redirect(url_for("subject_detail", subject_id=subject_id))
+
+
+@app.route("/subjects/<int:subject_id>/upload/batch", methods=["POST"])
+def subject_upload_batch(subject_id):
+    """
+    Upload many notes at once: multipart "files" fields (zip archives are
+    expanded) or a raw application/zip body. Everything is ingested by one
+    background job. Replies with JSON when the client accepts it.
+    """
+    wants_json = request.accept_mimetypes.best == "application/json"
+    if "loggedin" not in session:
+        if wants_json:
+            return jsonify({"error": "Please login first."}), 401
+        return redirect(url_for("login"))
+
+    # must be set before the body is read; multipart files are spooled to disk by the parser
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+    if request.mimetype in ("application/zip", "application/x-zip-compressed"):
+        uploads = [(request.args.get("filename", "notes.zip"), request.stream)]
+    else:
+        uploads = [(f.filename, f.stream) for f in request.files.getlist("files") if f and f.filename]
+
+    subject_dir = os.path.join(app.config["UPLOAD_FOLDER"], str(subject_id))
+    try:
+        saved, skipped = save_batch(uploads, subject_dir, subject_id)
+    except UploadLimitError as e:
+        if wants_json:
+            return jsonify({"error": str(e)}), 413
+        flash(f"❌ {e}", "danger")
+        return redirect(url_for("subject_detail", subject_id=subject_id))
+
+    queued, duplicates, seen = [], [], {}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for filename, save_path in saved:
+            # same content already in this subject (or earlier in this batch)? skip it
+            content_hash = file_sha256(save_path)
+            existing = seen.get(content_hash) or find_file_by_hash(content_hash, subject_id=subject_id)
+            if existing:
+                os.remove(save_path)
+                duplicates.append({"filename": filename, "existing": existing["filename"]})
+                continue
+            stored_name = os.path.basename(save_path)
+            cursor.execute(
+                "INSERT INTO subject_files (subject_id, user_id, filename, filepath, uploaded_at, content_hash) VALUES (%s,%s,%s,%s,%s,%s)",
+                (subject_id, session["user_id"], stored_name, save_path, datetime.now(), content_hash),
+            )
+            seen[content_hash] = {"filename": stored_name}
+            queued.append({"file_id": cursor.lastrowid, "filename": stored_name,
+                           "save_path": save_path, "content_hash": content_hash})
+        conn.commit()
+
+    job_id = None
+    if queued:
+        job_id = enqueue_batch_ingestion(subject_id, [
+            {k: f[k] for k in ("file_id", "save_path", "content_hash")} for f in queued
+        ])
+
+    if wants_json:
+        return jsonify({
+            "job_id": job_id,
+            "queued": [{"file_id": f["file_id"], "filename": f["filename"]} for f in queued],
+            "duplicates": duplicates,
+            "skipped": [{"filename": name, "reason": reason} for name, reason in skipped],
+        }), 202
+    if queued:
+        flash(f"✅ {len(queued)} files uploaded! Indexing runs in the background.", "success")
+    else:
+        flash("No new supported files in the upload.", "warning")
+    if duplicates or skipped:
+        flash(f"ℹ️ {len(duplicates)} duplicates and {len(skipped)} unsupported files were skipped.", "info")
     return redirect(url_for("subject_detail", subject_id=subject_id))
+
+
 # ==============================================================
 # ✏️ EDIT SUBJECT
 # ==============================================================
@@ -291,14 +432,13 @@ def edit_subject(subject_id):
     new_name = request.form.get("subject_name")
     new_desc = request.form.get("description")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE subjects SET subject_name=%s, description=%s WHERE subject_id=%s",
-        (new_name, new_desc, subject_id),
-    )
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE subjects SET subject_name=%s, description=%s WHERE subject_id=%s",
+            (new_name, new_desc, subject_id),
+        )
+        conn.commit()
 
     flash("✏️ Subject updated successfully!", "info")
     return redirect(url_for("subjects"))
@@ -311,26 +451,30 @@ def delete_file(file_id):
     if "loggedin" not in session:
         return redirect(url_for("login"))
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT filepath, subject_id FROM subject_files WHERE file_id=%s", (file_id,))
-    file = cursor.fetchone()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT file_id, filepath, subject_id FROM subject_files WHERE file_id=%s", (file_id,))
+        file = cursor.fetchone()
 
-    if file:
-        file_path = file["filepath"]
-        subject_id = file["subject_id"]
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        cursor.execute("DELETE FROM subject_files WHERE file_id=%s", (file_id,))
-        conn.commit()
-        conn.close()
-        flash("🗑 File removed successfully!", "info")
-        return redirect(url_for("subject_detail", subject_id=subject_id))
-    else:
-        conn.close()
+    if not file:
         flash("⚠️ File not found!", "warning")
         return redirect(url_for("subjects"))
 
+    subject_id = file["subject_id"]
+    try:
+        # vectors, extracted text, manifest entry and quiz questions go first
+        purge_file(file)
+    except Exception as e:
+        logger.error("❌ ERROR purging file: %s", e)
+        flash(f"❌ Could not remove the file's indexed data: {e}", "danger")
+        return redirect(url_for("subject_detail", subject_id=subject_id))
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM subject_files WHERE file_id=%s", (file_id,))
+        conn.commit()
+    flash("🗑 File removed successfully!", "info")
+    return redirect(url_for("subject_detail", subject_id=subject_id))
 
 
 # ==============================================================
@@ -348,6 +492,27 @@ def subject_chat(subject_id):
     return render_template("chat_subject.html", subject=subject, ai_reply=ai_reply, user_msg=user_msg)
 
 
+@app.route("/subjects/<int:subject_id>/chat/stream", methods=["POST"])
+def subject_chat_stream(subject_id):
+    """Server-Sent Events version of subject_chat: one event per model token."""
+    if "loggedin" not in session:
+        return Response("Please login first.", status=401)
+    user_msg = (request.form.get("question") or "").strip()
+    if not user_msg:
+        return Response("Please enter a question.", status=400)
+
+    def events():
+        for token in stream_ai_response_for_subject(user_msg, subject_id):
+            yield f"data: {json.dumps(token)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ==============================================================
 # 🧠 QUIZ GENERATION + NORMALIZATION
 # ==============================================================
@@ -357,103 +522,29 @@ def generate_quiz_ai(subject_id):
         return redirect(url_for("login"))
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
-    subject = cursor.fetchone()
-
-    text_dir = f"static/uploads/processed_texts/{subject_id}"
-    combined_text = ""
-    if os.path.exists(text_dir):
-        for fname in os.listdir(text_dir):
-            if fname.endswith(".txt"):
-                with open(os.path.join(text_dir, fname), "r", encoding="utf-8") as f:
-                    combined_text += f.read() + "\n"
-
-    if not combined_text.strip():
-        flash("⚠️ No processed notes found. Upload notes first.", "warning")
-        return redirect(url_for("subject_detail", subject_id=subject_id))
+    subject = get_subject(subject_id)
 
-    try:
-        llm = OllamaLLM(model="phi3:mini")
-        prompt =  f"""
-        You are a quiz generator.
-        Create exactly 5 multiple-choice questions based on the text below.
-        Output only a valid JSON array like this:
-        [
-          {{"question":"...","options":["A","B","C","D"],"answer":"A"}}
-        ]
-
-        Text:
-        {combined_text[:4000]}
-        """
-
-        ai_output = str(llm.invoke(prompt))
-        print("✅ Raw AI Output (preview):", ai_output[:400])
-
-        start = ai_output.find("[")
-        end = ai_output.rfind("]")
-        json_str = ai_output[start:end+1]
-
-        questions_list = []
-        try:
-            questions_list = json.loads(json_str)
-        except Exception as e:
-            print("⚠️ JSON parse failed:", e)
-            # fallback: try to parse plain text into basic questions
-            lines = [l.strip() for l in ai_output.splitlines() if l.strip()]
-            temp = []
-            q, opts = "", []
-            for line in lines:
-                if re.match(r'^\d+\.', line):  # e.g. "1. What is Java?"
-                    if q and opts:
-                        temp.append({"question": q, "options": opts, "answer": opts[0]})
-                    q = re.sub(r'^\d+\.\s*', '', line)
-                    opts = []
-                elif re.match(r'^[A-D][\).\s-]', line):  # e.g. "A) Option"
-                    opts.append(re.sub(r'^[A-D][\).\s-]+\s*', '', line))
-            if q and opts:
-                temp.append({"question": q, "options": opts, "answer": opts[0]})
-            questions_list = temp
-
-
-        normalized = []
-        for q in questions_list:
-            opts_raw = q.get("options", [])
-            opts = []
-            for o in opts_raw:
-                if isinstance(o, list) and o:
-                    opts.append(str(o[0]))
-                elif isinstance(o, dict):
-                    opts.append(o.get("text") or o.get("option") or str(o))
-                else:
-                    opts.append(str(o))
-            opts = [o.strip() for o in opts if o.strip()][:4]
-            ans = q.get("answer", "")
-            if len(ans) == 1 and ans.upper() in ["A","B","C","D"]:
-                idx = ord(ans.upper()) - ord("A")
-                if idx < len(opts):
-                    ans = opts[idx]
-            normalized.append({
-                "question": q.get("question", "Untitled Question").strip(),
-                "options": opts or ["A","B","C","D"],
-                "answer": ans or (opts[0] if opts else "A"),
-            })
+    # questions are pre-generated by the background workers (modules/practice/quiz.py)
+    questions = draw_quiz(subject_id)
+    if not questions:
+        if not corpus_stats(subject_id)["chunks"] and not count_chunks(subject_id):
+            flash("⚠️ No processed notes found. Upload notes first.", "warning")
+        else:
+            enqueue_pool_refill(subject_id)
+            flash("⏳ Quiz questions are being prepared from your notes. Try again in a minute.", "info")
+        return redirect(url_for("subject_detail", subject_id=subject_id))
 
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO quizzes (subject_id, user_id, title, questions_json, difficulty)
             VALUES (%s,%s,%s,%s,%s)
         """, (subject_id, user_id, f"AI Quiz for {subject['subject_name']}",
-              json.dumps(normalized, ensure_ascii=False), "Medium"))
+              json.dumps(questions, ensure_ascii=False), "Medium"))
         conn.commit()
-        flash("✅ AI quiz generated successfully!", "success")
-        print("💾 Quiz saved successfully!")
-        return redirect(url_for("generate_quiz", subject_id=subject_id))
-
-    except Exception as e:
-        print("❌ ERROR in AI generation:", e)
-        flash(f"❌ Quiz generation failed: {e}", "danger")
-        return redirect(url_for("subject_detail", subject_id=subject_id))
+    flash("✅ AI quiz generated successfully!", "success")
+    logger.info("💾 Quiz saved successfully!")
+    return redirect(url_for("generate_quiz", subject_id=subject_id))
 
 
 # ==============================================================
@@ -465,12 +556,8 @@ def generate_quiz(subject_id):
     if "loggedin" not in session:
         return redirect(url_for("login"))
 
-    conn = get_db_connection()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-
     # ✅ Load subject details
-    cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
-    subject = cursor.fetchone()
+    subject = get_subject(subject_id)
 
     # 🧩 --- QUIZ SUBMISSION HANDLER ---
     if request.method == "POST":
@@ -478,67 +565,60 @@ def generate_quiz(subject_id):
         total = int(request.form.get("total", 0))
         user_id = session["user_id"]
 
-        cursor.execute("SELECT * FROM quizzes WHERE id=%s", (quiz_id,))
-        quiz = cursor.fetchone()
-
-        if not quiz:
-            flash("Quiz not found!", "danger")
-            return redirect(url_for("subject_detail", subject_id=subject_id))
-
-        # Parse quiz questions
-        questions = json.loads(quiz["questions_json"])
-        score = 0
-        results = []
-
-        # ✅ Calculate score
-        for i, q in enumerate(questions, start=1):
-            selected = request.form.get(f"q{i}")
-            correct = q.get("answer", "").strip().lower()
-            is_correct = selected and selected.strip().lower() == correct
-            if is_correct:
-                score += 1
-            results.append({
-                "question": q.get("question"),
-                "selected": selected,
-                "correct": correct,
-                "is_correct": is_correct
-            })
-
-        accuracy = round(score / total, 2) if total else 0
-
-        try:
-            # 🔹 1. Save quiz results
-            cursor.execute("""
-                INSERT INTO quiz_scores (quiz_id, user_id, subject_id, score, total, accuracy)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (quiz_id, user_id, subject_id, score, total, accuracy))
-            conn.commit()
-
-            # 🔹 2. Recalculate average accuracy
-            cursor.execute("""
-                SELECT AVG(accuracy) AS avg_acc
-                FROM quiz_scores
-                WHERE user_id=%s AND subject_id=%s
-            """, (user_id, subject_id))
-            avg_acc = cursor.fetchone()["avg_acc"] or 0
-
-            # 🔹 3. Upsert learning curve data safely
-            cursor.execute("""
-                INSERT INTO learning_curve (user_id, subject_id, date, avg_accuracy, total_study_time, predicted_mastery)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    avg_accuracy = VALUES(avg_accuracy),
-                    predicted_mastery = VALUES(predicted_mastery)
-            """, (user_id, subject_id, date.today(), avg_acc, 0, avg_acc * 100))
-            conn.commit()
-
-        except pymysql.MySQLError as e:
-            conn.rollback()
-            print("❌ Database error:", e)
-            flash("Something went wrong while saving your quiz results.", "danger")
-        finally:
-            cursor.close()
-            conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM quizzes WHERE id=%s", (quiz_id,))
+            quiz = cursor.fetchone()
+
+            if not quiz:
+                flash("Quiz not found!", "danger")
+                return redirect(url_for("subject_detail", subject_id=subject_id))
+
+            # Parse quiz questions
+            questions = json.loads(quiz["questions_json"])
+            score = 0
+            results = []
+
+            # ✅ Calculate score
+            for i, q in enumerate(questions, start=1):
+                selected = request.form.get(f"q{i}")
+                correct = q.get("answer", "").strip().lower()
+                is_correct = selected and selected.strip().lower() == correct
+                if is_correct:
+                    score += 1
+                results.append({
+                    "question": q.get("question"),
+                    "selected": selected,
+                    "correct": correct,
+                    "is_correct": is_correct
+                })
+
+            accuracy = round(score / total, 2) if total else 0
+
+            try:
+                # 🔹 1. Save quiz results
+                cursor.execute("""
+                    INSERT INTO quiz_scores (quiz_id, user_id, subject_id, score, total, accuracy)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (quiz_id, user_id, subject_id, score, total, accuracy))
+
+                # 🔹 2. Update running totals and get the new average accuracy
+                avg_acc = record_quiz_attempt(cursor, user_id, subject_id, score, total, accuracy)
+
+                # 🔹 3. Upsert learning curve data safely
+                cursor.execute("""
+                    INSERT INTO learning_curve (user_id, subject_id, date, avg_accuracy, total_study_time, predicted_mastery)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        avg_accuracy = VALUES(avg_accuracy),
+                        predicted_mastery = VALUES(predicted_mastery)
+                """, (user_id, subject_id, date.today(), avg_acc, 0, avg_acc * 100))
+                conn.commit()
+
+            except pymysql.MySQLError as e:
+                conn.rollback()
+                logger.error("❌ Database error: %s", e)
+                flash("Something went wrong while saving your quiz results.", "danger")
 
         # ✅ Render result page instead of redirect
         return render_template(
@@ -550,13 +630,13 @@ def generate_quiz(subject_id):
         )
 
     # 🧩 --- QUIZ DISPLAY (GET) ---
-    cursor.execute(
-        "SELECT * FROM quizzes WHERE subject_id=%s ORDER BY created_at DESC LIMIT 1",
-        (subject_id,)
-    )
-    quiz = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM quizzes WHERE subject_id=%s ORDER BY created_at DESC LIMIT 1",
+            (subject_id,)
+        )
+        quiz = cursor.fetchone()
 
     if not quiz:
         flash("No quiz available for this subject yet!", "warning")
@@ -567,7 +647,7 @@ def generate_quiz(subject_id):
         if not isinstance(questions, list):
             questions = [questions]
     except Exception as e:
-        print("⚠️ Error decoding quiz JSON:", e)
+        logger.warning("⚠️ Error decoding quiz JSON: %s", e)
         questions = []
 
     return render_template("quiz_page.html", subject=subject, quiz=quiz, questions=questions)
@@ -579,25 +659,23 @@ def subject_progress(subject_id):
         return redirect(url_for("login"))
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
-    subject = cursor.fetchone()
-
-    cursor.execute("""
-        SELECT date, avg_accuracy, predicted_mastery 
-        FROM learning_curve
-        WHERE user_id=%s AND subject_id=%s ORDER BY date
-    """, (user_id, subject_id))
-    curve_data = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT AVG(avg_accuracy) AS avg_acc, COUNT(*) AS attempts
-        FROM learning_curve WHERE user_id=%s AND subject_id=%s
-    """, (user_id, subject_id))
-    perf = cursor.fetchone() or {"avg_acc": 0, "attempts": 0}
-
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM subjects WHERE subject_id=%s", (subject_id,))
+        subject = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT date, avg_accuracy, predicted_mastery 
+            FROM learning_curve
+            WHERE user_id=%s AND subject_id=%s ORDER BY date
+        """, (user_id, subject_id))
+        curve_data = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT AVG(avg_accuracy) AS avg_acc, COUNT(*) AS attempts
+            FROM learning_curve WHERE user_id=%s AND subject_id=%s
+        """, (user_id, subject_id))
+        perf = cursor.fetchone() or {"avg_acc": 0, "attempts": 0}
 
     # 🧠 Short personalized message
     if perf["avg_acc"] >= 80:
@@ -627,35 +705,18 @@ def progress_overview():
         return redirect(url_for("login"))
     user_id = session["user_id"]
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Correct/wrong ratio for every subject (one grouped query)
+    subject_stats = [
+        {
+            "id": st["subject_id"],
+            "name": st["subject_name"],
+            "correct": st["correct"],
+            "wrong": st["wrong"],
+            "success_rate": st["success_rate"],
+        }
+        for st in get_subject_stats(user_id)
+    ]
 
-    # Fetch all subjects
-    cursor.execute("SELECT * FROM subjects WHERE user_id=%s", (user_id,))
-    subjects = cursor.fetchall()
-
-    # For each subject, calculate correct/wrong ratio
-    subject_stats = []
-    for subj in subjects:
-        cursor.execute("""
-            SELECT SUM(score) AS total_correct, SUM(total - score) AS total_wrong, COUNT(*) AS quizzes
-            FROM quiz_scores WHERE user_id=%s AND subject_id=%s
-        """, (user_id, subj["subject_id"]))
-        stats = cursor.fetchone() or {}
-        total_correct = stats.get("total_correct", 0) or 0
-        total_wrong = stats.get("total_wrong", 0) or 0
-        total_attempts = total_correct + total_wrong
-        success_rate = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
-
-        subject_stats.append({
-            "id": subj["subject_id"],
-            "name": subj["subject_name"],
-            "correct": total_correct,
-            "wrong": total_wrong,
-            "success_rate": round(success_rate, 1)
-        })
-
-    conn.close()
     return render_template("progress_overview.html", subjects=subject_stats)
 
 
@@ -670,23 +731,78 @@ def performance_dashboard():
         return redirect(url_for("login"))
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT s.subject_id, s.subject_name, AVG(qs.accuracy) AS avg_accuracy
-        FROM subjects s
-        LEFT JOIN quiz_scores qs ON s.subject_id = qs.subject_id AND qs.user_id=%s
-        WHERE s.user_id=%s
-        GROUP BY s.subject_id
-    """, (user_id, user_id))
-    subjects_perf = cursor.fetchall()
-    conn.close()
+    subjects_perf = get_subject_stats(user_id)
     return render_template("performance_dashboard.html", subjects=subjects_perf)
 
 
 
+# ==============================================================
+# 🌐 GLOBAL SEARCH (all of the user's subjects)
+# ==============================================================
+@app.route("/search")
+def global_search():
+    """JSON search over every subject of the logged-in user: /search?q=...&k=10"""
+    if "loggedin" not in session:
+        return jsonify({"error": "Please login first."}), 401
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter q."}), 400
+    k = max(1, min(request.args.get("k", GLOBAL_SEARCH_K, type=int), 50))
+    try:
+        return jsonify({"query": query, **search_all_subjects(session["user_id"], query, k)})
+    except Exception as e:
+        logger.exception("❌ Global search failed: %s", e)
+        return jsonify({"error": "Search is unavailable right now."}), 503
+
+
+# ==============================================================
+# ❤️ HEALTH
+# ==============================================================
+@app.route("/health")
+def health():
+    """Liveness check plus database pool, LLM queue and embedding cache metrics."""
+    return jsonify({"status": "ok", "db_pool": pool_stats(), "llm": scheduler_stats(),
+                    "embedding_cache": embedding_cache_stats()})
+
+
+@register_collector
+def _pool_and_scheduler_gauges():
+    pool = pool_stats()
+    llm = scheduler_stats()["models"]
+    return [
+        ("studybuddy_db_pool_connections", "Database connections by state",
+         {(("state", "active"),): pool["active"], (("state", "idle"),): pool["idle"]}),
+        ("studybuddy_llm_running", "Generations in progress per model",
+         {(("model", m),): s["running"] for m, s in llm.items()}),
+        ("studybuddy_llm_queued", "Requests waiting for a model slot",
+         {(("model", m),): s["queued"] for m, s in llm.items()}),
+    ]
+
+
+@register_collector
+def _embedding_cache_metrics():
+    cache = embedding_cache_stats()
+    if cache is None:
+        return []
+    return [
+        ("studybuddy_embedding_cache_hits_total", "Embeddings served from the on-disk cache",
+         {(): cache["hits"]}, "counter"),
+        ("studybuddy_embedding_cache_misses_total", "Embeddings computed by the model",
+         {(): cache["misses"]}, "counter"),
+        ("studybuddy_embedding_cache_entries", "Vectors stored in the embedding cache",
+         {(): cache["entries"]}),
+    ]
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (histograms are per worker process)."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 # ==============================================================
 # 🚀 RUN SERVER
 # ==============================================================
 if __name__ == "__main__":
+    start_background_services()
     app.run(debug=True)
@@ -0,0 +1,83 @@
+# ==============================================================
+# 📄 SYNTHETIC CORPUS — StudyBuddy AI benchmarks
+# Seeded study-note generator (TXT with page breaks, and DOCX)
+# ==============================================================
+
+import os
+import random
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ra", "tu", "vo", "xe", "zy", "qu", "an", "el", "or", "is"]
+_GLUE = ["the", "of", "and", "is", "in", "to", "a", "with", "for", "as", "by", "that"]
+
+
+def _vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _sentence(rng, vocab, topic_terms):
+    words = []
+    for _ in range(rng.randint(8, 22)):
+        roll = rng.random()
+        if roll < 0.15:
+            words.append(rng.choice(topic_terms))
+        elif roll < 0.45:
+            words.append(rng.choice(_GLUE))
+        else:
+            words.append(rng.choice(vocab))
+    return " ".join(words).capitalize() + "."
+
+
+def generate_document(rng, vocab, pages=5, sentences_per_page=40):
+    """One document: a list of page texts with a few recurring topic terms."""
+    topic_terms = [f"{rng.choice(vocab)}_{rng.choice(vocab)}" for _ in range(6)]
+    doc = []
+    for _ in range(pages):
+        paragraphs, sentences = [], []
+        for i in range(sentences_per_page):
+            sentences.append(_sentence(rng, vocab, topic_terms))
+            if i % 6 == 5:
+                paragraphs.append(" ".join(sentences))
+                sentences = []
+        if sentences:
+            paragraphs.append(" ".join(sentences))
+        doc.append("\n\n".join(paragraphs))
+    return doc, topic_terms
+
+
+def generate_corpus(directory, files=10, pages=5, sentences_per_page=40, seed=42, docx_every=4):
+    """
+    Write `files` synthetic notes into directory and return
+    (paths, queries). Every docx_every-th file is written as DOCX
+    (if python-docx is installed), the rest as TXT.
+    """
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng, 3000)
+    os.makedirs(directory, exist_ok=True)
+    paths, queries = [], []
+    for n in range(files):
+        pages_text, topic_terms = generate_document(rng, vocab, pages, sentences_per_page)
+        as_docx = docx_every and n % docx_every == docx_every - 1
+        if as_docx:
+            try:
+                from docx import Document
+            except ImportError:
+                as_docx = False
+        if as_docx:
+            path = os.path.join(directory, f"notes_{n:03d}.docx")
+            document = Document()
+            for page in pages_text:
+                for paragraph in page.split("\n\n"):
+                    document.add_paragraph(paragraph)
+            document.save(path)
+        else:
+            path = os.path.join(directory, f"notes_{n:03d}.txt")
+            with open(path, "w", encoding="utf-8", newline="\n") as f:
+                f.write("\f".join(pages_text))
+        paths.append(path)
+        for term in topic_terms[:3]:
+            queries.append(f"What is {term} and how does it relate to {rng.choice(vocab)}?")
+    rng.shuffle(queries)
+    return paths, queries
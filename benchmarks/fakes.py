@@ -0,0 +1,91 @@
+# ==============================================================
+# 🎭 BENCHMARK STAND-INS — StudyBuddy AI
+# Deterministic replacements for the Ollama embedding model and LLMs
+# ==============================================================
+
+import hashlib
+import json
+import math
+import re
+import time
+from langchain_core.embeddings import Embeddings
+
+_WORD = re.compile(r"\w+")
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashing-trick bag-of-words vectors: texts sharing words get similar
+    vectors, so retrieval quality is meaningful without a real model.
+    """
+
+    def __init__(self, dim=768, latency_ms=0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for word in _WORD.findall(text.lower()):
+            d = _digest(word)
+            index = int.from_bytes(d[:4], "little") % self.dim
+            vector[index] += 1.0 if d[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        if self.latency_ms:
+            time.sleep(self.latency_ms * len(texts) / 1000)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._embed(text)
+
+
+class FakeLLM:
+    """
+    Stands in for OllamaLLM: deterministic answers derived from the prompt,
+    with an optional per-token delay to model generation time.
+    Quiz prompts get a valid JSON array of questions.
+    """
+
+    def __init__(self, tokens=64, ms_per_token=0.0):
+        self.tokens = tokens
+        self.ms_per_token = ms_per_token
+
+    def _words(self, prompt):
+        words = _WORD.findall(prompt.split("Text:")[-1].split("Context:")[-1]) or ["notes"]
+        seed = int.from_bytes(_digest(prompt), "little")
+        return [words[(seed + i * 7919) % len(words)] for i in range(self.tokens)]
+
+    def _quiz(self, prompt):
+        count = int((re.search(r"Create exactly (\d+)", prompt) or [0, 5])[1])
+        words = self._words(prompt)
+        return json.dumps([
+            {
+                "question": f"Which term relates to {words[i % len(words)]} ({_digest(prompt + str(i)).hex()[:6]})?",
+                "options": [words[(i + j) % len(words)] for j in range(4)],
+                "answer": "A",
+            }
+            for i in range(count)
+        ])
+
+    def stream(self, prompt, **kwargs):
+        if "quiz generator" in prompt:
+            text = self._quiz(prompt)
+            yield text
+            return
+        for word in self._words(prompt):
+            if self.ms_per_token:
+                time.sleep(self.ms_per_token / 1000)
+            yield word + " "
+
+    def invoke(self, prompt, **kwargs):
+        return "".join(self.stream(prompt))
+
+    __call__ = invoke
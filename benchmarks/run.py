@@ -0,0 +1,335 @@
+# ==============================================================
+# ⏱️ BENCHMARK RUNNER — StudyBuddy AI
+# Times extraction, indexing, retrieval and the chat/quiz routes with
+# deterministic stand-ins for Ollama; prints p50/p95/p99 as JSON.
+#
+#   python -m benchmarks.run --files 12 --queries 50 --out bench.json
+#   python -m benchmarks.run --compare bench.json      # vs. a previous run
+#
+# Everything runs in a temporary working directory. The route
+# benchmarks also need the MySQL database from database/connection.py
+# and are skipped (with the reason recorded) when it is unreachable.
+# ==============================================================
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from modules.metrics import configure_logging
+
+# Subject id used for the benchmarks that don't touch MySQL
+OFFLINE_SUBJECT_ID = 900_001
+
+
+# -------------------------------------------------------------
+# 📈 Timing helpers
+# -------------------------------------------------------------
+def _percentile(sorted_values, p):
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(durations, items=None, unit="ops"):
+    """Latency percentiles (ms) and throughput for a list of durations (s)."""
+    if not durations:
+        return {"count": 0}
+    ordered = sorted(durations)
+    total = sum(durations)
+    summary = {
+        "count": len(durations),
+        "total_s": round(total, 4),
+        "mean_ms": round(total / len(durations) * 1000, 3),
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "ops_per_s": round(len(durations) / total, 3) if total else None,
+    }
+    if items is not None:
+        summary[f"{unit}_total"] = items
+        summary[f"{unit}_per_s"] = round(items / total, 3) if total else None
+    return summary
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# -------------------------------------------------------------
+# 🎭 Stand-ins
+# -------------------------------------------------------------
+def install_fakes(args):
+    """Swap Ollama for deterministic fakes before the app modules are used."""
+    from modules import jobs, llm_client, vector_store
+
+    llm_client.WARM_UP_ON_START = False
+    jobs.start_workers = lambda *a, **k: None  # jobs are run inline by the benchmarks
+    fake_llm = FakeLLM(tokens=args.llm_tokens, ms_per_token=args.llm_ms_per_token)
+    for model in (llm_client.CHAT_MODEL, llm_client.QUIZ_MODEL):
+        llm_client._clients[model] = fake_llm
+
+    embeddings = FakeEmbeddings(latency_ms=args.embed_ms)
+    if args.embed_cache:
+        from modules.embedding_cache import CachedEmbeddings
+        embeddings = CachedEmbeddings(embeddings, "fake-embeddings")
+    vector_store._embeddings = embeddings
+
+
+# -------------------------------------------------------------
+# 🧪 Benchmarks
+# -------------------------------------------------------------
+def bench_extract(paths):
+    from text_extraction import extract_text
+
+    durations, outputs, size = [], [], 0
+    for path in paths:
+        elapsed, output = timed(extract_text, path)
+        durations.append(elapsed)
+        outputs.append(output)
+        size += os.path.getsize(path)
+    return summarize(durations, items=round(size / 1e6, 3), unit="mb"), outputs
+
+
+def bench_index(text_paths, subject_id):
+    from modules.vector_store import add_text_file_to_vector_db
+
+    durations, chunks = [], 0
+    for path in text_paths:
+        elapsed, count = timed(add_text_file_to_vector_db, path, subject_id, raise_errors=True)
+        durations.append(elapsed)
+        chunks += count
+    return summarize(durations, items=chunks, unit="chunks")
+
+
+def bench_search(queries, subject_id, k):
+    from modules.vector_store import get_vector_store
+    from modules.retrieval import hybrid_search
+
+    vector, hybrid = [], []
+    for query in queries:
+        elapsed, _ = timed(lambda q: get_vector_store(subject_id).similarity_search(q, k=k), query)
+        vector.append(elapsed)
+        elapsed, _ = timed(hybrid_search, query, subject_id, k=k)
+        hybrid.append(elapsed)
+    return {"similarity_search": summarize(vector), "hybrid_search": summarize(hybrid)}
+
+
+def _create_bench_subject():
+    from database.connection import get_db_connection
+
+    name = f"bench{uuid.uuid4().hex[:10]}"
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO users (username, email, password) VALUES (%s,%s,%s)",
+            (name, f"{name}@bench.invalid", uuid.uuid4().hex),
+        )
+        user_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO subjects (user_id, subject_name, description) VALUES (%s,%s,%s)",
+            (user_id, "Benchmark subject", "Synthetic notes"),
+        )
+        subject_id = cursor.lastrowid
+        conn.commit()
+    return name, user_id, subject_id
+
+
+def _drop_bench_subject(user_id, subject_id):
+    from database.connection import get_db_connection
+    from modules.cleanup import purge_subject
+
+    purge_subject(subject_id)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM quizzes WHERE subject_id=%s", (subject_id,))
+        cursor.execute("DELETE FROM subjects WHERE subject_id=%s", (subject_id,))
+        cursor.execute("DELETE FROM users WHERE id=%s", (user_id,))
+        conn.commit()
+
+
+def bench_routes(text_paths, queries, quizzes):
+    """Chat (form + SSE) and quiz routes end to end through the Flask test client."""
+    try:
+        from database.connection import get_db_connection
+        with get_db_connection() as conn:
+            conn.cursor().execute("SELECT 1")
+    except Exception as e:
+        return {"skipped": f"MySQL unavailable: {e}"}
+
+    from modules.corpus import processed_text_dir, index_file
+    from modules.practice.quiz import refill_quiz_pool
+    from modules.vector_store import add_text_file_to_vector_db
+    from app import app
+
+    username, user_id, subject_id = _create_bench_subject()
+    results = {}
+    try:
+        os.makedirs(processed_text_dir(subject_id), exist_ok=True)
+        for file_id, path in enumerate(text_paths, start=1):
+            dest = os.path.join(processed_text_dir(subject_id), os.path.basename(path))
+            shutil.copyfile(path, dest)
+            add_text_file_to_vector_db(dest, subject_id, raise_errors=True)
+            index_file(subject_id, file_id, dest)
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update(loggedin=True, user_id=user_id, username=username)
+
+        def chat(question):
+            response = client.post(f"/subjects/{subject_id}/chat", data={"question": question})
+            assert response.status_code == 200, response.status_code
+
+        def chat_stream(question):
+            response = client.post(f"/subjects/{subject_id}/chat/stream", data={"question": question})
+            assert response.status_code == 200, response.status_code
+            response.get_data()
+
+        results["chat"] = summarize([timed(chat, q)[0] for q in queries])
+        results["chat_cached"] = summarize([timed(chat, q)[0] for q in queries])
+        results["chat_stream"] = summarize([timed(chat_stream, q + " (stream)")[0] for q in queries])
+
+        refills, added = [], 0
+        while len(refills) < 3:
+            elapsed, count = timed(refill_quiz_pool, {"subject_id": subject_id})
+            refills.append(elapsed)
+            added += count
+            if not count:
+                break
+        results["quiz_pool_refill"] = summarize(refills, items=added, unit="questions")
+
+        def quiz():
+            response = client.get(f"/subjects/{subject_id}/generate_quiz_ai")
+            assert response.status_code == 302, response.status_code
+
+        results["generate_quiz_ai"] = summarize([timed(quiz)[0] for _ in range(quizzes)])
+    except Exception as e:
+        results["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        _drop_bench_subject(user_id, subject_id)
+    return results
+
+
+# -------------------------------------------------------------
+# 🚀 Entry point
+# -------------------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    """Print p95 changes of every benchmark against a previous JSON result."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def flatten(results, prefix=""):
+        for name, value in results.items():
+            if isinstance(value, dict) and "p95_ms" in value:
+                yield prefix + name, value["p95_ms"]
+            elif isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{name}.")
+
+    before = dict(flatten(baseline["results"]))
+    print(f"📊 p95 vs {baseline['meta'].get('commit')}:", file=sys.stderr)
+    for name, p95 in flatten(current["results"]):
+        if name in before and before[name]:
+            change = (p95 - before[name]) / before[name] * 100
+            print(f"  {name:40s} {before[name]:10.2f} → {p95:10.2f} ms ({change:+.1f}%)", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StudyBuddy AI performance benchmarks")
+    parser.add_argument("--files", type=int, default=12, help="synthetic note files")
+    parser.add_argument("--pages", type=int, default=5, help="pages per file")
+    parser.add_argument("--sentences", type=int, default=40, help="sentences per page")
+    parser.add_argument("--queries", type=int, default=50, help="queries per retrieval/chat benchmark")
+    parser.add_argument("--quizzes", type=int, default=20, help="quiz route calls")
+    parser.add_argument("--k", type=int, default=3, help="chunks retrieved per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["chroma", "compact"], default="chroma",
+                        help="vector store backend for the run")
+    parser.add_argument("--embed-ms", type=float, default=0.0, help="simulated embedding latency per text")
+    parser.add_argument("--embed-cache", action="store_true", help="put the on-disk embedding cache in front")
+    parser.add_argument("--llm-tokens", type=int, default=64, help="tokens per fake answer")
+    parser.add_argument("--llm-ms-per-token", type=float, default=0.0, help="simulated generation speed")
+    parser.add_argument("--skip-routes", action="store_true", help="skip the Flask route benchmarks")
+    parser.add_argument("--workdir", help="working directory (default: a temporary one, removed afterwards)")
+    parser.add_argument("--out", help="write the JSON result to this file")
+    parser.add_argument("--compare", help="previous JSON result to compare p95 latencies against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="studybuddy_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    os.environ["STUDYBUDDY_VECTOR_BACKEND"] = args.backend
+    # the app uses paths relative to the working directory (uploads, vector_dbs, instance)
+    os.chdir(workdir)
+    try:
+        # app logging goes to stderr (configure_logging's StreamHandler); prints
+        # from libraries are redirected too, so stdout carries only the JSON report
+        configure_logging()
+        with contextlib.redirect_stdout(sys.stderr):
+            install_fakes(args)
+            paths, queries = generate_corpus(os.path.join(workdir, "corpus"), args.files, args.pages,
+                                             args.sentences, seed=args.seed)
+            queries = (queries * (args.queries // max(1, len(queries)) + 1))[:args.queries]
+
+            results = {}
+            results["extract_text"], text_paths = bench_extract(paths)
+            results["add_text_file_to_vector_db"] = bench_index(text_paths, OFFLINE_SUBJECT_ID)
+            results.update(bench_search(queries, OFFLINE_SUBJECT_ID, args.k))
+            if args.skip_routes:
+                results["routes"] = {"skipped": "--skip-routes"}
+            else:
+                results["routes"] = bench_routes(text_paths, queries, args.quizzes)
+    finally:
+        os.chdir(previous_cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "workdir")},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
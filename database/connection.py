@@ -1,11 +1,209 @@
+import threading
+import time
 import pymysql
+from modules.metrics import span
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",   # leave empty if no password
+    "database": "studybuddy_db",
+    "cursorclass": pymysql.cursors.DictCursor,
+}
+
+# Maximum open connections per process
+POOL_SIZE = 10
+
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = 10
+
+# Idle connections older than this are pinged before reuse
+HEALTH_CHECK_AFTER = 30
+
+
+class PoolTimeout(pymysql.OperationalError):
+    """No connection became available within POOL_TIMEOUT."""
+
+
+class _TimedCursor:
+    """Cursor wrapper recording each statement as a db_query span (labelled by SQL verb)."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+
+    def execute(self, query, args=None):
+        with span("db_query", verb=_verb(query)):
+            return self._raw.execute(query, args)
+
+    def executemany(self, query, args):
+        with span("db_query", verb=_verb(query)):
+            return self._raw.executemany(query, args)
+
+
+def _verb(query):
+    words = query.split(None, 1)
+    return words[0].upper() if words else "?"
+
+
+class PooledConnection:
+    """
+    A pymysql connection borrowed from the pool.
+    close() (or leaving a `with` block) hands it back instead of closing it.
+    """
+
+    _pool = None
+    _raw = None
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to the pool")
+        return _TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # safety net for code paths that forget to close
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of pymysql connections."""
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, **config):
+        self.size = size
+        self.timeout = timeout
+        self.config = config
+        self._idle = []  # [(raw connection, returned_at)]
+        self._created = 0
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+
+    def _healthy(self, raw, returned_at):
+        if time.time() - returned_at < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            raw.ping(reconnect=True)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def connection(self):
+        """Borrow a connection, waiting up to `timeout` seconds for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    raw, returned_at = self._idle.pop()
+                else:
+                    raw, returned_at = None, None
+                    self._created += 1
+
+            if raw is None:
+                try:
+                    raw = pymysql.connect(**self.config)
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(raw, returned_at):
+                self._discard(raw)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """Return a connection; uncommitted work is rolled back."""
+        try:
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, time.time()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "open": self._created,
+                "active": self._created - idle,
+                "idle": idle,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+            }
+
+
+pool = ConnectionPool(**DB_CONFIG)
+
 
 def get_db_connection():
-    """Create and return a new database connection."""
-    return pymysql.connect(
-        host="localhost",
-        user="root",
-        password="",   # leave empty if no password
-        database="studybuddy_db",
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    """
+    Borrow a pooled database connection.
+    Use as `with get_db_connection() as conn:` (or call conn.close()).
+    """
+    with span("db_pool_wait"):
+        return pool.connection()
+
+
+def pool_stats():
+    """Pool metrics: open/active/idle connections and checkout wait times."""
+    return pool.stats()
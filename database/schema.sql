@@ -0,0 +1,67 @@
+-- ==============================================================
+-- 🗄️ STUDYBUDDY AI — schema additions
+-- Run against studybuddy_db after the base tables exist.
+-- ==============================================================
+
+-- Content hash of each upload (file-level deduplication)
+ALTER TABLE subject_files ADD COLUMN content_hash CHAR(64) NULL;
+CREATE INDEX idx_subject_files_hash ON subject_files (content_hash, subject_id);
+
+-- Vectors created for each uploaded file (chunk-level deduplication)
+CREATE TABLE IF NOT EXISTS file_chunks (
+    file_id INT NOT NULL,
+    subject_id INT NOT NULL,
+    chunk_index INT NOT NULL,
+    chunk_hash CHAR(64) NOT NULL,
+    vector_id VARCHAR(64) NOT NULL,
+    PRIMARY KEY (file_id, chunk_index),
+    KEY idx_file_chunks_hash (chunk_hash),
+    KEY idx_file_chunks_subject (subject_id)
+);
+
+-- Per-user, per-subject quiz statistics (dashboard / progress / performance)
+CREATE INDEX idx_quiz_scores_user_subject ON quiz_scores (user_id, subject_id);
+CREATE INDEX idx_subjects_user ON subjects (user_id);
+
+-- Running per-user, per-subject quiz totals, updated on every quiz submit
+CREATE TABLE IF NOT EXISTS subject_stats (
+    user_id INT NOT NULL,
+    subject_id INT NOT NULL,
+    correct INT NOT NULL DEFAULT 0,
+    wrong INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    accuracy_sum DOUBLE NOT NULL DEFAULT 0,
+    last_attempt_at DATETIME NULL,
+    PRIMARY KEY (user_id, subject_id)
+);
+
+-- One-off backfill from existing quiz_scores; quiz_scores has no timestamp,
+-- so the last attempt is taken from the newest attempted quiz's created_at
+INSERT INTO subject_stats (user_id, subject_id, correct, wrong, attempts, accuracy_sum, last_attempt_at)
+SELECT qs.user_id, qs.subject_id, SUM(qs.score), SUM(qs.total - qs.score), COUNT(*), SUM(qs.accuracy),
+       MAX(q.created_at)
+FROM quiz_scores qs
+LEFT JOIN quizzes q ON q.id = qs.quiz_id
+GROUP BY qs.user_id, qs.subject_id
+ON DUPLICATE KEY UPDATE
+    correct = VALUES(correct),
+    wrong = VALUES(wrong),
+    attempts = VALUES(attempts),
+    accuracy_sum = VALUES(accuracy_sum),
+    last_attempt_at = COALESCE(subject_stats.last_attempt_at, VALUES(last_attempt_at));
+
+-- Pre-generated quiz questions per subject, filled by background jobs
+CREATE TABLE IF NOT EXISTS quiz_pool (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    subject_id INT NOT NULL,
+    file_id INT NULL,
+    vector_id VARCHAR(64) NULL,
+    question_hash CHAR(64) NOT NULL,
+    question_json TEXT NOT NULL,
+    served_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_quiz_pool_question (subject_id, question_hash),
+    KEY idx_quiz_pool_serve (subject_id, served_count),
+    KEY idx_quiz_pool_chunk (subject_id, vector_id),
+    KEY idx_quiz_pool_file (file_id)
+);
@@ -0,0 +1,31 @@
+# ==============================================================
+# 🚀 GUNICORN CONFIG — StudyBuddy AI
+# Chat and quiz routes spend most of their time waiting on Ollama,
+# so workers run many threads instead of one request each.
+# ==============================================================
+
+import os
+
+# Threads, not gevent: SQLite, Chroma/NumPy search, PDF parsing and the
+# store file locks all block, and under gevent would stall every greenlet
+worker_class = "gthread"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# the workers inherit this; modules/llm_scheduler.py splits the model caps by it
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# gthread: concurrent requests per worker process
+threads = int(os.environ.get("STUDYBUDDY_THREADS", "16"))
+
+# Local generations can take a while; streaming responses keep the socket busy
+timeout = int(os.environ.get("STUDYBUDDY_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+
+def post_worker_init(worker):
+    """Start logging, model warm-up and the job workers in each serving process."""
+    from app import start_background_services
+    start_background_services()
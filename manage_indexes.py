@@ -0,0 +1,583 @@
+# ==============================================================
+# 🛠️ INDEX MAINTENANCE — StudyBuddy AI
+# Reconciles vector_dbs/ with the subjects and subject_files tables:
+# reports per-index size and vector count, finds orphan and missing
+# indexes, rebuilds subjects from processed_texts, compacts stores and
+# migrates every subject to a new embedding model or chunking config.
+#
+#   python manage_indexes.py report [--json] [--recall]
+#   python manage_indexes.py check [--fix]
+#   python manage_indexes.py rebuild (SUBJECT_ID ... | --all | --missing) [--workers 4]
+#   python manage_indexes.py compact (SUBJECT_ID ... | --all)
+#   STUDYBUDDY_EMBED_MODEL=mxbai-embed-large python manage_indexes.py migrate [--rate 20]
+#   STUDYBUDDY_EMBED_MODEL=mxbai-embed-large python manage_indexes.py migrate --finalize
+#
+# A migration embeds into side-by-side stores while the app keeps
+# serving the old ones. It is throttled (--rate) and resumable: rerun
+# the same command after an interruption. --finalize catches up on
+# files uploaded meanwhile and swaps the new stores in; restart the app
+# with the same STUDYBUDDY_* settings right after it.
+# ==============================================================
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# data paths (vector_dbs/, static/uploads/) are relative to the repo root
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+os.chdir(REPO_ROOT)
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from database.connection import get_db_connection
+from text_extraction import extract_texts
+from modules import lexical_index
+from modules.chunking import CHUNK_SIZE, CHUNK_OVERLAP
+from modules.compact_store import measure_recall
+from modules.corpus import (PROCESSED_TEXT_DIR, processed_text_dir, processed_text_path,
+                            load_manifest, rebuild_manifest, remove_file, corpus_stats)
+from modules.dedup import delete_file_chunks, trim_file_chunks
+from modules.metrics import configure_logging
+from modules.vector_store import (
+    EMBED_MODEL, EMBED_BATCH_SIZE, VECTOR_BACKEND, VECTOR_DB_DIR, STAGED_SUFFIX,
+    add_text_files_to_vector_db, compact_vector_store, delete_vectors, drop_vector_store,
+    get_vector_store, list_store_subjects, store_info, vector_files,
+    stage_text_file, unstage_file, drop_staged_store, staged_store_dir, swap_in_staged_store,
+)
+
+logger = logging.getLogger("manage_indexes")
+
+# Progress of a running migration; rerunning `migrate` resumes from it
+MIGRATION_STATE_PATH = os.path.join(VECTOR_DB_DIR, "migration.json")
+
+# Embedding settings the current stores were built with (written by a finished migration)
+INDEX_CONFIG_PATH = os.path.join(VECTOR_DB_DIR, "index_config.json")
+
+# Default re-embedding rate (chunks per second) so Ollama keeps answering chat
+MIGRATE_RATE = 20.0
+
+# A migration stops after this many files in a row fail (e.g. Ollama is down)
+MAX_CONSECUTIVE_FAILURES = 5
+
+# Subjects rebuilt at the same time
+REBUILD_WORKERS = 4
+
+# Stores from before per-subject indexes; nothing reads them any more
+LEGACY_STORE_DIRS = ("chroma_db",)
+
+# Temporary store directories left behind by an interrupted compaction
+LEFTOVER_SUFFIXES = (".compact", ".old")
+
+
+# -------------------------------------------------------------
+# 🗄️ Database view
+# -------------------------------------------------------------
+def _load_subjects():
+    """({subject_id: subject_name}, {subject_id: [(file_id, filepath)]}) from MySQL."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT subject_id, subject_name FROM subjects")
+        subjects = {row["subject_id"]: row["subject_name"] for row in cursor.fetchall()}
+        cursor.execute("SELECT file_id, subject_id, filepath FROM subject_files ORDER BY file_id")
+        files = {}
+        for row in cursor.fetchall():
+            files.setdefault(row["subject_id"], []).append((row["file_id"], row["filepath"]))
+    return subjects, files
+
+
+def _current_config():
+    return {
+        "embed_model": EMBED_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "backend": VECTOR_BACKEND,
+    }
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _text_files(subject_id, files):
+    """
+    [(text_path, file_id)] of a subject's files. Uploads whose processed
+    text is missing are extracted again first (in parallel processes).
+    """
+    paths = {file_id: processed_text_path(subject_id, filepath) for file_id, filepath in files}
+    missing = [(filepath, paths[file_id]) for file_id, filepath in files
+               if not os.path.exists(paths[file_id]) and os.path.exists(filepath)]
+    if missing:
+        os.makedirs(processed_text_dir(subject_id), exist_ok=True)
+        for src, _, error in extract_texts(missing):
+            if error is not None:
+                logger.warning("⚠️ Could not extract %s: %s", src, error)
+
+    texts = []
+    for file_id, filepath in files:
+        if os.path.exists(paths[file_id]):
+            texts.append((paths[file_id], file_id))
+        else:
+            logger.warning("⚠️ File %s of subject %s has no processed text or upload (%s)",
+                           file_id, subject_id, filepath)
+    return texts
+
+
+def _sync_manifest(subject_id, files):
+    """Re-index the manifest from the subject's files and drop entries of deleted ones."""
+    rebuild_manifest(subject_id, files)
+    live = {str(file_id) for file_id, _ in files}
+    for file_id in list(load_manifest(subject_id)["files"]):
+        if file_id not in live:
+            remove_file(subject_id, file_id)
+
+
+# -------------------------------------------------------------
+# 📊 report
+# -------------------------------------------------------------
+def _dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def _stray_dirs():
+    """[(path, bytes, reason)] of store directories the app never reads."""
+    stray = []
+    for name in LEGACY_STORE_DIRS:
+        if os.path.isdir(name):
+            stray.append((name, _dir_bytes(name), "legacy store, not read by the app"))
+    if not os.path.isdir(VECTOR_DB_DIR):
+        return stray
+    migrating = os.path.exists(MIGRATION_STATE_PATH)
+    for name in sorted(os.listdir(VECTOR_DB_DIR)):
+        path = os.path.join(VECTOR_DB_DIR, name)
+        if not os.path.isdir(path):
+            continue
+        if name.endswith(LEFTOVER_SUFFIXES):
+            stray.append((path, _dir_bytes(path), "left over from an interrupted compaction"))
+        elif name.endswith(STAGED_SUFFIX) and not migrating:
+            stray.append((path, _dir_bytes(path), "staged store of an abandoned migration"))
+    return stray
+
+
+def _subject_row(subject_id, name, files, recall=False):
+    info = store_info(subject_id) or {"backend": None, "bytes": 0, "vectors": 0}
+    row = {
+        "subject_id": subject_id,
+        "name": name,
+        "files": None if files is None else len(files),
+        "backend": info["backend"],
+        "bytes": info["bytes"],
+        "vectors": info["vectors"],
+        "lexical_docs": lexical_index.document_count(subject_id),
+        "manifest_chunks": corpus_stats(subject_id)["chunks"],
+    }
+    if recall and info["vectors"] > 1:
+        stats = measure_recall(get_vector_store(subject_id)._collection)
+        row["recall_vs_exact"] = stats["recall_vs_exact"]
+    row["status"] = ", ".join(_row_problems(row)) or "ok"
+    return row
+
+
+def _row_problems(row):
+    problems = []
+    if row["name"] is None and row["files"] is not None:
+        problems.append("orphan")
+    if row["files"] and not row["vectors"]:
+        problems.append("missing")
+    if row["vectors"] and row["lexical_docs"] < row["vectors"]:
+        problems.append("bm25 behind")
+    if row["files"] and row["manifest_chunks"] != row["vectors"]:
+        problems.append("manifest differs")
+    return problems
+
+
+def cmd_report(args):
+    try:
+        subjects, files = _load_subjects()
+    except Exception as e:
+        logger.warning("⚠️ Database unavailable, reporting stores only: %s", e)
+        subjects, files = None, None
+
+    subject_ids = sorted(set(list_store_subjects()) | set(subjects or ()))
+    rows = [
+        _subject_row(sid, (subjects or {}).get(sid),
+                     None if files is None else files.get(sid, []), args.recall)
+        for sid in subject_ids
+    ]
+    stray = _stray_dirs()
+    built_with = _read_json(INDEX_CONFIG_PATH)
+
+    if args.json:
+        print(json.dumps({
+            "subjects": rows,
+            "stray": [{"path": p, "bytes": b, "reason": r} for p, b, r in stray],
+            "built_with": built_with,
+            "configured": _current_config(),
+        }, indent=2))
+        return 0
+
+    print(f"{'subject':>8}  {'name':<24} {'backend':<8} {'size MB':>8} {'vectors':>8} "
+          f"{'bm25':>8} {'manifest':>8} {'files':>6}  status")
+    for row in rows:
+        recall = f" (recall {row['recall_vs_exact']:.3f})" if "recall_vs_exact" in row else ""
+        print(f"{row['subject_id']:>8}  {(row['name'] or '-')[:24]:<24} {row['backend'] or '-':<8} "
+              f"{row['bytes'] / 1e6:>8.2f} {row['vectors']:>8} {row['lexical_docs']:>8} "
+              f"{row['manifest_chunks']:>8} {'?' if row['files'] is None else row['files']:>6}  "
+              f"{row['status']}{recall}")
+    print(f"{'total':>8}  {'':<24} {'':<8} {sum(r['bytes'] for r in rows) / 1e6:>8.2f} "
+          f"{sum(r['vectors'] for r in rows):>8}")
+    for path, size, reason in stray:
+        print(f"stray: {path} ({size / 1e6:.2f} MB) — {reason}")
+    print(f"configured: {_current_config()}")
+    if built_with and built_with != _current_config():
+        print(f"⚠️ stores were built with {built_with}")
+    return 0
+
+
+# -------------------------------------------------------------
+# 🔍 check
+# -------------------------------------------------------------
+def _find_problems(subjects, files):
+    """Orphan and missing index data, grouped by kind."""
+    stores = set(list_store_subjects())
+    problems = {
+        "orphan_stores": sorted(stores - set(subjects)),
+        "orphan_lexical": [],
+        "orphan_texts": [],
+        "orphan_vectors": {},  # subject_id -> [file_id] of deleted files
+        "missing_stores": [],
+        "missing_files": {},  # subject_id -> [file_id] without vectors
+        "lexical_behind": [],
+        "stray_dirs": [path for path, _, _ in _stray_dirs()],
+    }
+    if os.path.isdir(lexical_index.LEXICAL_DB_DIR):
+        for name in os.listdir(lexical_index.LEXICAL_DB_DIR):
+            sid = name[len("subject_"):-len(".sqlite3")]
+            if name.startswith("subject_") and name.endswith(".sqlite3") and sid.isdigit() \
+                    and int(sid) not in subjects:
+                problems["orphan_lexical"].append(int(sid))
+    if os.path.isdir(PROCESSED_TEXT_DIR):
+        for name in os.listdir(PROCESSED_TEXT_DIR):
+            if name.isdigit() and int(name) not in subjects:
+                problems["orphan_texts"].append(int(name))
+
+    for subject_id in sorted(subjects):
+        subject_files = {file_id for file_id, _ in files.get(subject_id, [])}
+        if subject_id not in stores:
+            if subject_files:
+                problems["missing_stores"].append(subject_id)
+            continue
+        owners = vector_files(subject_id)
+        indexed = set(owners.values())
+        deleted = sorted(f for f in indexed if f is not None and f >= 0 and f not in subject_files)
+        if deleted:
+            problems["orphan_vectors"][subject_id] = deleted
+        unindexed = sorted(subject_files - indexed)
+        if unindexed:
+            problems["missing_files"][subject_id] = unindexed
+        if lexical_index.document_count(subject_id) < len(owners):
+            problems["lexical_behind"].append(subject_id)
+    return problems
+
+
+def _missing_subjects(problems):
+    return sorted(set(problems["missing_stores"]) | set(problems["missing_files"])
+                  | set(problems["lexical_behind"]))
+
+
+def _fix_orphans(problems):
+    for subject_id in problems["orphan_stores"]:
+        drop_vector_store(subject_id)
+    for subject_id in problems["orphan_lexical"]:
+        lexical_index.drop_index(subject_id)
+    for subject_id in problems["orphan_texts"]:
+        shutil.rmtree(processed_text_dir(subject_id), ignore_errors=True)
+    for subject_id, file_ids in problems["orphan_vectors"].items():
+        for file_id in file_ids:
+            delete_vectors(subject_id, file_id=file_id)
+            delete_file_chunks(file_id=file_id)
+    for path in problems["stray_dirs"]:
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info("🗑 Removed %s", path)
+
+
+def cmd_check(args):
+    subjects, files = _load_subjects()
+    problems = _find_problems(subjects, files)
+    found = False
+    for kind, value in problems.items():
+        if value:
+            found = True
+            print(f"{kind}: {value}")
+    if not found:
+        print("✅ Indexes match the database")
+        return 0
+
+    missing = _missing_subjects(problems)
+    if args.fix:
+        _fix_orphans(problems)
+        print("🧹 Orphans removed")
+    if missing:
+        print(f"➡️ Re-index with: python manage_indexes.py rebuild --missing  ({len(missing)} subjects)")
+    return 0 if args.fix and not missing else 1
+
+
+# -------------------------------------------------------------
+# 🔁 rebuild
+# -------------------------------------------------------------
+def rebuild_subject(subject_id, files, clean=False):
+    """
+    Re-index a subject from its processed texts with the current settings.
+    Chunks that were embedded before reuse their vectors, so only missing
+    ones reach Ollama; vectors no file produces any more are removed.
+    Returns the number of chunks indexed.
+    """
+    if clean:
+        drop_vector_store(subject_id)
+        delete_file_chunks(subject_id=subject_id)
+    texts = _text_files(subject_id, files)
+    counts = add_text_files_to_vector_db(texts, subject_id, raise_errors=True) if texts else {}
+
+    # deleted files, or chunks past the end of a file that now chunks shorter
+    keep = {f"{file_id}-{i}" for file_id, count in counts.items() for i in range(count)}
+    stale = [vid for vid in vector_files(subject_id) if vid not in keep]
+    if stale:
+        delete_vectors(subject_id, ids=stale)
+    for file_id, count in counts.items():
+        trim_file_chunks(file_id, count)
+    _sync_manifest(subject_id, files)
+    return sum(counts.values())
+
+
+def cmd_rebuild(args):
+    subjects, files = _load_subjects()
+    if args.all:
+        targets = sorted(subjects)
+    elif args.missing:
+        targets = _missing_subjects(_find_problems(subjects, files))
+    else:
+        targets = [sid for sid in args.subject_ids if sid in subjects]
+        for sid in sorted(set(args.subject_ids) - set(targets)):
+            logger.warning("⚠️ Subject %s does not exist, skipped", sid)
+    if not targets:
+        print("Nothing to rebuild")
+        return 0
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(rebuild_subject, sid, files.get(sid, []), args.clean): sid
+                   for sid in targets}
+        for future in as_completed(futures):
+            sid = futures[future]
+            try:
+                print(f"✅ Subject {sid}: {future.result()} chunks")
+            except Exception as e:
+                logger.error("❌ Rebuild of subject %s failed: %s", sid, e)
+                failed.append(sid)
+    if failed:
+        print(f"❌ Failed: {sorted(failed)}")
+    return 1 if failed else 0
+
+
+# -------------------------------------------------------------
+# 🗜️ compact
+# -------------------------------------------------------------
+def cmd_compact(args):
+    targets = list_store_subjects() if args.all else args.subject_ids
+    for sid in targets:
+        before = store_info(sid)
+        if before is None:
+            logger.warning("⚠️ Subject %s has no store", sid)
+            continue
+        count = compact_vector_store(sid)
+        after = store_info(sid) or {"bytes": 0}
+        print(f"🗜️ Subject {sid}: {count} vectors, {before['bytes'] / 1e6:.2f} MB → {after['bytes'] / 1e6:.2f} MB")
+    return 0
+
+
+# -------------------------------------------------------------
+# 🚚 migrate
+# -------------------------------------------------------------
+class _Throttle:
+    """Sleeps so that on average at most `rate` chunks per second are embedded."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.done = 0
+
+    def __call__(self, count):
+        self.done += count
+        if self.rate:
+            ahead = self.done / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _load_state(target, restart):
+    state = _read_json(MIGRATION_STATE_PATH)
+    if state is not None and (restart or state["target"] != target):
+        if not restart:
+            raise SystemExit(
+                f"A migration to {state['target']} is in progress. Run it again with those "
+                f"settings, or pass --restart to discard it."
+            )
+        for sid in state["subjects"]:
+            drop_staged_store(sid)
+        os.remove(MIGRATION_STATE_PATH)
+        logger.info("🗑 Discarded the previous migration")
+        state = None
+    if state is None:
+        state = {"target": target, "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "subjects": {}}
+        _write_json(MIGRATION_STATE_PATH, state)
+    return state
+
+
+def _stage_subject(subject_id, files, state, throttle, batch_size):
+    """Embed the subject's files that are not staged yet; returns the files that failed."""
+    entry = state["subjects"].setdefault(str(subject_id), {"files": {}, "swapped": False})
+    staged = entry["files"]
+    live = {str(file_id) for file_id, _ in files}
+    for file_id in [f for f in staged if f not in live]:
+        unstage_file(subject_id, int(file_id))
+        del staged[file_id]
+        _write_json(MIGRATION_STATE_PATH, state)
+
+    failed, streak = [], 0
+    pending = [(file_id, filepath) for file_id, filepath in files if str(file_id) not in staged]
+    for text_path, file_id in _text_files(subject_id, pending):
+        try:
+            staged[str(file_id)] = stage_text_file(text_path, subject_id, file_id, batch_size, throttle)
+        except Exception as e:
+            logger.warning("⚠️ Could not embed file %s of subject %s: %s", file_id, subject_id, e)
+            failed.append(file_id)
+            streak += 1
+            if streak >= MAX_CONSECUTIVE_FAILURES:
+                raise RuntimeError(f"{streak} files failed in a row, stopping: {e}") from e
+            continue
+        streak = 0
+        _write_json(MIGRATION_STATE_PATH, state)
+    return failed
+
+
+def cmd_migrate(args):
+    target = _current_config()
+    if not args.restart and _read_json(INDEX_CONFIG_PATH) == target \
+            and not os.path.exists(MIGRATION_STATE_PATH):
+        print(f"Stores are already built with {target}")
+        return 0
+    state = _load_state(target, args.restart)
+    subjects, files = _load_subjects()
+
+    # subjects deleted since the migration started
+    for sid in [s for s in state["subjects"] if int(s) not in subjects]:
+        drop_staged_store(sid)
+        del state["subjects"][sid]
+    _write_json(MIGRATION_STATE_PATH, state)
+
+    logger.info("🚚 Migrating %s subjects to %s at ≤ %s chunks/s", len(subjects), target, args.rate or "∞")
+    throttle = _Throttle(args.rate)
+    failed = {}
+    for sid in sorted(subjects):
+        if state["subjects"].get(str(sid), {}).get("swapped"):
+            continue
+        subject_failed = _stage_subject(sid, files.get(sid, []), state, throttle, args.batch_size)
+        if subject_failed:
+            failed[sid] = subject_failed
+        logger.info("🚚 Subject %s staged (%s chunks embedded so far)", sid, throttle.done)
+
+    if failed:
+        print(f"⚠️ Files that could not be embedded: {failed}. Run the command again to retry them.")
+        return 1
+    if not args.finalize:
+        print("✅ All subjects staged. Run again with --finalize to catch up and swap the new stores in.")
+        return 0
+
+    for sid in sorted(subjects):
+        entry = state["subjects"].get(str(sid))
+        if entry is None or entry["swapped"]:
+            continue
+        if not os.path.isdir(staged_store_dir(sid)):
+            # no file with text: old-format vectors would not match the new settings
+            if store_info(sid):
+                logger.warning("⚠️ Subject %s has no notes to re-embed, dropping its store", sid)
+                drop_vector_store(sid)
+        else:
+            swap_in_staged_store(sid)
+        _sync_manifest(sid, files.get(sid, []))
+        entry["swapped"] = True
+        _write_json(MIGRATION_STATE_PATH, state)
+
+    _write_json(INDEX_CONFIG_PATH, target)
+    os.remove(MIGRATION_STATE_PATH)
+    print("✅ Migration complete. Restart the app with: "
+          f"STUDYBUDDY_EMBED_MODEL={target['embed_model']} STUDYBUDDY_CHUNK_SIZE={target['chunk_size']} "
+          f"STUDYBUDDY_CHUNK_OVERLAP={target['chunk_overlap']} STUDYBUDDY_VECTOR_BACKEND={target['backend']}")
+    return 0
+
+
+# -------------------------------------------------------------
+# 🚀 CLI
+# -------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StudyBuddy AI vector index maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="per-index size, vector and chunk counts")
+    report.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    report.add_argument("--recall", action="store_true", help="also measure compact-store recall per subject")
+    report.set_defaults(func=cmd_report)
+
+    check = commands.add_parser("check", help="find orphan and missing indexes")
+    check.add_argument("--fix", action="store_true", help="delete orphans and stray store directories")
+    check.set_defaults(func=cmd_check)
+
+    rebuild = commands.add_parser("rebuild", help="re-index subjects from processed_texts")
+    targets = rebuild.add_mutually_exclusive_group(required=True)
+    targets.add_argument("subject_ids", type=int, nargs="*", default=[])
+    targets.add_argument("--all", action="store_true", help="every subject")
+    targets.add_argument("--missing", action="store_true", help="subjects `check` reports as missing")
+    rebuild.add_argument("--workers", type=int, default=REBUILD_WORKERS, help="subjects rebuilt in parallel")
+    rebuild.add_argument("--clean", action="store_true", help="drop the store first instead of reusing vectors")
+    rebuild.set_defaults(func=cmd_rebuild)
+
+    compact = commands.add_parser("compact", help="rewrite stores without deleted vectors")
+    compact_targets = compact.add_mutually_exclusive_group(required=True)
+    compact_targets.add_argument("subject_ids", type=int, nargs="*", default=[])
+    compact_targets.add_argument("--all", action="store_true", help="every store")
+    compact.set_defaults(func=cmd_compact)
+
+    migrate = commands.add_parser(
+        "migrate", help="re-embed all subjects with the STUDYBUDDY_EMBED_MODEL / _CHUNK_* settings")
+    migrate.add_argument("--rate", type=float, default=MIGRATE_RATE, help="max chunks embedded per second (0: no limit)")
+    migrate.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding request")
+    migrate.add_argument("--finalize", action="store_true", help="swap the migrated stores in when all are staged")
+    migrate.add_argument("--restart", action="store_true", help="discard a migration in progress and start over")
+    migrate.set_defaults(func=cmd_migrate)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    configure_logging()
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# ==============================================================
+# 💾 ANSWER CACHE MODULE — StudyBuddy AI
+# Reuses chat answers for repeated questions within a subject
+# ==============================================================
+
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Cache size / lifetime
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL = 6 * 60 * 60  # seconds
+
+# Near-duplicate lookup: reuse an answer when the question embedding is
+# this similar to a cached one and the retrieved context is identical
+SIMILARITY_LOOKUP = True
+SIMILARITY_THRESHOLD = 0.95
+
+
+def normalize_query(query):
+    """Lower-case, collapse whitespace and drop surrounding punctuation."""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?!.,;:")
+
+
+def context_fingerprint(docs):
+    """Stable hash of the retrieved chunks the answer was generated from."""
+    digest = hashlib.sha1()
+    for d in docs:
+        digest.update(getattr(d, "page_content", str(d)).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """Thread-safe LRU + TTL cache of answers keyed by subject, question and context."""
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (subject_id, query, fingerprint) -> entry dict
+        self._by_subject = {}  # subject_id -> set of keys
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_subject.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[key[0]]
+
+    def _expired(self, entry, now):
+        return now - entry["created"] > self.ttl
+
+    def get(self, subject_id, query, fingerprint, query_embedding=None):
+        """Return a cached answer or None."""
+        key = (subject_id, normalize_query(query), fingerprint)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                return entry["answer"]
+            if entry is not None:
+                self._drop(key)
+
+            if not (SIMILARITY_LOOKUP and query_embedding):
+                return None
+            best_key, best_score = None, SIMILARITY_THRESHOLD
+            for other in list(self._by_subject.get(subject_id, ())):
+                entry = self._entries[other]
+                if self._expired(entry, now):
+                    self._drop(other)
+                    continue
+                if other[2] != fingerprint or not entry["embedding"]:
+                    continue
+                score = _cosine(query_embedding, entry["embedding"])
+                if score >= best_score:
+                    best_key, best_score = other, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key]["answer"]
+
+    def put(self, subject_id, query, fingerprint, answer, query_embedding=None):
+        key = (subject_id, normalize_query(query), fingerprint)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": list(query_embedding) if query_embedding else None,
+                "created": time.time(),
+            }
+            self._by_subject.setdefault(subject_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_subject(self, subject_id):
+        """Forget every answer for a subject (its notes changed)."""
+        with self._lock:
+            for key in list(self._by_subject.get(subject_id, ())):
+                self._drop(key)
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,165 @@
+# ==============================================================
+# 📦 BATCH UPLOAD MODULE — StudyBuddy AI
+# Saves many uploaded files (or the contents of zip archives) to a
+# subject's upload folder in fixed-size chunks, never whole in memory
+# ==============================================================
+
+import logging
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from werkzeug.utils import secure_filename
+from text_extraction import SUPPORTED_EXTENSIONS
+from modules.corpus import processed_text_path
+
+try:
+    import fcntl  # POSIX only: serializes name reservation across worker processes
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Request size limit for batch uploads (single uploads keep MAX_CONTENT_LENGTH)
+BATCH_MAX_CONTENT_LENGTH = 512 * 1024 * 1024  # 512 MB
+
+# Most files accepted from one batch, zip members included
+BATCH_MAX_FILES = 200
+
+# Total uncompressed bytes accepted from the zip archives of one batch
+ZIP_MAX_UNCOMPRESSED = 1024 * 1024 * 1024  # 1 GB
+
+# Bytes copied per read when streaming uploads to disk
+COPY_BUFFER_SIZE = 1024 * 1024
+
+ZIP_EXTENSIONS = (".zip",)
+
+
+class UploadLimitError(ValueError):
+    """A batch exceeded BATCH_MAX_FILES or ZIP_MAX_UNCOMPRESSED."""
+
+
+@contextmanager
+def _names_lock(subject_dir):
+    """Hold subject_dir's name lock, so a free stem can't be claimed twice."""
+    with open(os.path.join(subject_dir, ".names.lock"), "w") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def unique_upload_path(subject_dir, subject_id, filename):
+    """
+    Reserve a path in subject_dir for filename that neither overwrites an
+    earlier upload nor shares its extracted text file (notes.pdf vs
+    notes.docx). The file is created empty; callers write into it and
+    remove it if saving fails.
+    """
+    stem, ext = os.path.splitext(filename)
+    with _names_lock(subject_dir):
+        taken = {os.path.splitext(name)[0] for name in os.listdir(subject_dir) if not name.startswith(".")}
+        candidate, n = stem, 1
+        while True:
+            if candidate not in taken and not os.path.exists(processed_text_path(subject_id, candidate + ext)):
+                path = os.path.join(subject_dir, candidate + ext)
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                    return path
+                except FileExistsError:
+                    pass  # created since the listing, e.g. by a process without the lock
+            candidate = f"{stem}_{n}"
+            n += 1
+
+
+def _copy_limited(src, dest_path, limit=None):
+    """Stream src to dest_path; returns bytes written (UploadLimitError beyond limit)."""
+    written = 0
+    with open(dest_path, "wb") as out:
+        while True:
+            block = src.read(COPY_BUFFER_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if limit is not None and written > limit:
+                raise UploadLimitError("Zip archive contents exceed the batch size limit")
+            out.write(block)
+    return written
+
+
+def _expand_zip(zip_path, subject_dir, subject_id, saved, skipped, budget):
+    """Save the supported members of a zip archive; returns the unused uncompressed budget."""
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile:
+        skipped.append((os.path.basename(zip_path), "not a valid zip archive"))
+        return budget
+
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            filename = secure_filename(name)
+            if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                skipped.append((info.filename, "unsupported file type"))
+                continue
+            if len(saved) >= BATCH_MAX_FILES:
+                raise UploadLimitError(f"At most {BATCH_MAX_FILES} files per batch")
+            if info.file_size > budget:
+                raise UploadLimitError("Zip archive contents exceed the batch size limit")
+
+            save_path = unique_upload_path(subject_dir, subject_id, filename)
+            try:
+                with archive.open(info) as member:
+                    # sizes in the zip header can lie: count what is actually written
+                    budget -= _copy_limited(member, save_path, budget)
+            except Exception:
+                if os.path.exists(save_path):
+                    os.remove(save_path)
+                raise
+            saved.append((filename, save_path))
+    return budget
+
+
+def save_batch(uploads, subject_dir, subject_id):
+    """
+    Save [(filename, binary stream)] uploads into subject_dir, expanding
+    zip archives. Returns (saved [(filename, path)], skipped [(name, reason)]).
+    On UploadLimitError everything saved so far is removed again.
+    """
+    os.makedirs(subject_dir, exist_ok=True)
+    saved, skipped = [], []
+    budget = ZIP_MAX_UNCOMPRESSED
+    try:
+        for original_name, stream in uploads:
+            filename = secure_filename(original_name or "")
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in ZIP_EXTENSIONS:
+                # hidden temp name, so it doesn't claim the archive's stem for its members
+                fd, zip_path = tempfile.mkstemp(suffix=".zip", prefix=".batch-", dir=subject_dir)
+                os.close(fd)
+                try:
+                    _copy_limited(stream, zip_path)
+                    budget = _expand_zip(zip_path, subject_dir, subject_id, saved, skipped, budget)
+                finally:
+                    os.remove(zip_path)
+            elif ext in SUPPORTED_EXTENSIONS:
+                if len(saved) >= BATCH_MAX_FILES:
+                    raise UploadLimitError(f"At most {BATCH_MAX_FILES} files per batch")
+                save_path = unique_upload_path(subject_dir, subject_id, filename)
+                try:
+                    _copy_limited(stream, save_path)
+                except Exception:
+                    os.remove(save_path)
+                    raise
+                saved.append((filename, save_path))
+            else:
+                skipped.append((original_name, "unsupported file type"))
+    except Exception:
+        for _, path in saved:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    logger.info("📦 Saved %s files for subject %s (%s skipped)", len(saved), subject_id, len(skipped))
+    return saved, skipped
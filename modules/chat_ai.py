@@ -1,70 +1,133 @@
 # modules/chat_ai.py
-import textwrap
-from langchain_ollama import OllamaLLM
-from modules.vector_store import get_vector_store
+import logging
+from modules.llm_client import CHAT_MODEL
+from modules.llm_scheduler import generate, stream, ModelBusyError
+from modules.vector_store import get_embeddings
+from modules.retrieval import hybrid_search, CONTEXT_K
+from modules.prompt_budget import fit_context, log_prompt_stats
+from modules.answer_cache import answer_cache, context_fingerprint, SIMILARITY_LOOKUP
+from modules.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+def _embed_query(query: str):
+    """Embed the question once so retrieval and the answer cache share it."""
+    if not SIMILARITY_LOOKUP:
+        return None
+    try:
+        with span("embed_query"):
+            return get_embeddings().embed_query(query)
+    except Exception as e:
+        logger.warning("⚠️ Query embedding failed: %s", e)
+        return None
+
+
+def _retrieve_docs(query: str, subject_id: int, k: int = CONTEXT_K, query_embedding=None) -> list:
+    """Retrieve the k best chunks (vector + BM25 hybrid search) for the question."""
+    with span("retrieve"):
+        docs = hybrid_search(query, subject_id, k=k, query_embedding=query_embedding)
+    logger.info("📚 Retrieved %d context chunks", len(docs))
+    return docs
+
+
+_PROMPT_TEMPLATE = """
+You are a helpful AI tutor for students. Use the provided context to answer concisely.
+If the context does not contain the answer, say "I don't know based on the given notes."
+
+Context:
+{context}
+
+Question:
+{query}
+
+Answer:
+"""
+
+
+def _build_prompt(query: str, docs: list) -> str:
+    """Build a tutor-style prompt, fitting the retrieved chunks (best first) into the token budget."""
+    with span("prompt_build"):
+        texts = [getattr(d, "page_content", str(d)) for d in docs]
+        texts, stats = fit_context(texts, CHAT_MODEL, _PROMPT_TEMPLATE.format(context="", query=query))
+        context = "\n\n".join(texts) if texts else "No relevant context found in uploaded notes."
+        prompt = _PROMPT_TEMPLATE.format(context=context, query=query).strip()
+    log_prompt_stats("Chat", stats)
+    return prompt
+
+
+def _busy_answer(docs: list) -> str:
+    """Degraded reply when the model is overloaded: show the best matching notes."""
+    if not docs:
+        return "The AI tutor is busy right now. Please try again in a moment."
+    excerpts = "\n\n".join(getattr(d, "page_content", str(d))[:500] for d in docs)
+    return ("The AI tutor is busy right now, so here are the most relevant parts of your notes:\n\n"
+            + excerpts)
+
 
 def get_ai_response_for_subject(query: str, subject_id: int) -> str:
     """
     Generate an AI-based response for a subject using local Ollama LLM
-    with retrieved context from that subject’s Chroma vector store.
-    Uses vectorstore.similarity_search(...) for compatibility.
+    with context retrieved from the subject's notes (modules/retrieval.py).
     """
     try:
-        print(f"🔹 Generating answer for subject {subject_id} — Query: {query}")
+        logger.info("🔹 Generating answer for subject %s — Query: %s", subject_id, query)
 
-        # 1) Load local Ollama model
-        llm = OllamaLLM(model="tinyllama:latest")
-        print("✅ Ollama model loaded successfully")
+        # 1) Retrieve similar chunks and check the answer cache
+        query_embedding = _embed_query(query)
+        docs = _retrieve_docs(query, subject_id, query_embedding=query_embedding)
+        with span("answer_cache"):
+            fingerprint = context_fingerprint(docs)
+            cached = answer_cache.get(subject_id, query, fingerprint, query_embedding)
+        if cached is not None:
+            logger.info("⚡ Answer served from cache")
+            return cached
 
-        # 2) Load vector store and retrieve similar chunks
-        vectorstore = get_vector_store(subject_id)
-        # Use similarity_search which exists on Chroma-like vectorstores
-        docs = []
-        try:
-            docs = vectorstore.similarity_search(query, k=3)
-        except Exception as e:
-            # fallback: if vectorstore exposes as_retriever with a method name
-            try:
-                retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-                # some retrievers may implement 'get_relevant_documents'
-                if hasattr(retriever, "get_relevant_documents"):
-                    docs = retriever.get_relevant_documents(query)
-                elif hasattr(retriever, "get_relevant_texts"):
-                    txts = retriever.get_relevant_texts(query)
-                    docs = [type("D", (), {"page_content": t}) for t in txts]
-                else:
-                    docs = []
-            except Exception:
-                docs = []
-
-        context = "\n\n".join([getattr(d, "page_content", str(d)) for d in docs]) if docs else "No relevant context found in uploaded notes."
-        print(f"📚 Retrieved {len(docs)} context chunks")
-
-        # 3) Build a safe tutor-style prompt
-        prompt = textwrap.dedent(f"""
-        You are a helpful AI tutor for students. Use the provided context to answer concisely.
-        If the context does not contain the answer, say "I don't know based on the given notes."
-
-        Context:
-        {context}
-
-        Question:
-        {query}
-
-        Answer:
-        """).strip()
-
-        # 4) Query the model
+        # 2) Query the local model through the scheduler
         try:
-            ai_output = llm.invoke(prompt)
-        except Exception:
-            # some versions can be called directly
-            ai_output = llm(prompt)
+            answer = generate(CHAT_MODEL, _build_prompt(query, docs))
+        except ModelBusyError as e:
+            logger.warning("⚠️ Model busy: %s", e)
+            return _busy_answer(docs)
 
-        answer = ai_output if isinstance(ai_output, str) else str(ai_output)
-        print("✅ Final AI Answer (preview):", answer[:300])
+        logger.debug("✅ Final AI Answer (preview): %s", answer[:300])
+        answer_cache.put(subject_id, query, fingerprint, answer, query_embedding)
         return answer
 
     except Exception as e:
-        print("❌ ERROR in get_ai_response_for_subject:", e)
+        logger.exception("❌ ERROR in get_ai_response_for_subject: %s", e)
         return f"[Error contacting local AI]: {e}"
+
+
+def stream_ai_response_for_subject(query: str, subject_id: int):
+    """
+    Same as get_ai_response_for_subject, but yields the answer token by
+    token as the local model produces it.
+    """
+    try:
+        logger.info("🔹 Streaming answer for subject %s — Query: %s", subject_id, query)
+        query_embedding = _embed_query(query)
+        docs = _retrieve_docs(query, subject_id, query_embedding=query_embedding)
+        with span("answer_cache"):
+            fingerprint = context_fingerprint(docs)
+            cached = answer_cache.get(subject_id, query, fingerprint, query_embedding)
+        if cached is not None:
+            logger.info("⚡ Answer served from cache")
+            yield cached
+            return
+
+        tokens = []
+        try:
+            for token in stream(CHAT_MODEL, _build_prompt(query, docs)):
+                tokens.append(token)
+                yield token
+        except ModelBusyError as e:
+            logger.warning("⚠️ Model busy: %s", e)
+            if not tokens:
+                yield _busy_answer(docs)
+            return
+        answer_cache.put(subject_id, query, fingerprint, "".join(tokens), query_embedding)
+
+    except Exception as e:
+        logger.exception("❌ ERROR in stream_ai_response_for_subject: %s", e)
+        yield f"[Error contacting local AI]: {e}"
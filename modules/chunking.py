@@ -0,0 +1,139 @@
+# ==============================================================
+# ✂️ CHUNKING MODULE — StudyBuddy AI
+# Splits extracted notes into overlapping, sentence-aware chunks
+# ==============================================================
+
+import os
+import re
+
+# Default chunking configuration (characters, ~4 chars per token).
+# Changing it re-chunks every subject: see `manage_indexes.py migrate`.
+CHUNK_SIZE = int(os.environ.get("STUDYBUDDY_CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.environ.get("STUDYBUDDY_CHUNK_OVERLAP", 150))
+
+# text_extraction.extract_text separates PDF pages with a form feed
+PAGE_BREAK = "\f"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def _split_sentences(page_text):
+    """Yield (sentence, offset_in_page) pairs for a single page."""
+    start = 0
+    for match in _SENTENCE_END.finditer(page_text):
+        sentence = page_text[start:match.start()]
+        if sentence.strip():
+            yield sentence, start
+        start = match.end()
+    if page_text[start:].strip():
+        yield page_text[start:], start
+
+
+def _split_long(sentence, offset, chunk_size):
+    """Hard-split a sentence that alone exceeds chunk_size on whitespace."""
+    while len(sentence) > chunk_size:
+        cut = sentence.rfind(" ", 0, chunk_size)
+        if cut <= 0:
+            cut = chunk_size
+        yield sentence[:cut], offset
+        offset += cut
+        rest = sentence[cut:]
+        stripped = rest.lstrip()
+        offset += len(rest) - len(stripped)
+        sentence = stripped
+    if sentence.strip():
+        yield sentence, offset
+
+
+class _ByteCursor:
+    """Maps character offsets within a page to UTF-8 byte offsets incrementally."""
+
+    def __init__(self, text):
+        self.text = text
+        self.char = 0
+        self.byte = 0
+
+    def at(self, char_pos):
+        if char_pos >= self.char:
+            self.byte += len(self.text[self.char:char_pos].encode("utf-8"))
+        else:
+            self.byte -= len(self.text[char_pos:self.char].encode("utf-8"))
+        self.char = char_pos
+        return self.byte
+
+
+def chunk_pages(pages, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Chunk an iterable of page texts.
+    Yields dicts with the chunk text, its 1-based page number, the
+    character offset of the chunk within the whole document and the
+    UTF-8 byte span (byte_offset, byte_length) it covers in the file.
+    Sentences are packed until chunk_size; the trailing sentences of a
+    chunk (up to chunk_overlap characters) are repeated in the next one.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    page_base = 0
+    byte_base = 0
+    for page_no, page_text in enumerate(pages, start=1):
+        window = []  # [(sentence, absolute_offset)]
+        length = 0
+        cursor = _ByteCursor(page_text)
+
+        def emit():
+            last, last_offset = window[-1]
+            start = cursor.at(window[0][1] - page_base)
+            end = cursor.at(last_offset - page_base + len(last))
+            return {
+                "text": " ".join(s for s, _ in window),
+                "page": page_no,
+                "offset": window[0][1],
+                "byte_offset": byte_base + start,
+                "byte_length": end - start,
+            }
+
+        for sentence, offset in _split_sentences(page_text):
+            lead = len(sentence) - len(sentence.lstrip())
+            for piece, piece_offset in _split_long(sentence.strip(), page_base + offset + lead, chunk_size):
+                if window and length + len(piece) + 1 > chunk_size:
+                    yield emit()
+                    # carry trailing sentences over as overlap
+                    carried, carried_len = [], 0
+                    for s, o in reversed(window):
+                        if carried_len + len(s) + 1 > chunk_overlap:
+                            break
+                        carried.insert(0, (s, o))
+                        carried_len += len(s) + 1
+                    window, length = carried, carried_len
+                    if length + len(piece) + 1 > chunk_size:
+                        window, length = [], 0
+                window.append((piece, piece_offset))
+                length += len(piece) + 1
+
+        if window:
+            yield emit()
+        page_base += len(page_text) + len(PAGE_BREAK)
+        byte_base += cursor.at(len(page_text)) + len(PAGE_BREAK.encode("utf-8"))
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Chunk a full extracted document (pages separated by PAGE_BREAK)."""
+    return list(chunk_pages(text.split(PAGE_BREAK), chunk_size, chunk_overlap))
+
+
+def iter_file_pages(text_file_path, block_size=64 * 1024):
+    """Read a processed text file lazily, yielding one page at a time."""
+    with open(text_file_path, "r", encoding="utf-8") as f:
+        parts = []
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            *complete, rest = block.split(PAGE_BREAK)
+            for piece in complete:
+                parts.append(piece)
+                yield "".join(parts)
+                parts = []
+            parts.append(rest)
+        yield "".join(parts)
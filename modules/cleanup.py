@@ -0,0 +1,119 @@
+# ==============================================================
+# 🗑 CLEANUP MODULE — StudyBuddy AI
+# Deleting a file or subject also removes everything derived from
+# it: vectors, extracted text, manifest entries, quiz questions
+# ==============================================================
+
+import logging
+import os
+import shutil
+from database.connection import get_db_connection
+from modules.corpus import processed_text_dir, processed_text_path, remove_file
+from modules.dedup import file_vector_ids, delete_file_chunks
+from modules.jobs import register_handler, enqueue, has_pending_job, cancel_jobs
+from modules.practice.quiz import remove_pool_questions
+from modules.vector_store import delete_vectors, drop_vector_store, compact_vector_store
+
+logger = logging.getLogger(__name__)
+
+COMPACT_JOB = "compact_vector_store"
+
+
+def _remove_path(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _text_shared(subject_id, file_id, text_path):
+    """True if another file of the subject extracts to the same .txt."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT filepath FROM subject_files WHERE subject_id=%s AND file_id<>%s",
+            (subject_id, file_id),
+        )
+        others = cursor.fetchall()
+    target = os.path.abspath(text_path)
+    return any(os.path.abspath(processed_text_path(subject_id, f["filepath"])) == target for f in others)
+
+
+# -------------------------------------------------------------
+# 📄 Single file
+# -------------------------------------------------------------
+def purge_file(file):
+    """
+    Remove the vectors, extracted text, manifest entry, quiz questions and
+    original upload of a subject_files row. Call before deleting the row;
+    errors propagate so the row is kept and the delete can be retried.
+    """
+    file_id = file["file_id"]
+    subject_id = file["subject_id"]
+
+    removed = delete_vectors(subject_id, ids=file_vector_ids(file_id), file_id=file_id)
+    delete_file_chunks(file_id=file_id)
+    remove_pool_questions(file_id=file_id)
+    remove_file(subject_id, file_id)
+
+    text_path = processed_text_path(subject_id, file["filepath"])
+    if not _text_shared(subject_id, file_id, text_path):
+        _remove_path(text_path)
+    _remove_path(file["filepath"])
+
+    if removed:
+        enqueue_compaction(subject_id)
+    logger.info("🧹 Purged file %s of subject %s (%s vectors)", file_id, subject_id, removed)
+    return removed
+
+
+# -------------------------------------------------------------
+# 📚 Whole subject
+# -------------------------------------------------------------
+def purge_subject(subject_id):
+    """
+    Remove all stored data of a subject: queued jobs, vector store,
+    extracted texts, uploads, chunk records, quiz pool and file rows.
+    The subjects row itself is deleted by the caller.
+    """
+    cancel_jobs(subject_id)
+    drop_vector_store(subject_id)
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT filepath FROM subject_files WHERE subject_id=%s", (subject_id,))
+        files = cursor.fetchall()
+    upload_dirs = set()
+    for f in files:
+        _remove_path(f["filepath"])
+        upload_dirs.add(os.path.dirname(f["filepath"]))
+    for directory in upload_dirs:
+        try:
+            os.rmdir(directory)  # only if nothing else lives there
+        except OSError:
+            pass
+    shutil.rmtree(processed_text_dir(subject_id), ignore_errors=True)
+
+    delete_file_chunks(subject_id=subject_id)
+    remove_pool_questions(subject_id=subject_id)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM subject_files WHERE subject_id=%s", (subject_id,))
+        conn.commit()
+    logger.info("🧹 Purged subject %s (%s files)", subject_id, len(files))
+
+
+# -------------------------------------------------------------
+# 🗜️ Background compaction
+# -------------------------------------------------------------
+def enqueue_compaction(subject_id):
+    """Queue a rebuild of the subject's store unless one is already pending."""
+    if has_pending_job(COMPACT_JOB, subject_id):
+        return None
+    return enqueue(COMPACT_JOB, {"subject_id": subject_id}, subject_id=subject_id)
+
+
+@register_handler(COMPACT_JOB)
+def compact_subject_store(payload):
+    return compact_vector_store(payload["subject_id"])
@@ -0,0 +1,463 @@
+# ==============================================================
+# 🗜️ COMPACT VECTOR STORE MODULE — StudyBuddy AI
+# NumPy memory-mapped alternative to Chroma for per-subject stores:
+# int8/float16 quantized unit vectors, exact or IVF search, optional
+# float32 rescoring. Exposes the subset of the Chroma collection API
+# the app uses (get / upsert / delete / count / query).
+# ==============================================================
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+from langchain_core.documents import Document
+
+# "int8" (1 byte/dim + one scale per vector) or "float16" (2 bytes/dim)
+COMPACT_DTYPE = "int8"
+
+# Also keep float32 vectors on disk and rescore the top candidates with them
+RESCORE_FLOAT32 = False
+
+# Candidates rescored per requested result
+RESCORE_FACTOR = 4
+
+# IVF (coarse clustering) is built on compaction for stores at least this large
+IVF_MIN_VECTORS = 20_000
+IVF_NPROBE = 8
+IVF_TRAIN_SAMPLE = 50_000
+IVF_ITERATIONS = 10
+
+# Rows scored per NumPy block during a scan
+SCAN_BLOCK = 16_384
+
+META_FILE = "compact.sqlite3"
+_SQLITE_MAX_PARAMS = 500
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CompactCollection:
+    """One subject's vectors: arrays in flat files, ids/documents/metadata in SQLite."""
+
+    def __init__(self, directory, dtype=COMPACT_DTYPE, keep_float32=RESCORE_FLOAT32):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, META_FILE),
+                                     timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                document TEXT,
+                metadata TEXT,
+                live INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_rows_live_id ON rows (id) WHERE live = 1;
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        settings = dict(self._conn.execute("SELECT key, value FROM settings"))
+        # an existing store keeps the format it was written with
+        self.dtype = settings.get("dtype", dtype)
+        self.keep_float32 = settings.get("keep_float32", "1" if keep_float32 else "0") == "1"
+        self.dim = int(settings["dim"]) if "dim" in settings else None
+        self._arrays = None
+        self._live = None
+        self._data_version = None
+
+    # ---------------------------------------------------------
+    # files
+    # ---------------------------------------------------------
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def _vector_file(self):
+        return self._path("vectors.i8" if self.dtype == "int8" else "vectors.f16")
+
+    def _itemsize(self):
+        return 1 if self.dtype == "int8" else 2
+
+    def _memmap(self, path, dtype, width):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        rows = size // (np.dtype(dtype).itemsize * width)
+        if not rows:
+            return np.zeros((0, width) if width > 1 else (0,), dtype=dtype)
+        shape = (rows, width) if width > 1 else (rows,)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def _fetch(self, sql, params=()):
+        """Run a read on the shared connection, serialized with writes."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _load(self):
+        """Memory-map the arrays and live-row mask, reloading after any write."""
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._arrays is not None and version == self._data_version:
+            return self._arrays, self._live
+        arrays = {}
+        if self.dim:
+            vec_dtype = np.int8 if self.dtype == "int8" else np.float16
+            arrays["vectors"] = self._memmap(self._vector_file, vec_dtype, self.dim)
+            if self.dtype == "int8":
+                arrays["scales"] = self._memmap(self._path("scales.f32"), np.float32, 1)
+            if self.keep_float32:
+                arrays["exact"] = self._memmap(self._path("vectors.f32"), np.float32, self.dim)
+            if os.path.exists(self._path("ivf_centroids.npy")):
+                arrays["centroids"] = np.load(self._path("ivf_centroids.npy"))
+                arrays["assign"] = np.load(self._path("ivf_assign.npy"), mmap_mode="r")
+        n = len(arrays["vectors"]) if arrays else 0
+        live = np.zeros(n, dtype=bool)
+        rows = np.fromiter((r[0] for r in self._conn.execute("SELECT row FROM rows WHERE live = 1")),
+                           dtype=np.int64)
+        live[rows[rows < n]] = True
+        self._arrays, self._live, self._data_version = arrays, live, version
+        return arrays, live
+
+    def _invalidate(self):
+        self._arrays = None
+
+    def _committed_rows(self):
+        """Array rows backed by committed SQLite rows (every appended row gets one)."""
+        return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+
+    def _truncate_arrays(self, rows):
+        """Cut the array files back to `rows` rows, dropping uncommitted appends."""
+        self._invalidate()
+        files = [(self._vector_file, self._itemsize() * self.dim)]
+        if self.dtype == "int8":
+            files.append((self._path("scales.f32"), 4))
+        if self.keep_float32:
+            files.append((self._path("vectors.f32"), 4 * self.dim))
+        for path, row_bytes in files:
+            if os.path.exists(path) and os.path.getsize(path) > rows * row_bytes:
+                os.truncate(path, rows * row_bytes)
+
+    def _dequantize(self, rows):
+        arrays, _ = self._load()
+        if "exact" in arrays:
+            return np.asarray(arrays["exact"][rows], dtype=np.float32)
+        vectors = np.asarray(arrays["vectors"][rows], dtype=np.float32)
+        if self.dtype == "int8":
+            vectors *= np.asarray(arrays["scales"][rows], dtype=np.float32)[:, None]
+        return vectors
+
+    # ---------------------------------------------------------
+    # Chroma-compatible collection API
+    # ---------------------------------------------------------
+    def count(self):
+        return self._fetch("SELECT COUNT(*) FROM rows WHERE live = 1")[0][0]
+
+    def upsert(self, ids, embeddings, metadatas=None, documents=None):
+        """Insert or replace vectors by id (replaced rows are tombstoned)."""
+        if not len(ids):
+            return
+        vectors = _normalize(embeddings)
+        metadatas = metadatas or [None] * len(ids)
+        documents = documents or [None] * len(ids)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", [
+                    ("dim", str(self.dim)), ("dtype", self.dtype),
+                    ("keep_float32", "1" if self.keep_float32 else "0"),
+                ])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store ({self.dim})")
+
+            # row offsets come from SQLite, and arrays appended by a write that
+            # never committed (crash, exception) are cut off, so files stay aligned
+            start = self._committed_rows()
+            self._truncate_arrays(start)
+            try:
+                if self.dtype == "int8":
+                    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+                    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+                    with open(self._path("scales.f32"), "ab") as f:
+                        f.write(scales.astype(np.float32).tobytes())
+                else:
+                    quantized = vectors.astype(np.float16)
+                with open(self._vector_file, "ab") as f:
+                    f.write(quantized.tobytes())
+                if self.keep_float32:
+                    with open(self._path("vectors.f32"), "ab") as f:
+                        f.write(vectors.tobytes())
+            except Exception:
+                self._truncate_arrays(start)
+                raise
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for part_start in range(0, len(ids), _SQLITE_MAX_PARAMS):
+                    part = list(ids[part_start:part_start + _SQLITE_MAX_PARAMS])
+                    self._conn.execute(
+                        f"UPDATE rows SET live = 0 WHERE live = 1 AND id IN ({','.join('?' * len(part))})",
+                        part,
+                    )
+                latest = {vid: i for i, vid in enumerate(ids)}  # last occurrence wins
+                self._conn.executemany(
+                    "INSERT INTO rows (row, id, document, metadata, live) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + i, vid, doc, json.dumps(meta) if meta is not None else None,
+                         1 if latest[vid] == i else 0)
+                        for i, (vid, doc, meta) in enumerate(zip(ids, documents, metadatas))
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._truncate_arrays(start)
+                raise
+            self._invalidate()
+
+    add = upsert
+
+    def _where_sql(self, ids=None, where=None):
+        clauses, params = ["live = 1"], []
+        if ids is not None:
+            ids = list(ids)
+            clauses.append(f"id IN ({','.join('?' * len(ids))})" if ids else "0")
+            params += ids
+        for key, value in (where or {}).items():
+            clauses.append("json_extract(metadata, ?) = ?")
+            params += [f"$.{key}", value]
+        return " AND ".join(clauses), params
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if ids is not None and len(ids) > _SQLITE_MAX_PARAMS:
+                ids = list(ids)
+                for start in range(0, len(ids), _SQLITE_MAX_PARAMS):
+                    self.delete(ids=ids[start:start + _SQLITE_MAX_PARAMS], where=where)
+                return
+            clause, params = self._where_sql(ids, where)
+            self._conn.execute(f"UPDATE rows SET live = 0 WHERE {clause}", params)
+            self._invalidate()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("metadatas", "documents")):
+        if ids is not None and len(ids) > _SQLITE_MAX_PARAMS:
+            ids = list(ids)
+            parts = [self.get(ids=ids[s:s + _SQLITE_MAX_PARAMS], where=where, include=include)
+                     for s in range(0, len(ids), _SQLITE_MAX_PARAMS)]
+            return {key: [v for p in parts for v in (p[key] or [])] if parts[0][key] is not None else None
+                    for key in parts[0]}
+        clause, params = self._where_sql(ids, where)
+        sql = f"SELECT row, id, document, metadata FROM rows WHERE {clause} ORDER BY row"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset or 0]
+        rows = self._fetch(sql, params)
+        return self._result([r[0] for r in rows], rows, include)
+
+    def _result(self, row_numbers, rows, include):
+        result = {"ids": [r[1] for r in rows], "embeddings": None, "documents": None, "metadatas": None}
+        if "documents" in include:
+            result["documents"] = [r[2] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[3]) if r[3] else None for r in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self._dequantize(np.asarray(row_numbers, dtype=np.int64)).tolist() if rows else []
+        return result
+
+    def query(self, query_embeddings, n_results=10, where=None,
+              include=("metadatas", "documents", "distances")):
+        """Nearest neighbours by cosine similarity; distances are 1 - cosine."""
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": None}
+        for query in query_embeddings:
+            row_numbers, scores = self._search(query, n_results, where)
+            rows = []
+            if len(row_numbers):
+                placeholders = ",".join("?" * len(row_numbers))
+                by_row = {r[0]: r for r in self._fetch(
+                    f"SELECT row, id, document, metadata FROM rows WHERE row IN ({placeholders})",
+                    [int(r) for r in row_numbers],
+                )}
+                rows = [by_row[int(r)] for r in row_numbers]
+            partial = self._result(row_numbers, rows, include)
+            result["ids"].append(partial["ids"])
+            result["documents"].append(partial["documents"])
+            result["metadatas"].append(partial["metadatas"])
+            result["distances"].append([float(1 - s) for s in scores])
+        return result
+
+    # ---------------------------------------------------------
+    # search
+    # ---------------------------------------------------------
+    def _candidate_rows(self, query, arrays, live):
+        """All live rows, or only those in the closest IVF lists (+ rows added since)."""
+        if "centroids" not in arrays:
+            return np.flatnonzero(live)
+        assign = arrays["assign"]
+        probes = np.argsort(arrays["centroids"] @ query)[::-1][:IVF_NPROBE]
+        candidates = np.flatnonzero(np.isin(assign, probes))
+        tail = np.arange(len(assign), len(live))
+        candidates = np.concatenate([candidates, tail])
+        return candidates[live[candidates]]
+
+    def _search(self, query, k, where=None):
+        with self._lock:
+            arrays, live = self._load()
+        if not arrays or not live.any():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if where:
+            clause, params = self._where_sql(where=where)
+            allowed = np.zeros_like(live)
+            rows = [r[0] for r in self._fetch(f"SELECT row FROM rows WHERE {clause}", params)]
+            allowed[[r for r in rows if r < len(allowed)]] = True
+            live = live & allowed
+
+        query = _normalize(query)
+        candidates = self._candidate_rows(query, arrays, live)
+        if not len(candidates):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        vectors = arrays["vectors"]
+        scores = np.empty(len(candidates), dtype=np.float32)
+        for start in range(0, len(candidates), SCAN_BLOCK):
+            block = candidates[start:start + SCAN_BLOCK]
+            part = np.asarray(vectors[block], dtype=np.float32) @ query
+            if self.dtype == "int8":
+                part *= np.asarray(arrays["scales"][block], dtype=np.float32)
+            scores[start:start + SCAN_BLOCK] = part
+
+        keep = min(len(candidates), k * RESCORE_FACTOR if "exact" in arrays else k)
+        top = np.argpartition(-scores, keep - 1)[:keep]
+        rows, scores = candidates[top], scores[top]
+        if "exact" in arrays:
+            scores = np.asarray(arrays["exact"][rows], dtype=np.float32) @ query
+        order = np.argsort(-scores)[:k]
+        return rows[order], scores[order]
+
+    def build_ivf(self, min_vectors=IVF_MIN_VECTORS):
+        """Cluster the live vectors (k-means) so queries only scan the nearest lists."""
+        with self._lock:
+            arrays, live = self._load()
+            rows = np.flatnonzero(live)
+            for name in ("ivf_centroids.npy", "ivf_assign.npy"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            if len(rows) < min_vectors:
+                self._invalidate()
+                return 0
+
+            nlist = max(1, int(np.sqrt(len(rows))))
+            rng = np.random.default_rng(0)
+            sample = rng.choice(rows, size=min(len(rows), IVF_TRAIN_SAMPLE), replace=False)
+            data = self._dequantize(np.sort(sample))
+            centroids = data[rng.choice(len(data), size=nlist, replace=False)]
+            for _ in range(IVF_ITERATIONS):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = data[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+
+            assign = np.full(len(live), -1, dtype=np.int32)
+            for start in range(0, len(live), SCAN_BLOCK):
+                block = np.arange(start, min(start + SCAN_BLOCK, len(live)))
+                assign[block] = np.argmax(self._dequantize(block) @ centroids.T, axis=1)
+            np.save(self._path("ivf_centroids.npy"), centroids.astype(np.float32))
+            np.save(self._path("ivf_assign.npy"), assign)
+            self._invalidate()
+            return nlist
+
+    def disk_size(self):
+        return sum(os.path.getsize(os.path.join(self.directory, f)) for f in os.listdir(self.directory))
+
+    def close(self):
+        with self._lock:
+            self._arrays = None
+            self._conn.close()
+
+
+class CompactStore:
+    """Minimal LangChain-vectorstore-like wrapper around a CompactCollection."""
+
+    def __init__(self, persist_directory, embedding_function=None, dtype=COMPACT_DTYPE,
+                 keep_float32=RESCORE_FLOAT32):
+        self._collection = CompactCollection(persist_directory, dtype, keep_float32)
+        self._embedding_function = embedding_function
+
+    def persist(self):
+        """Writes are durable as they happen; kept for Chroma compatibility."""
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        result = self._collection.query([embedding], n_results=k)
+        return [
+            Document(page_content=text or "", metadata=meta or {})
+            for text, meta in zip(result["documents"][0], result["metadatas"][0])
+        ]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k=k)
+
+    def close(self):
+        self._collection.close()
+
+
+def is_compact_store(directory):
+    return os.path.exists(os.path.join(directory, META_FILE))
+
+
+# -------------------------------------------------------------
+# 📏 Recall / size check against an existing (Chroma) collection
+# -------------------------------------------------------------
+def measure_recall(source_collection, k=10, samples=50, dtype=COMPACT_DTYPE,
+                   keep_float32=RESCORE_FLOAT32, seed=0):
+    """
+    Copy a collection into a temporary compact store and compare top-k
+    neighbours for sampled stored vectors used as queries against
+    (a) exact float32 cosine search and (b) the source collection's own
+    query results. Returns recall figures and bytes per vector.
+    """
+    data = source_collection.get(include=["embeddings", "documents", "metadatas"])
+    ids = data["ids"]
+    if len(ids) < 2:
+        return {"vectors": len(ids)}
+    exact = _normalize(data["embeddings"])
+
+    tmp_dir = tempfile.mkdtemp(prefix="compact_recall_")
+    try:
+        store = CompactCollection(tmp_dir, dtype, keep_float32)
+        store.upsert(ids, exact, data["metadatas"], data["documents"])
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(len(ids), size=min(samples, len(ids)), replace=False)
+
+        hits_exact = hits_source = total = 0
+        for qi in queries:
+            want = min(k, len(ids) - 1)
+            truth_order = np.argsort(-(exact @ exact[qi]))
+            truth = [ids[i] for i in truth_order if i != qi][:want]
+            got = [i for i in store.query([exact[qi]], n_results=want + 1)["ids"][0] if i != ids[qi]][:want]
+            source = [i for i in source_collection.query(query_embeddings=[data["embeddings"][qi]],
+                                                         n_results=want + 1)["ids"][0] if i != ids[qi]][:want]
+            hits_exact += len(set(got) & set(truth))
+            hits_source += len(set(got) & set(source))
+            total += want
+        compact_bytes = store.disk_size()
+        store.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {
+        "vectors": len(ids),
+        "k": k,
+        "recall_vs_exact": round(hits_exact / total, 4),
+        "recall_vs_source": round(hits_source / total, 4),
+        "compact_bytes": compact_bytes,
+        "compact_bytes_per_vector": round(compact_bytes / len(ids), 1),
+        "float32_bytes_per_vector": exact.shape[1] * 4,
+    }
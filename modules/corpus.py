@@ -0,0 +1,188 @@
+# ==============================================================
+# 📚 CORPUS MODULE — StudyBuddy AI
+# Per-subject manifest of processed note files: sizes, hashes and
+# the byte span of every chunk, so consumers can seek straight to
+# the text they need instead of re-reading the whole directory
+# ==============================================================
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from modules.chunking import chunk_pages, iter_file_pages, CHUNK_SIZE, CHUNK_OVERLAP
+from modules.dedup import file_sha256
+
+try:
+    import fcntl  # POSIX only: serializes manifest updates across worker processes
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_TEXT_DIR = os.path.join("static", "uploads", "processed_texts")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+_manifests = {}  # subject_id -> (mtime, manifest)
+_lock = threading.RLock()
+
+
+def processed_text_dir(subject_id):
+    return os.path.join(PROCESSED_TEXT_DIR, str(subject_id))
+
+
+def processed_text_path(subject_id, filepath):
+    """Where the extracted text of an uploaded file lives."""
+    name = os.path.splitext(os.path.basename(filepath))[0] + ".txt"
+    return os.path.join(processed_text_dir(subject_id), name)
+
+
+def _manifest_path(subject_id):
+    return os.path.join(processed_text_dir(subject_id), MANIFEST_NAME)
+
+
+def _empty_manifest(subject_id):
+    return {"version": MANIFEST_VERSION, "subject_id": subject_id, "files": {}}
+
+
+# -------------------------------------------------------------
+# 🗄️ Load / save
+# -------------------------------------------------------------
+def load_manifest(subject_id):
+    """Return the subject's manifest (cached until the file changes on disk)."""
+    path = _manifest_path(subject_id)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return _empty_manifest(subject_id)
+
+    with _lock:
+        cached = _manifests.get(subject_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Unreadable corpus manifest for subject %s: %s", subject_id, e)
+        return _empty_manifest(subject_id)
+    with _lock:
+        _manifests[subject_id] = (mtime, manifest)
+    return manifest
+
+
+def _save_manifest(subject_id, manifest):
+    path = _manifest_path(subject_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    with _lock:
+        _manifests.pop(subject_id, None)
+
+
+@contextmanager
+def _updating(subject_id):
+    """Read-modify-write the manifest under an in-process and a file lock."""
+    os.makedirs(processed_text_dir(subject_id), exist_ok=True)
+    with _lock:
+        lock_file = open(_manifest_path(subject_id) + ".lock", "w")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _manifests.pop(subject_id, None)
+            manifest = load_manifest(subject_id)
+            yield manifest
+            manifest["updated_at"] = time.time()
+            _save_manifest(subject_id, manifest)
+        finally:
+            lock_file.close()
+
+
+# -------------------------------------------------------------
+# ✏️ Updates (upload / delete)
+# -------------------------------------------------------------
+def index_file(subject_id, file_id, text_path,
+               chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Record a processed text file in the manifest. Chunks are numbered the
+    same way as in the vector store, so (file_id, chunk_index) identifies
+    the same text in both.
+    """
+    chunks = [
+        [c["byte_offset"], c["byte_length"], c["page"]]
+        for c in chunk_pages(iter_file_pages(text_path), chunk_size, chunk_overlap)
+    ]
+    entry = {
+        "name": os.path.basename(text_path),
+        "size": os.path.getsize(text_path),
+        "sha256": file_sha256(text_path),
+        "chunks": chunks,  # [byte_offset, byte_length, page]
+    }
+    with _updating(subject_id) as manifest:
+        manifest["files"][str(file_id)] = entry
+    logger.info("📚 Manifest: %s chunks of file %s (subject %s)", len(chunks), file_id, subject_id)
+    return entry
+
+
+def remove_file(subject_id, file_id):
+    """Drop a file from the manifest. Returns its entry (or None)."""
+    if not os.path.exists(_manifest_path(subject_id)):
+        return None
+    with _updating(subject_id) as manifest:
+        return manifest["files"].pop(str(file_id), None)
+
+
+def rebuild_manifest(subject_id, files):
+    """Re-index a subject from (file_id, uploaded filepath) pairs, e.g. for notes uploaded before manifests existed."""
+    indexed = 0
+    for file_id, filepath in files:
+        text_path = processed_text_path(subject_id, filepath)
+        if os.path.exists(text_path):
+            index_file(subject_id, file_id, text_path)
+            indexed += 1
+    return indexed
+
+
+# -------------------------------------------------------------
+# 🔍 Reads
+# -------------------------------------------------------------
+def corpus_stats(subject_id):
+    """File, chunk and byte totals of a subject's notes."""
+    files = load_manifest(subject_id)["files"]
+    return {
+        "files": len(files),
+        "chunks": sum(len(f["chunks"]) for f in files.values()),
+        "bytes": sum(f["size"] for f in files.values()),
+    }
+
+
+def read_chunk(subject_id, file_id, chunk_index):
+    """Text of one chunk, read by seeking into the processed file."""
+    entry = load_manifest(subject_id)["files"].get(str(file_id))
+    if entry is None or not 0 <= chunk_index < len(entry["chunks"]):
+        return None
+    byte_offset, byte_length, _ = entry["chunks"][chunk_index]
+    try:
+        with open(os.path.join(processed_text_dir(subject_id), entry["name"]), "rb") as f:
+            f.seek(byte_offset)
+            return f.read(byte_length).decode("utf-8", errors="replace")
+    except OSError as e:
+        logger.warning("⚠️ Could not read chunk %s of file %s: %s", chunk_index, file_id, e)
+        return None
+
+
+def sample_chunks(subject_id, count):
+    """Up to `count` random chunks as dicts with file_id, chunk_index and text."""
+    files = load_manifest(subject_id)["files"]
+    refs = [(fid, idx) for fid, f in files.items() for idx in range(len(f["chunks"]))]
+    picked = random.sample(refs, min(count, len(refs)))
+    chunks = []
+    for fid, idx in picked:
+        text = read_chunk(subject_id, fid, idx)
+        if text:
+            chunks.append({"file_id": int(fid), "chunk_index": idx, "text": text})
+    return chunks
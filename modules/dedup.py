@@ -0,0 +1,103 @@
+# ==============================================================
+# 🧬 DEDUPLICATION MODULE — StudyBuddy AI
+# Content hashes for uploaded files and indexed chunks
+# ==============================================================
+
+import hashlib
+from database.connection import get_db_connection
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------
+# 📄 File level
+# -------------------------------------------------------------
+def find_file_by_hash(content_hash, subject_id=None, exclude_file_id=None):
+    """Return a subject_files row with the same content (optionally in one subject)."""
+    query = "SELECT * FROM subject_files WHERE content_hash=%s"
+    params = [content_hash]
+    if subject_id is not None:
+        query += " AND subject_id=%s"
+        params.append(subject_id)
+    if exclude_file_id is not None:
+        query += " AND file_id<>%s"
+        params.append(exclude_file_id)
+    query += " ORDER BY file_id LIMIT 1"
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+
+# -------------------------------------------------------------
+# 🧩 Chunk level
+# -------------------------------------------------------------
+def find_chunk_vectors(chunk_hashes):
+    """Map chunk hash -> (subject_id, vector_id) of an already embedded copy."""
+    if not chunk_hashes:
+        return {}
+    placeholders = ",".join(["%s"] * len(chunk_hashes))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT chunk_hash, subject_id, vector_id FROM file_chunks WHERE chunk_hash IN ({placeholders})",
+            list(chunk_hashes),
+        )
+        rows = cursor.fetchall()
+    return {r["chunk_hash"]: (r["subject_id"], r["vector_id"]) for r in rows}
+
+
+def record_file_chunks(file_id, subject_id, rows):
+    """Remember which vectors belong to a file: rows of (chunk_index, chunk_hash, vector_id)."""
+    if not rows:
+        return
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT INTO file_chunks (file_id, subject_id, chunk_index, chunk_hash, vector_id)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE chunk_hash=VALUES(chunk_hash), vector_id=VALUES(vector_id)
+            """,
+            [(file_id, subject_id, idx, h, vid) for idx, h, vid in rows],
+        )
+        conn.commit()
+
+
+def file_vector_ids(file_id):
+    """Vector ids recorded for a file's chunks."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT vector_id FROM file_chunks WHERE file_id=%s", (file_id,))
+        return [r["vector_id"] for r in cursor.fetchall()]
+
+
+def trim_file_chunks(file_id, chunk_count):
+    """Forget a file's chunk records from chunk_count on (it was re-chunked into fewer chunks)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM file_chunks WHERE file_id=%s AND chunk_index>=%s", (file_id, chunk_count))
+        conn.commit()
+
+
+def delete_file_chunks(file_id=None, subject_id=None):
+    """Forget the chunk records of a file or of a whole subject."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if file_id is not None:
+            cursor.execute("DELETE FROM file_chunks WHERE file_id=%s", (file_id,))
+        if subject_id is not None:
+            cursor.execute("DELETE FROM file_chunks WHERE subject_id=%s", (subject_id,))
+        conn.commit()
@@ -0,0 +1,152 @@
+# ==============================================================
+# 🗃️ EMBEDDING CACHE MODULE — StudyBuddy AI
+# Disk-backed (SQLite, float32 BLOB) cache in front of the embedding model
+# ==============================================================
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from langchain_core.embeddings import Embeddings
+
+EMBED_CACHE_PATH = os.path.join("vector_dbs", "embedding_cache.sqlite3")
+
+# Least recently used vectors are evicted beyond this many entries
+EMBED_CACHE_MAX_ENTRIES = 200_000
+
+# Fraction of entries removed per eviction pass
+EVICT_FRACTION = 0.1
+
+_SQLITE_MAX_PARAMS = 500
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector):
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object; vectors are memoized on disk keyed by
+    (model name, kind, sha256 of the text). Thread-safe.
+    """
+
+    def __init__(self, inner, model_name, path=EMBED_CACHE_PATH,
+                 max_entries=EMBED_CACHE_MAX_ENTRIES):
+        self.inner = inner
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._size = self._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, kind, text_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------------------------------------
+    # lookup / store
+    # ---------------------------------------------------------
+    def _lookup(self, kind, hashes):
+        conn = self._conn()
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), _SQLITE_MAX_PARAMS):
+            part = unique[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model=? AND kind=? "
+                f"AND text_hash IN ({placeholders})",
+                [self.model_name, kind, *part],
+            ).fetchall()
+            found.update((h, _unpack(blob)) for h, blob in rows)
+        if found:
+            conn.executemany(
+                "UPDATE embeddings SET last_used=? WHERE model=? AND kind=? AND text_hash=?",
+                [(time.time(), self.model_name, kind, h) for h in found],
+            )
+        return found
+
+    def _store(self, kind, items):
+        conn = self._conn()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, kind, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(self.model_name, kind, h, _pack(v), now) for h, v in items],
+        )
+        with self._lock:
+            self._size += len(items)
+            over = self._size > self.max_entries
+        if over:
+            self._evict()
+
+    def _evict(self):
+        conn = self._conn()
+        remove = max(1, int(self.max_entries * EVICT_FRACTION))
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (self._size - self.max_entries + remove,),
+        )
+        with self._lock:
+            self._size = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _embed(self, kind, texts, embed_missing):
+        hashes = [_text_hash(t) for t in texts]
+        cached = self._lookup(kind, hashes)
+        missing = {h: t for h, t in zip(hashes, texts) if h not in cached}
+        with self._lock:
+            self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+            self.misses += len(missing)
+        if missing:
+            vectors = embed_missing(list(missing.values()))
+            new = list(zip(missing.keys(), vectors))
+            self._store(kind, new)
+            cached.update(new)
+        return [list(cached[h]) for h in hashes]
+
+    # ---------------------------------------------------------
+    # Embeddings interface
+    # ---------------------------------------------------------
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._embed("doc", texts, self.inner.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda ts: [self.inner.embed_query(ts[0])])[0]
+
+    def stats(self):
+        """Hit/miss counters for this process and entries on disk."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": self._size}
@@ -0,0 +1,127 @@
+# ==============================================================
+# 🌐 GLOBAL SEARCH MODULE — StudyBuddy AI
+# Search all of a user's subjects at once: the query is embedded once,
+# every subject store is searched in parallel and the hits are merged
+# by cosine similarity with subject and file attribution
+# ==============================================================
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from database.connection import get_db_connection
+from modules.metrics import span
+from modules.vector_store import get_embeddings, search_subject
+
+logger = logging.getLogger(__name__)
+
+# Results returned by a global search
+GLOBAL_SEARCH_K = 10
+
+# Candidates taken from each subject before merging
+PER_SUBJECT_K = 5
+
+# Subject stores searched at the same time (per app process)
+GLOBAL_SEARCH_WORKERS = 8
+
+# Seconds to wait for all subjects; slower ones are left out of the results
+GLOBAL_SEARCH_TIMEOUT = 10.0
+
+# Characters of chunk text returned per hit
+SNIPPET_CHARS = 400
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GLOBAL_SEARCH_WORKERS,
+                                           thread_name_prefix="global-search")
+        return _executor
+
+
+def _user_subjects(user_id):
+    """{subject_id: subject_name} of the user's subjects."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT subject_id, subject_name FROM subjects WHERE user_id=%s", (user_id,))
+        return {row["subject_id"]: row["subject_name"] for row in cursor.fetchall()}
+
+
+def _file_names(file_ids):
+    """{file_id: filename} for the files that produced the hits."""
+    file_ids = [f for f in set(file_ids) if f is not None and f >= 0]
+    if not file_ids:
+        return {}
+    placeholders = ",".join(["%s"] * len(file_ids))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT file_id, filename FROM subject_files WHERE file_id IN ({placeholders})", file_ids
+        )
+        return {row["file_id"]: row["filename"] for row in cursor.fetchall()}
+
+
+def search_all_subjects(user_id, query, k=GLOBAL_SEARCH_K):
+    """
+    The k chunks most similar to the query across all of the user's subjects.
+    Returns {"results": [...], "subjects_searched": n, "timed_out": [...],
+    "failed": [...]}; each result has score (cosine similarity), subject,
+    file, page and a text snippet.
+    """
+    subjects = _user_subjects(user_id)
+    if not subjects or not query.strip():
+        return {"results": [], "subjects_searched": 0, "timed_out": [], "failed": []}
+
+    with span("embed_query"):
+        query_embedding = get_embeddings().embed_query(query)
+
+    executor = _get_executor()
+    futures = {
+        executor.submit(search_subject, subject_id, query_embedding, PER_SUBJECT_K): subject_id
+        for subject_id in subjects
+    }
+    with span("global_search_fanout"):
+        done, pending = wait(futures, timeout=GLOBAL_SEARCH_TIMEOUT)
+    for future in pending:
+        future.cancel()
+
+    hits, failed = [], []
+    for future in done:
+        subject_id = futures[future]
+        try:
+            hits.extend((subject_id, hit) for hit in future.result())
+        except Exception as e:
+            logger.warning("⚠️ Global search of subject %s failed: %s", subject_id, e)
+            failed.append(subject_id)
+    timed_out = sorted(futures[f] for f in pending)
+    if timed_out:
+        logger.warning("⚠️ Global search skipped %s slow subjects: %s", len(timed_out), timed_out)
+
+    # cosine similarity is computed the same way for every store, so hits merge directly
+    hits.sort(key=lambda pair: pair[1]["score"], reverse=True)
+    hits = hits[:k]
+    names = _file_names(hit["metadata"].get("file_id") for _, hit in hits)
+
+    results = []
+    for subject_id, hit in hits:
+        meta = hit["metadata"]
+        file_id = meta.get("file_id")
+        results.append({
+            "score": round(hit["score"], 4),
+            "subject_id": subject_id,
+            "subject_name": subjects[subject_id],
+            "file_id": file_id if file_id is not None and file_id >= 0 else None,
+            "filename": names.get(file_id, meta.get("source")),
+            "page": meta.get("page"),
+            "chunk_index": meta.get("chunk_index"),
+            "text": hit["text"][:SNIPPET_CHARS],
+        })
+    return {
+        "results": results,
+        "subjects_searched": len(done) - len(failed),
+        "timed_out": timed_out,
+        "failed": sorted(failed),
+    }
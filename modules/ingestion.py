@@ -0,0 +1,151 @@
+# ==============================================================
+# 📥 INGESTION MODULE — StudyBuddy AI
+# Upload → extract → embed pipeline, run by the background job workers
+# ==============================================================
+
+import logging
+import os
+import shutil
+from text_extraction import extract_text, extract_texts
+from database.connection import get_db_connection
+from modules.cleanup import purge_file
+from modules.dedup import find_file_by_hash
+from modules.corpus import processed_text_dir, processed_text_path, index_file
+from modules.jobs import register_handler, enqueue, PermanentJobError
+from modules.vector_store import add_text_file_to_vector_db, add_text_files_to_vector_db
+from modules.practice.quiz import enqueue_pool_refill
+from modules.metrics import span
+
+logger = logging.getLogger(__name__)
+
+BATCH_JOB = "ingest_batch"
+
+
+def enqueue_ingestion(file_id, subject_id, save_path, content_hash=None):
+    """Queue an uploaded file for extraction and indexing."""
+    return enqueue(
+        "ingest_file",
+        {"file_id": file_id, "subject_id": subject_id, "save_path": save_path,
+         "content_hash": content_hash},
+        subject_id=subject_id,
+    )
+
+
+def enqueue_batch_ingestion(subject_id, files):
+    """Queue several uploads (dicts with file_id, save_path, content_hash) to be ingested together."""
+    return enqueue(BATCH_JOB, {"subject_id": subject_id, "files": files}, subject_id=subject_id)
+
+
+def _file_exists(file_id):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM subject_files WHERE file_id=%s", (file_id,))
+        return cursor.fetchone() is not None
+
+
+def _reuse_duplicate_text(subject_id, file_id, content_hash, processed_dest):
+    """Copy the extracted text of an identical earlier upload (any subject); False if there is none."""
+    if not content_hash:
+        return False
+    duplicate = find_file_by_hash(content_hash, exclude_file_id=file_id)
+    duplicate_text = duplicate and processed_text_path(duplicate["subject_id"], duplicate["filepath"])
+    if not (duplicate_text and os.path.exists(duplicate_text)):
+        return False
+    if os.path.abspath(duplicate_text) != os.path.abspath(processed_dest):
+        shutil.copyfile(duplicate_text, processed_dest)
+    logger.info("♻️ Reusing extracted text of file %s for file %s", duplicate['file_id'], file_id)
+    return True
+
+
+def _finish_file(subject_id, file_id, save_path, processed_dest):
+    """Record the file in the corpus manifest; False if it was deleted meanwhile."""
+    with span("corpus_index"):
+        index_file(subject_id, file_id, processed_dest)
+
+    # deleted while we were indexing: remove what was just written
+    if not _file_exists(file_id):
+        purge_file({"file_id": file_id, "subject_id": subject_id, "filepath": save_path})
+        logger.info("🧹 File %s was deleted during ingestion", file_id)
+        return False
+    return True
+
+
+@register_handler("ingest_file")
+def ingest_file(payload):
+    """Extract text from an uploaded file and index it in the subject's store."""
+    file_id = payload["file_id"]
+    subject_id = payload["subject_id"]
+    save_path = payload["save_path"]
+
+    if not os.path.exists(save_path):
+        raise PermanentJobError(f"Uploaded file missing: {save_path}")
+
+    subject_text_dir = processed_text_dir(subject_id)
+    os.makedirs(subject_text_dir, exist_ok=True)
+    processed_dest = processed_text_path(subject_id, save_path)
+
+    # identical file already extracted (in any subject)? copy its text
+    if not _reuse_duplicate_text(subject_id, file_id, payload.get("content_hash"), processed_dest):
+        with span("extract_text"):
+            extracted_path = extract_text(save_path, processed_dest)
+        if not extracted_path:
+            raise PermanentJobError(f"Unsupported file format: {save_path}")
+
+    with span("vector_index"):
+        count = add_text_file_to_vector_db(processed_dest, subject_id, file_id=file_id, raise_errors=True)
+    if not _finish_file(subject_id, file_id, save_path, processed_dest):
+        return 0
+
+    # new material: generate quiz questions from it ahead of time
+    enqueue_pool_refill(subject_id)
+    return count
+
+
+@register_handler(BATCH_JOB)
+def ingest_batch(payload):
+    """
+    Ingest many uploads of one subject together: texts are extracted in
+    parallel worker processes, then all files are embedded in large batches
+    in a single locked write to the subject's store. Files that fail here
+    get their own ingest_file job, so they are retried and reported one by one.
+    """
+    subject_id = payload["subject_id"]
+    os.makedirs(processed_text_dir(subject_id), exist_ok=True)
+
+    ready, to_extract, failed = [], {}, []
+    for f in payload["files"]:
+        if not os.path.exists(f["save_path"]) or not _file_exists(f["file_id"]):
+            continue  # deleted since it was queued
+        processed_dest = processed_text_path(subject_id, f["save_path"])
+        if _reuse_duplicate_text(subject_id, f["file_id"], f.get("content_hash"), processed_dest):
+            ready.append((f, processed_dest))
+        else:
+            to_extract[f["save_path"]] = (f, processed_dest)
+
+    with span("extract_text_batch"):
+        for save_path, output_path, error in extract_texts(
+            [(save_path, dest) for save_path, (_, dest) in to_extract.items()]
+        ):
+            f = to_extract[save_path][0]
+            if error is not None:
+                logger.warning("⚠️ Batch extraction of file %s failed: %s", f["file_id"], error)
+                failed.append(f)
+            else:
+                ready.append((f, output_path))
+
+    count = 0
+    if ready:
+        with span("vector_index"):
+            counts = add_text_files_to_vector_db(
+                [(dest, f["file_id"]) for f, dest in ready], subject_id, raise_errors=True
+            )
+        indexed = [f for f, dest in ready if _finish_file(subject_id, f["file_id"], f["save_path"], dest)]
+        count = sum(counts[f["file_id"]] for f in indexed)
+        if indexed:
+            enqueue_pool_refill(subject_id)
+
+    for f in failed:
+        enqueue_ingestion(f["file_id"], subject_id, f["save_path"], f.get("content_hash"))
+    logger.info("📦 Batch of %s files for subject %s: %s chunks, %s sent to single-file ingestion",
+                len(payload["files"]), subject_id, count, len(failed))
+    return count
@@ -0,0 +1,267 @@
+# ==============================================================
+# ⏳ BACKGROUND JOBS MODULE — StudyBuddy AI
+# Persistent SQLite job queue + in-process worker threads
+# (no external broker needed)
+# ==============================================================
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from modules.metrics import span
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.path.join("instance", "jobs.sqlite3")
+
+# Worker threads started per app process
+JOB_WORKERS = 2
+
+# Seconds between queue polls when idle
+POLL_INTERVAL = 2.0
+
+# Retry backoff: RETRY_DELAY * 2 ** (attempt - 1) seconds
+RETRY_DELAY = 5.0
+
+# "running" jobs older than this are assumed orphaned by a dead process
+STALE_AFTER = 30 * 60
+
+_handlers = {}
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot help."""
+
+
+# -------------------------------------------------------------
+# 🗄️ Queue storage
+# -------------------------------------------------------------
+def _connect():
+    os.makedirs(os.path.dirname(JOBS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            subject_id INTEGER,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            error TEXT,
+            run_after REAL NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_after)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_subject ON jobs (subject_id, id)")
+    return conn
+
+
+def register_handler(kind):
+    """Decorator registering the function that runs jobs of a given kind."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, subject_id=None, max_attempts=3):
+    """Persist a new job and wake a worker. Returns the job id."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "INSERT INTO jobs (kind, subject_id, payload, max_attempts, run_after, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, subject_id, json.dumps(payload), max_attempts, now, now),
+        )
+        job_id = cur.lastrowid
+    finally:
+        conn.close()
+    _wakeup.set()
+    return job_id
+
+
+def get_jobs(subject_id, limit=20):
+    """Most recent jobs for a subject, newest first."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE subject_id=? ORDER BY id DESC LIMIT ?",
+            (subject_id, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        jobs.append(job)
+    return jobs
+
+
+def get_jobs_by_id(subject_id, job_ids):
+    """The subject's jobs with the given ids, whatever their age."""
+    job_ids = [int(j) for j in job_ids][:500]
+    if not job_ids:
+        return []
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM jobs WHERE subject_id=? AND id IN ({','.join('?' * len(job_ids))}) ORDER BY id DESC",
+            (subject_id, *job_ids),
+        ).fetchall()
+    finally:
+        conn.close()
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        jobs.append(job)
+    return jobs
+
+
+def has_pending_job(kind, subject_id):
+    """True when a job of this kind is already queued or running for the subject."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM jobs WHERE kind=? AND subject_id=? AND status IN ('queued', 'running') LIMIT 1",
+            (kind, subject_id),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row is not None
+
+
+def cancel_jobs(subject_id):
+    """Mark a subject's queued jobs as cancelled. Returns how many were cancelled."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET status='cancelled', finished_at=? WHERE subject_id=? AND status='queued'",
+            (time.time(), subject_id),
+        )
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+def _claim(conn):
+    """Atomically move the oldest runnable job to 'running'."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status='queued' AND run_after<=? ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status='running', attempts=attempts+1, started_at=? WHERE id=?",
+                (now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _finish(conn, job, error=None, permanent=False):
+    now = time.time()
+    if error is None:
+        conn.execute(
+            "UPDATE jobs SET status='done', error=NULL, finished_at=? WHERE id=?",
+            (now, job["id"]),
+        )
+    elif permanent or job["attempts"] + 1 >= job["max_attempts"]:
+        conn.execute(
+            "UPDATE jobs SET status='failed', error=?, finished_at=? WHERE id=?",
+            (error, now, job["id"]),
+        )
+    else:
+        delay = RETRY_DELAY * 2 ** job["attempts"]
+        conn.execute(
+            "UPDATE jobs SET status='queued', error=?, run_after=? WHERE id=?",
+            (error, now + delay, job["id"]),
+        )
+
+
+def _requeue_stale(conn):
+    conn.execute(
+        "UPDATE jobs SET status='queued', run_after=? WHERE status='running' AND started_at<?",
+        (time.time(), time.time() - STALE_AFTER),
+    )
+
+
+# -------------------------------------------------------------
+# 👷 Workers
+# -------------------------------------------------------------
+def run_one(conn=None):
+    """Claim and run a single job. Returns False when the queue is empty."""
+    own_conn = conn is None
+    conn = conn or _connect()
+    try:
+        job = _claim(conn)
+        if job is None:
+            return False
+
+        handler = _handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind '{job['kind']}'")
+            with span("job", kind=job["kind"]):
+                handler(json.loads(job["payload"]))
+            _finish(conn, job)
+            logger.info("✅ Job %s (%s) done", job['id'], job['kind'])
+        except PermanentJobError as e:
+            _finish(conn, job, str(e), permanent=True)
+            logger.error("❌ Job %s (%s) failed: %s", job['id'], job['kind'], e)
+        except Exception as e:
+            _finish(conn, job, f"{type(e).__name__}: {e}")
+            logger.warning("⚠️ Job %s (%s) attempt %s failed: %s", job['id'], job['kind'], job['attempts'] + 1, e,
+                           exc_info=True)
+        return True
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _worker_loop():
+    conn = _connect()
+    while True:
+        try:
+            if run_one(conn):
+                continue
+        except Exception as e:
+            logger.error("❌ Job worker error: %s", e)
+        _wakeup.wait(POLL_INTERVAL)
+        _wakeup.clear()
+
+
+def start_workers(count=JOB_WORKERS):
+    """Start the worker threads for this process (idempotent)."""
+    with _workers_lock:
+        if _workers:
+            return
+        conn = _connect()
+        try:
+            _requeue_stale(conn)
+        finally:
+            conn.close()
+        for i in range(count):
+            t = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+        logger.info("👷 Started %s background job workers", count)
@@ -0,0 +1,248 @@
+# ==============================================================
+# 🔤 LEXICAL INDEX MODULE — StudyBuddy AI
+# Per-subject BM25 inverted index (SQLite), kept in step with the
+# vector store so exact terms (formula names, identifiers) are found
+# ==============================================================
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+LEXICAL_DB_DIR = os.path.join("vector_dbs", "lexical")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SQLITE_MAX_PARAMS = 500
+
+# identifiers and numbers survive whole: snake_case, h2o, 3.14, o'neil
+_TOKEN = re.compile(r"[a-z0-9_]+(?:[.'][a-z0-9_]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in is it its of on or
+that the their there these this to was were what when where which who why
+will with you your do does did can could should would
+""".split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _db_path(subject_id):
+    return os.path.join(LEXICAL_DB_DIR, f"subject_{subject_id}.sqlite3")
+
+
+def index_exists(subject_id):
+    return os.path.exists(_db_path(subject_id))
+
+
+def document_count(subject_id):
+    """Number of indexed documents (0 when the subject has no index yet)."""
+    if not index_exists(subject_id):
+        return 0
+    conn = _connect(subject_id)
+    try:
+        return conn.execute("SELECT doc_count FROM totals WHERE id = 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+_SCHEMA = """
+    CREATE TABLE docs (
+        doc_id TEXT PRIMARY KEY,
+        file_id INTEGER,
+        length INTEGER NOT NULL
+    );
+    CREATE TABLE postings (
+        term TEXT NOT NULL,
+        doc_id TEXT NOT NULL,
+        tf INTEGER NOT NULL,
+        PRIMARY KEY (term, doc_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_postings_doc ON postings (doc_id);
+    CREATE INDEX idx_docs_file ON docs (file_id);
+    CREATE TABLE totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        doc_count INTEGER NOT NULL,
+        total_length INTEGER NOT NULL
+    );
+    INSERT INTO totals (id, doc_count, total_length) VALUES (1, 0, 0);
+"""
+
+
+def _create_index(subject_id):
+    """
+    Create an empty index file. The schema is written to a temporary file
+    that is linked into place, so readers never see a half-created index.
+    """
+    os.makedirs(LEXICAL_DB_DIR, exist_ok=True)
+    tmp_path = f"{_db_path(subject_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+    finally:
+        conn.close()
+    try:
+        os.link(tmp_path, _db_path(subject_id))
+    except FileExistsError:
+        pass  # created concurrently by another writer
+    finally:
+        os.remove(tmp_path)
+
+
+def _connect(subject_id, create=False):
+    """Open a subject's index; only writers pass create=True, reads never run DDL."""
+    if create and not index_exists(subject_id):
+        _create_index(subject_id)
+    return sqlite3.connect(_db_path(subject_id), timeout=30, isolation_level=None)
+
+
+def _in_chunks(values):
+    values = list(values)
+    for start in range(0, len(values), _SQLITE_MAX_PARAMS):
+        yield values[start:start + _SQLITE_MAX_PARAMS]
+
+
+def _delete_docs(conn, doc_ids):
+    """Remove docs (inside an open transaction) and adjust the totals."""
+    for part in _in_chunks(doc_ids):
+        placeholders = ",".join("?" * len(part))
+        count, length = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE doc_id IN ({placeholders})",
+            part,
+        ).fetchone()
+        if not count:
+            continue
+        conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", part)
+        conn.execute(f"DELETE FROM docs WHERE doc_id IN ({placeholders})", part)
+        conn.execute(
+            "UPDATE totals SET doc_count = doc_count - ?, total_length = total_length - ? WHERE id = 1",
+            (count, length),
+        )
+
+
+# -------------------------------------------------------------
+# ✏️ Updates
+# -------------------------------------------------------------
+def add_documents(subject_id, docs):
+    """Index (doc_id, file_id, text) triples; existing doc ids are replaced."""
+    docs = list(docs)
+    if not docs:
+        return
+    conn = _connect(subject_id, create=True)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _delete_docs(conn, [d[0] for d in docs])
+        total_length = 0
+        for doc_id, file_id, text in docs:
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            total_length += length
+            conn.execute(
+                "INSERT INTO docs (doc_id, file_id, length) VALUES (?, ?, ?)",
+                (doc_id, file_id, length),
+            )
+            conn.executemany(
+                "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                [(term, doc_id, tf) for term, tf in terms.items()],
+            )
+        conn.execute(
+            "UPDATE totals SET doc_count = doc_count + ?, total_length = total_length + ? WHERE id = 1",
+            (len(docs), total_length),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def remove_documents(subject_id, doc_ids=None, file_id=None):
+    """Drop documents by id and/or every document of a file."""
+    if not index_exists(subject_id):
+        return
+    conn = _connect(subject_id)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = list(doc_ids or [])
+        if file_id is not None:
+            ids += [r[0] for r in conn.execute("SELECT doc_id FROM docs WHERE file_id=?", (file_id,))]
+        _delete_docs(conn, set(ids))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def drop_index(subject_id):
+    """Delete a subject's whole index."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(_db_path(subject_id) + suffix)
+        except OSError:
+            pass
+
+
+def compact_index(subject_id):
+    """Reclaim space left by deleted documents."""
+    if not index_exists(subject_id):
+        return
+    conn = _connect(subject_id)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+# -------------------------------------------------------------
+# 🔍 BM25 search
+# -------------------------------------------------------------
+def search(subject_id, query, k=10):
+    """Top k (doc_id, bm25 score) pairs for a query, best first."""
+    terms = set(tokenize(query))
+    if not terms or not index_exists(subject_id):
+        return []
+    conn = _connect(subject_id)
+    try:
+        doc_count, total_length = conn.execute(
+            "SELECT doc_count, total_length FROM totals WHERE id = 1"
+        ).fetchone()
+        if not doc_count:
+            return []
+        avg_length = total_length / doc_count
+
+        postings = {}
+        for part in _in_chunks(terms):
+            placeholders = ",".join("?" * len(part))
+            for term, doc_id, tf in conn.execute(
+                f"SELECT term, doc_id, tf FROM postings WHERE term IN ({placeholders})", part
+            ):
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        lengths = {}
+        doc_ids = {doc_id for plist in postings.values() for doc_id, _ in plist}
+        for part in _in_chunks(doc_ids):
+            placeholders = ",".join("?" * len(part))
+            lengths.update(conn.execute(
+                f"SELECT doc_id, length FROM docs WHERE doc_id IN ({placeholders})", part
+            ))
+    finally:
+        conn.close()
+
+    scores = Counter()
+    for plist in postings.values():
+        df = len(plist)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        for doc_id, tf in plist:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(doc_id, avg_length) / avg_length)
+            scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores.most_common(k)
@@ -0,0 +1,88 @@
+# ==============================================================
+# 🤖 LLM CLIENT MODULE — StudyBuddy AI (shared Ollama clients)
+# ==============================================================
+
+import logging
+import threading
+from langchain_ollama import OllamaLLM
+
+logger = logging.getLogger(__name__)
+
+# Local Ollama endpoint and the models used by the app
+OLLAMA_BASE_URL = "http://localhost:11434"
+CHAT_MODEL = "tinyllama:latest"
+QUIZ_MODEL = "phi3:mini"
+
+# Context window requested from Ollama (prompt + answer tokens) per model
+MODEL_CONTEXT_TOKENS = {
+    CHAT_MODEL: 2048,
+    QUIZ_MODEL: 4096,
+}
+DEFAULT_CONTEXT_TOKENS = 2048
+
+# Maximum tokens generated per answer
+MODEL_RESPONSE_TOKENS = {
+    CHAT_MODEL: 512,
+    QUIZ_MODEL: 1024,
+}
+DEFAULT_RESPONSE_TOKENS = 512
+
+# How long Ollama keeps a model loaded after the last request
+KEEP_ALIVE = "30m"
+
+# Load models into Ollama when the app starts
+WARM_UP_ON_START = True
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# -------------------------------------------------------------
+# ♻️ One configured client per model name
+# -------------------------------------------------------------
+def get_llm(model):
+    """
+    Return the shared OllamaLLM for a model.
+    Each client owns one HTTP connection pool to the Ollama endpoint,
+    so reusing it avoids reconnecting on every request.
+    """
+    llm = _clients.get(model)
+    if llm is None:
+        with _clients_lock:
+            llm = _clients.get(model)
+            if llm is None:
+                llm = OllamaLLM(
+                    model=model,
+                    base_url=OLLAMA_BASE_URL,
+                    keep_alive=KEEP_ALIVE,
+                    num_ctx=MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS),
+                    num_predict=MODEL_RESPONSE_TOKENS.get(model, DEFAULT_RESPONSE_TOKENS),
+                )
+                _clients[model] = llm
+    return llm
+
+
+# -------------------------------------------------------------
+# 🔥 Warm-up: load models before the first user request
+# -------------------------------------------------------------
+def _warm_up(models):
+    for model in models:
+        try:
+            llm = get_llm(model)
+            client = getattr(llm, "_client", None)
+            if client is not None:
+                # an empty prompt only loads the model into memory
+                client.generate(model=model, prompt="", keep_alive=KEEP_ALIVE)
+            else:
+                llm.invoke("Hi")
+            logger.info("🔥 Warmed up model %s", model)
+        except Exception as e:
+            logger.warning("⚠️ Warm-up failed for %s: %s", model, e)
+
+
+def warm_up_models(models=(CHAT_MODEL, QUIZ_MODEL), background=True):
+    """Load the given models in Ollama (in a daemon thread by default)."""
+    if background:
+        threading.Thread(target=_warm_up, args=(list(models),), daemon=True).start()
+    else:
+        _warm_up(models)
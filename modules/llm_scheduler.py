@@ -0,0 +1,282 @@
+# ==============================================================
+# 🚦 LLM SCHEDULER MODULE — StudyBuddy AI
+# Admission control in front of the local Ollama models:
+# per-model concurrency caps, a bounded priority/FIFO wait queue,
+# fast rejection when full, and coalescing of identical prompts
+# ==============================================================
+
+import heapq
+import itertools
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from modules.llm_client import get_llm, CHAT_MODEL, QUIZ_MODEL
+from modules.metrics import span, histogram
+
+try:
+    import fcntl  # POSIX only: shares caps below the worker count across processes
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Gunicorn worker processes sharing the caps below (see gunicorn.conf.py)
+APP_WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+# Maximum concurrent generations per model across all workers; each
+# process gets an equal share. A cap below the worker count is enforced
+# with slot lock files shared by the processes instead (see _SharedSlots)
+MODEL_CONCURRENCY = {
+    CHAT_MODEL: 4,
+    QUIZ_MODEL: 1,
+}
+DEFAULT_MODEL_CONCURRENCY = 2
+
+# Requests allowed to wait for a model across all workers (shared the same
+# way); beyond this they are rejected at once
+MODEL_QUEUE_LIMIT = {
+    CHAT_MODEL: 16,
+    QUIZ_MODEL: 4,
+}
+DEFAULT_MODEL_QUEUE_LIMIT = 8
+
+# Seconds a queued request waits for its turn before giving up
+MODEL_SLOT_TIMEOUT = 120
+
+# Lock files for the cross-process slots, one per slot of a model
+MODEL_SLOT_DIR = os.path.join(tempfile.gettempdir(), "studybuddy_llm_slots")
+
+# Seconds between attempts to take a cross-process slot
+_SHARED_SLOT_POLL = 0.05
+
+# Lower value = served first; equal priorities are FIFO
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+TIME_TO_FIRST_TOKEN = histogram("studybuddy_llm_first_token_seconds",
+                                "Time from getting a model slot to the first streamed token")
+
+
+class ModelBusyError(RuntimeError):
+    """The request waited MODEL_SLOT_TIMEOUT without getting a model slot."""
+
+
+class QueueFullError(ModelBusyError):
+    """The model's wait queue is full; the request was rejected immediately."""
+
+
+class _ModelGate:
+    """Concurrency cap + bounded priority queue for one model."""
+
+    def __init__(self, limit, max_queue):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = []  # heap of (priority, seq)
+        self.rejected = 0
+        self.timed_out = 0
+        self.cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def acquire(self, priority, timeout):
+        with self.cond:
+            if self.running < self.limit and not self.waiting:
+                self.running += 1
+                return
+            if len(self.waiting) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("The AI tutor is handling too many requests right now")
+
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self.waiting, ticket)
+            deadline = time.monotonic() + timeout
+            while not (self.running < self.limit and self.waiting[0] == ticket):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiting.remove(ticket)
+                    heapq.heapify(self.waiting)
+                    self.timed_out += 1
+                    self.cond.notify_all()
+                    raise ModelBusyError("Timed out waiting for the AI tutor")
+                self.cond.wait(remaining)
+
+            heapq.heappop(self.waiting)
+            self.running += 1
+            self.cond.notify_all()  # the next ticket may be admissible too
+
+    def release(self):
+        with self.cond:
+            self.running -= 1
+            self.cond.notify_all()
+
+
+class _SharedSlots:
+    """
+    A model cap shared by all worker processes: `limit` lock files, of
+    which a holder flocks one. Used when the cap is below APP_WORKERS,
+    where an equal per-process share would round down to zero.
+    """
+
+    def __init__(self, model, limit):
+        self.limit = limit
+        os.makedirs(MODEL_SLOT_DIR, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() else "_" for c in model)
+        self.paths = [os.path.join(MODEL_SLOT_DIR, f"{safe_name}.{i}.lock") for i in range(limit)]
+
+    def acquire(self, deadline):
+        """Open file holding a slot; ModelBusyError once the deadline passes."""
+        while True:
+            for path in self.paths:
+                slot = open(path, "a")
+                try:
+                    fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return slot
+                except BlockingIOError:
+                    slot.close()
+            if time.monotonic() >= deadline:
+                raise ModelBusyError("Timed out waiting for the AI tutor")
+            time.sleep(_SHARED_SLOT_POLL)
+
+    @staticmethod
+    def release(slot):
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+_inflight = {}  # (model, prompt) -> Future shared by identical concurrent calls
+_inflight_lock = threading.Lock()
+_coalesced = 0
+
+
+_shared_slots = {}  # model -> _SharedSlots, for caps below the worker count
+
+
+def _per_worker(limit, model, what):
+    share = limit // APP_WORKERS
+    if share < 1:
+        logger.warning("⚠️ %s of %s for %s is below %s workers; each worker gets 1",
+                       what, limit, model, APP_WORKERS)
+    return max(1, share)
+
+
+def _gate(model):
+    gate = _gates.get(model)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.get(model)
+            if gate is None:
+                concurrency = MODEL_CONCURRENCY.get(model, DEFAULT_MODEL_CONCURRENCY)
+                queue_limit = _per_worker(MODEL_QUEUE_LIMIT.get(model, DEFAULT_MODEL_QUEUE_LIMIT),
+                                          model, "Queue limit")
+                if concurrency < APP_WORKERS and fcntl:
+                    # one slot per process, and a worker must also take a shared slot
+                    _shared_slots[model] = _SharedSlots(model, concurrency)
+                    gate = _ModelGate(1, queue_limit)
+                else:
+                    gate = _ModelGate(_per_worker(concurrency, model, "Concurrency cap"), queue_limit)
+                _gates[model] = gate
+    return gate
+
+
+@contextmanager
+def model_slot(model, priority=PRIORITY_INTERACTIVE, timeout=MODEL_SLOT_TIMEOUT):
+    """Hold one of the model's generation slots for the duration of the block."""
+    gate = _gate(model)
+    shared = _shared_slots.get(model)
+    deadline = time.monotonic() + timeout
+    with span("llm_wait", model=model):
+        gate.acquire(priority, timeout)
+        if shared is not None:
+            try:
+                slot = shared.acquire(deadline)
+            except ModelBusyError:
+                with gate.cond:
+                    gate.timed_out += 1
+                gate.release()
+                raise
+    try:
+        yield
+    finally:
+        if shared is not None:
+            shared.release(slot)
+        gate.release()
+
+
+# -------------------------------------------------------------
+# 🧠 Scheduled model calls
+# -------------------------------------------------------------
+def generate(model, prompt, priority=PRIORITY_INTERACTIVE):
+    """
+    Run a prompt through the model under admission control.
+    Concurrent calls with an identical (model, prompt) share one generation.
+    """
+    global _coalesced
+    key = (model, prompt)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+        else:
+            _coalesced += 1
+    if not leader:
+        return future.result()
+
+    try:
+        with model_slot(model, priority):
+            llm = get_llm(model)
+            with span("llm_generate", model=model):
+                try:
+                    output = llm.invoke(prompt)
+                except Exception:
+                    # some versions can be called directly
+                    output = llm(prompt)
+        result = output if isinstance(output, str) else str(output)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def stream(model, prompt, priority=PRIORITY_INTERACTIVE):
+    """Yield tokens from the model under admission control."""
+    with model_slot(model, priority):
+        started = time.perf_counter()
+        first = True
+        with span("llm_stream", model=model):
+            for token in get_llm(model).stream(prompt):
+                if first:
+                    TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, model=model)
+                    first = False
+                yield token if isinstance(token, str) else str(token)
+
+
+def scheduler_stats():
+    """Running/queued/rejected counts per model and coalesced calls."""
+    stats = {"coalesced": _coalesced, "models": {}}
+    with _gates_lock:
+        gates = dict(_gates)
+    for model, gate in gates.items():
+        with gate.cond:
+            stats["models"][model] = {
+                "limit": gate.limit,
+                "running": gate.running,
+                "queued": len(gate.waiting),
+                "rejected": gate.rejected,
+                "timed_out": gate.timed_out,
+            }
+        if model in _shared_slots:
+            stats["models"][model]["shared_limit"] = _shared_slots[model].limit
+    return stats
@@ -0,0 +1,275 @@
+# ==============================================================
+# 📈 METRICS MODULE — StudyBuddy AI
+# Timing spans around each pipeline stage, in-process histograms
+# exposed in Prometheus text format at /metrics, and the logging
+# setup (plain or JSON lines) used instead of print()
+# ==============================================================
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets (seconds): sub-millisecond DB calls up to long generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Requests slower than this log their per-stage breakdown as a warning
+SLOW_REQUEST_SECONDS = 5.0
+
+# "json" for one JSON object per line (log shippers), anything else for plain text
+LOG_FORMAT = os.environ.get("STUDYBUDDY_LOG_FORMAT", "text")
+LOG_LEVEL = os.environ.get("STUDYBUDDY_LOG_LEVEL", "INFO")
+
+_registry = {}  # name -> metric, in registration order
+_registry_lock = threading.Lock()
+_collectors = []  # callables returning extra gauge samples at scrape time
+
+# spans finished during the current request: [(stage, seconds)]
+_trace = contextvars.ContextVar("studybuddy_trace", default=None)
+
+
+# -------------------------------------------------------------
+# 📊 Metric types
+# -------------------------------------------------------------
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            rows = [(key, list(row)) for key, row in self._values.items()]
+        samples = []
+        for key, row in rows:
+            for bound, count in zip(self.buckets, row):
+                samples.append((f"{self.name}_bucket", key, count, (("le", repr(float(bound))),)))
+            samples.append((f"{self.name}_bucket", key, row[-1], (("le", "+Inf"),)))
+            samples.append((f"{self.name}_sum", key, row[-2]))
+            samples.append((f"{self.name}_count", key, row[-1]))
+        return samples
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name, help):
+    """Get or create a counter."""
+    return _register(Counter(name, help))
+
+
+def histogram(name, help, buckets=LATENCY_BUCKETS):
+    """Get or create a histogram."""
+    return _register(Histogram(name, help, buckets))
+
+
+def register_collector(func):
+    """
+    Add a scrape-time callback returning [(name, help, {labels dict as tuple: value})]
+    gauges, e.g. pool or scheduler state that is already tracked elsewhere.
+    A fourth tuple item "counter" exports a running total instead.
+    """
+    _collectors.append(func)
+    return func
+
+
+STAGE_SECONDS = histogram("studybuddy_stage_seconds", "Time spent per pipeline stage")
+STAGE_ERRORS = counter("studybuddy_stage_errors_total", "Stages that raised an exception")
+HTTP_SECONDS = histogram("studybuddy_http_request_seconds", "HTTP request latency by endpoint")
+
+
+# -------------------------------------------------------------
+# ⏱️ Spans
+# -------------------------------------------------------------
+@contextmanager
+def span(stage, **labels):
+    """Time a block as one pipeline stage (histogram + request trace)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            STAGE_ERRORS.inc(stage=stage, **labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, **labels)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+        logger.debug("⏱️ %s took %.1f ms", stage, elapsed * 1000,
+                     extra={"stage": stage, "duration_ms": round(elapsed * 1000, 2), **labels})
+
+
+def timed(stage, **labels):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace():
+    """Begin collecting the spans of the current request; returns a token for end_trace()."""
+    return _trace.set([])
+
+
+def end_trace(token, label, elapsed):
+    """Stop collecting; slow requests log where their time went."""
+    trace = _trace.get() or []
+    _trace.reset(token)
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        totals = {}
+        for stage, seconds in trace:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        breakdown = ", ".join(f"{stage}={seconds * 1000:.0f}ms"
+                              for stage, seconds in sorted(totals.items(), key=lambda p: -p[1]))
+        logger.warning("🐢 Slow request %s took %.2fs: %s", label, elapsed, breakdown or "no spans",
+                       extra={"request": label, "duration_ms": round(elapsed * 1000, 2),
+                              "stages": {s: round(t * 1000, 2) for s, t in totals.items()}})
+    return trace
+
+
+# -------------------------------------------------------------
+# 📤 Prometheus exposition
+# -------------------------------------------------------------
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float("inf") else str(value)
+    return str(value)
+
+
+def render_prometheus():
+    """All metrics of this process in Prometheus text format (version 0.0.4)."""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for sample in metric.samples():
+            name, key, value = sample[:3]
+            extra = sample[3] if len(sample) > 3 else ()
+            lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+
+    for collector in _collectors:
+        try:
+            gauges = collector()
+        except Exception as e:
+            logger.warning("⚠️ Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+            continue
+        for name, help, values, *kind in gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind[0] if kind else 'gauge'}")
+            for labels, value in values.items():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------------------
+# 📝 Logging
+# -------------------------------------------------------------
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    """Set up the root logger once (gunicorn/Flask handlers are left alone)."""
+    root = logging.getLogger()
+    if any(getattr(h, "_studybuddy", False) for h in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler._studybuddy = True
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,294 @@
+# ==============================================================
+# 📝 QUIZ POOL MODULE — StudyBuddy AI
+# Questions are generated ahead of time from chunks of the notes
+# by the background workers; quizzes are assembled from the pool
+# ==============================================================
+
+import hashlib
+import json
+import logging
+import random
+import re
+from database.connection import get_db_connection
+from modules.jobs import register_handler, enqueue, has_pending_job
+from modules.llm_client import QUIZ_MODEL
+from modules.llm_scheduler import generate, PRIORITY_BACKGROUND
+from modules.corpus import read_chunk, sample_chunks
+from modules.prompt_budget import fit_context, log_prompt_stats
+from modules.vector_store import get_chunks, count_chunks
+from modules.metrics import span, timed
+
+logger = logging.getLogger(__name__)
+
+# Questions per generated quiz
+QUIZ_SIZE = 5
+
+# Refill when fewer than this many never-served questions remain
+POOL_LOW_WATER = 15
+
+# Chunks turned into questions per refill job
+CHUNKS_PER_REFILL = 8
+
+# Questions asked of the model per chunk
+QUESTIONS_PER_CHUNK = 3
+
+# Hard cap on stored questions per subject
+POOL_MAX_SIZE = 500
+
+REFILL_JOB = "refill_quiz_pool"
+
+
+# -------------------------------------------------------------
+# 🧹 Parsing model output into questions
+# -------------------------------------------------------------
+def parse_questions(ai_output):
+    """Extract question dicts from the model output (JSON array or numbered text)."""
+    start = ai_output.find("[")
+    end = ai_output.rfind("]")
+    try:
+        questions = json.loads(ai_output[start:end + 1])
+        if isinstance(questions, list):
+            return [q for q in questions if isinstance(q, dict)]
+    except Exception as e:
+        logger.warning("⚠️ JSON parse failed: %s", e)
+
+    # fallback: try to parse plain text into basic questions
+    lines = [l.strip() for l in ai_output.splitlines() if l.strip()]
+    temp = []
+    q, opts = "", []
+    for line in lines:
+        if re.match(r'^\d+\.', line):  # e.g. "1. What is Java?"
+            if q and opts:
+                temp.append({"question": q, "options": opts, "answer": opts[0]})
+            q = re.sub(r'^\d+\.\s*', '', line)
+            opts = []
+        elif re.match(r'^[A-D][\).\s-]', line):  # e.g. "A) Option"
+            opts.append(re.sub(r'^[A-D][\).\s-]+\s*', '', line))
+    if q and opts:
+        temp.append({"question": q, "options": opts, "answer": opts[0]})
+    return temp
+
+
+def normalize_questions(questions_list):
+    """Coerce parsed questions into {question, options[<=4], answer text}."""
+    normalized = []
+    for q in questions_list:
+        opts_raw = q.get("options", [])
+        opts = []
+        for o in opts_raw:
+            if isinstance(o, list) and o:
+                opts.append(str(o[0]))
+            elif isinstance(o, dict):
+                opts.append(o.get("text") or o.get("option") or str(o))
+            else:
+                opts.append(str(o))
+        opts = [o.strip() for o in opts if o.strip()][:4]
+        ans = str(q.get("answer", ""))
+        if len(ans) == 1 and ans.upper() in ["A", "B", "C", "D"]:
+            idx = ord(ans.upper()) - ord("A")
+            if idx < len(opts):
+                ans = opts[idx]
+        normalized.append({
+            "question": str(q.get("question", "Untitled Question")).strip(),
+            "options": opts or ["A", "B", "C", "D"],
+            "answer": ans or (opts[0] if opts else "A"),
+        })
+    return normalized
+
+
+def question_hash(question):
+    """Hash of the question text ignoring case, spacing and punctuation."""
+    text = re.sub(r"[^a-z0-9]+", " ", question["question"].lower()).strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------
+# 🗄️ Pool storage
+# -------------------------------------------------------------
+def _pool_counts(cursor, subject_id):
+    cursor.execute(
+        "SELECT COUNT(*) AS total, COALESCE(SUM(served_count = 0), 0) AS fresh "
+        "FROM quiz_pool WHERE subject_id=%s",
+        (subject_id,),
+    )
+    row = cursor.fetchone()
+    return int(row["total"]), int(row["fresh"])
+
+
+def pool_size(subject_id):
+    """(total, never served) question counts for a subject."""
+    with get_db_connection() as conn:
+        return _pool_counts(conn.cursor(), subject_id)
+
+
+def _store_questions(subject_id, chunk, questions):
+    """Insert questions generated from one chunk; duplicates are skipped."""
+    file_id = chunk.get("file_id")
+    rows = [
+        (subject_id, file_id if file_id not in (None, -1) else None, chunk["id"],
+         question_hash(q), json.dumps(q, ensure_ascii=False))
+        for q in questions
+        if q["question"] and len(q["options"]) >= 2
+    ]
+    if not rows:
+        return 0
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        added = cursor.executemany(
+            """
+            INSERT IGNORE INTO quiz_pool (subject_id, file_id, vector_id, question_hash, question_json)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            rows,
+        )
+        conn.commit()
+    return added or 0
+
+
+def remove_pool_questions(file_id=None, subject_id=None):
+    """Delete pool questions generated from a file or for a whole subject."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if file_id is not None:
+            cursor.execute("DELETE FROM quiz_pool WHERE file_id=%s", (file_id,))
+        if subject_id is not None:
+            cursor.execute("DELETE FROM quiz_pool WHERE subject_id=%s", (subject_id,))
+        conn.commit()
+
+
+def _pick_chunks(subject_id, count):
+    """
+    Chunks with the fewest pool questions so far (random among ties), as
+    dicts with id (vector id), file_id and text. Text is read from the
+    processed notes through the corpus manifest.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT fc.file_id, fc.chunk_index, fc.vector_id, COUNT(qp.id) AS used
+            FROM file_chunks fc
+            LEFT JOIN quiz_pool qp
+                ON qp.subject_id = fc.subject_id AND qp.vector_id = fc.vector_id
+            WHERE fc.subject_id = %s
+            GROUP BY fc.file_id, fc.chunk_index, fc.vector_id
+            ORDER BY used, RAND()
+            LIMIT %s
+            """,
+            (subject_id, count),
+        )
+        rows = cursor.fetchall()
+
+    chunks, missing = [], {}
+    for r in rows:
+        text = read_chunk(subject_id, r["file_id"], r["chunk_index"])
+        if text:
+            chunks.append({"id": r["vector_id"], "file_id": r["file_id"], "text": text})
+        else:
+            missing[r["vector_id"]] = r["file_id"]
+    if missing:
+        # file not in the manifest (yet): fall back to the text stored with the vectors
+        for c in get_chunks(subject_id, ids=list(missing)):
+            chunks.append({"id": c["id"], "file_id": missing[c["id"]], "text": c["text"]})
+    if chunks:
+        return chunks
+
+    # no chunk bookkeeping in MySQL: sample the manifest, then the store itself
+    sampled = sample_chunks(subject_id, count)
+    if sampled:
+        return [
+            {"id": f"{c['file_id']}-{c['chunk_index']}", "file_id": c["file_id"], "text": c["text"]}
+            for c in sampled
+        ]
+    total = count_chunks(subject_id)
+    for offset in random.sample(range(total), min(count, total)):
+        for c in get_chunks(subject_id, limit=1, offset=offset):
+            chunks.append({"id": c["id"], "file_id": c["metadata"].get("file_id"), "text": c["text"]})
+    return chunks
+
+
+_QUIZ_PROMPT = """
+You are a quiz generator.
+Create exactly {count} multiple-choice questions based on the text below.
+Output only a valid JSON array like this:
+[
+  {{"question":"...","options":["A","B","C","D"],"answer":"A"}}
+]
+
+Text:
+{text}
+"""
+
+
+def _quiz_prompt(text, count):
+    texts, stats = fit_context([text], QUIZ_MODEL, _QUIZ_PROMPT.format(count=count, text=""))
+    log_prompt_stats("Quiz", stats)
+    return _QUIZ_PROMPT.format(count=count, text="\n".join(texts)).strip()
+
+
+# -------------------------------------------------------------
+# ⏳ Background refill
+# -------------------------------------------------------------
+def enqueue_pool_refill(subject_id):
+    """Queue a refill for the subject unless one is already pending."""
+    if has_pending_job(REFILL_JOB, subject_id):
+        return None
+    return enqueue(REFILL_JOB, {"subject_id": subject_id}, subject_id=subject_id)
+
+
+@register_handler(REFILL_JOB)
+def refill_quiz_pool(payload):
+    """Generate questions from the least covered chunks of a subject's notes."""
+    subject_id = payload["subject_id"]
+    total, fresh = pool_size(subject_id)
+    if fresh >= POOL_LOW_WATER or total >= POOL_MAX_SIZE:
+        return 0
+
+    with span("quiz_pick_chunks"):
+        chunks = _pick_chunks(subject_id, CHUNKS_PER_REFILL)
+    added = 0
+    for chunk in chunks:
+        if not chunk["text"].strip():
+            continue
+        # ModelBusyError propagates so the job is retried with backoff
+        ai_output = generate(QUIZ_MODEL, _quiz_prompt(chunk["text"], QUESTIONS_PER_CHUNK),
+                             priority=PRIORITY_BACKGROUND)
+        questions = normalize_questions(parse_questions(ai_output))
+        added += _store_questions(subject_id, chunk, questions)
+    logger.info("🧠 Added %s questions to the quiz pool of subject %s", added, subject_id)
+    return added
+
+
+# -------------------------------------------------------------
+# 🎯 Assemble a quiz from the pool
+# -------------------------------------------------------------
+@timed("quiz_draw")
+def draw_quiz(subject_id, size=QUIZ_SIZE):
+    """
+    Pick the least served questions of the subject (random among ties),
+    mark them served and top up the pool in the background if it runs low.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, question_json FROM quiz_pool
+            WHERE subject_id=%s
+            ORDER BY served_count, RAND()
+            LIMIT %s
+            """,
+            (subject_id, size),
+        )
+        rows = cursor.fetchall()
+        if rows:
+            placeholders = ",".join(["%s"] * len(rows))
+            cursor.execute(
+                f"UPDATE quiz_pool SET served_count = served_count + 1 WHERE id IN ({placeholders})",
+                [r["id"] for r in rows],
+            )
+            conn.commit()
+        _, fresh = _pool_counts(cursor, subject_id)
+
+    if fresh < POOL_LOW_WATER:
+        enqueue_pool_refill(subject_id)
+    return [json.loads(r["question_json"]) for r in rows]
@@ -0,0 +1,116 @@
+# ==============================================================
+# 🧮 PROMPT BUDGET MODULE — StudyBuddy AI
+# Token counting and fitting retrieved context into the model's
+# context window, so prompt size (and generation time) stay bounded
+# ==============================================================
+
+import logging
+import re
+from modules.llm_client import (
+    MODEL_CONTEXT_TOKENS, MODEL_RESPONSE_TOKENS,
+    DEFAULT_CONTEXT_TOKENS, DEFAULT_RESPONSE_TOKENS,
+)
+
+# Approximate characters per token when tiktoken is not installed
+# (conservative for the llama/phi tokenizers used by Ollama models)
+CHARS_PER_TOKEN = 3.5
+
+# Counts are estimates for these models: keep this much headroom
+SAFETY_MARGIN = 0.9
+
+# Don't bother adding a trimmed chunk smaller than this
+MIN_CHUNK_TOKENS = 48
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding_failed = True  # not installed / BPE file unavailable offline
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count of a text (tiktoken when available, else estimated from length)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def prompt_budget(model):
+    """Tokens available for the prompt: context window minus the answer reserve."""
+    context = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    response = MODEL_RESPONSE_TOKENS.get(model, DEFAULT_RESPONSE_TOKENS)
+    return int((context - response) * SAFETY_MARGIN)
+
+
+def trim_to_tokens(text, max_tokens):
+    """Cut text to at most max_tokens, preferring a sentence, then a word boundary."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:int(max_tokens * CHARS_PER_TOKEN)]
+
+    sentence_ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] >= len(cut) * 0.6:
+        return cut[:sentence_ends[-1]].rstrip()
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut).rstrip()
+
+
+def fit_context(texts, model, fixed_text=""):
+    """
+    Keep ranked context texts (best first) while they fit the model's prompt
+    budget next to fixed_text (instructions + question); the first text that
+    does not fit is trimmed into the remaining space.
+    Returns (texts, stats) where stats has the token counts for logging.
+    """
+    budget = prompt_budget(model)
+    fixed_tokens = count_tokens(fixed_text)
+    remaining = budget - fixed_tokens
+    fitted, trimmed = [], 0
+    for text in texts:
+        tokens = count_tokens(text) + 1  # separator
+        if tokens <= remaining:
+            fitted.append(text)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_CHUNK_TOKENS:
+            part = trim_to_tokens(text, remaining - 1)
+            if part:
+                fitted.append(part)
+                remaining -= count_tokens(part) + 1
+                trimmed += 1
+        break
+
+    stats = {
+        "budget": budget,
+        "prompt_tokens": budget - remaining,
+        "context_tokens": budget - remaining - fixed_tokens,
+        "chunks_used": len(fitted),
+        "chunks_total": len(texts),
+        "trimmed": trimmed,
+    }
+    return fitted, stats
+
+
+def log_prompt_stats(label, stats):
+    logger.info("🧮 %s prompt: %d/%d tokens, %d/%d chunks%s", label,
+                stats["prompt_tokens"], stats["budget"], stats["chunks_used"], stats["chunks_total"],
+                f" ({stats['trimmed']} trimmed)" if stats["trimmed"] else "",
+                extra=stats)
@@ -0,0 +1,162 @@
+# ==============================================================
+# 🔎 RETRIEVAL MODULE — StudyBuddy AI
+# Hybrid search: vector similarity + BM25, fused with reciprocal
+# rank fusion and optionally reranked by a small cross-encoder
+# ==============================================================
+
+import logging
+import threading
+import time
+from langchain_core.documents import Document
+from modules import lexical_index
+from modules.jobs import register_handler, enqueue, has_pending_job
+from modules.vector_store import get_vector_store, get_embeddings, get_chunks, rebuild_lexical_index
+from modules.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Chunks sent to the model as context
+CONTEXT_K = 3
+
+# Candidates taken from each retriever before fusion
+VECTOR_CANDIDATES = 10
+LEXICAL_CANDIDATES = 10
+
+# Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank))
+RRF_K = 60
+
+# Optional CPU cross-encoder (needs sentence-transformers), e.g.
+# "cross-encoder/ms-marco-MiniLM-L-6-v2"; None keeps the fused order
+RERANKER_MODEL = None
+
+LEXICAL_BUILD_JOB = "build_lexical_index"
+_LEXICAL_BUILD_BATCH = 500
+
+# Seconds between checks of a subject's BM25 index against its vector store
+LEXICAL_CHECK_INTERVAL = 300
+
+_lexical_checked = {}  # subject_id -> monotonic time of the last lag check
+_lexical_checked_lock = threading.Lock()
+
+_reranker = None
+_reranker_failed = False
+
+
+# -------------------------------------------------------------
+# 🧭 Candidate retrievers
+# -------------------------------------------------------------
+def _vector_ranked(subject_id, query, query_embedding, k):
+    """[(doc_id, Document)] from the subject's Chroma store, best first."""
+    collection = get_vector_store(subject_id)._collection
+    if query_embedding is None:
+        try:
+            query_embedding = get_embeddings().embed_query(query)
+        except Exception as e:
+            logger.warning("⚠️ Query embedding failed, using lexical results only: %s", e)
+            return []
+    result = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=k,
+        include=["documents", "metadatas"],
+    )
+    return [
+        (doc_id, Document(page_content=text, metadata=meta or {}))
+        for doc_id, text, meta in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+    ]
+
+
+def _lexical_ranked(subject_id, query, k):
+    """[doc_id] from the subject's BM25 index, best first."""
+    try:
+        return [doc_id for doc_id, _ in lexical_index.search(subject_id, query, k)]
+    except Exception as e:
+        logger.warning("⚠️ Lexical search failed: %s", e)
+        return []
+
+
+def _ensure_lexical_index(subject_id):
+    """
+    Queue a (re)build when the BM25 index lags the vector store, e.g. for
+    older subjects. Ingestion keeps the index current, so this runs at most
+    once per LEXICAL_CHECK_INTERVAL per subject rather than on every query.
+    """
+    now = time.monotonic()
+    with _lexical_checked_lock:
+        if now - _lexical_checked.get(subject_id, float("-inf")) < LEXICAL_CHECK_INTERVAL:
+            return
+        _lexical_checked[subject_id] = now
+    try:
+        behind = lexical_index.document_count(subject_id) < get_vector_store(subject_id)._collection.count()
+        if behind and not has_pending_job(LEXICAL_BUILD_JOB, subject_id):
+            enqueue(LEXICAL_BUILD_JOB, {"subject_id": subject_id}, subject_id=subject_id)
+    except Exception as e:
+        logger.warning("⚠️ Lexical index check failed: %s", e)
+
+
+@register_handler(LEXICAL_BUILD_JOB)
+def build_lexical_index(payload):
+    """Index every chunk already in the subject's vector store."""
+    subject_id = payload["subject_id"]
+    indexed = rebuild_lexical_index(subject_id, batch_size=_LEXICAL_BUILD_BATCH)
+    logger.info("🔤 Lexical index of subject %s: %s chunks", subject_id, indexed)
+    return indexed
+
+
+# -------------------------------------------------------------
+# ⚖️ Fusion + reranking
+# -------------------------------------------------------------
+def _rrf(*rankings):
+    """Reciprocal rank fusion of several doc id rankings."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_K + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _get_reranker():
+    global _reranker, _reranker_failed
+    if RERANKER_MODEL is None or _reranker_failed:
+        return None
+    if _reranker is None:
+        try:
+            from sentence_transformers import CrossEncoder
+            _reranker = CrossEncoder(RERANKER_MODEL, device="cpu")
+        except Exception as e:
+            logger.warning("⚠️ Reranker unavailable (%s); using fused order", e)
+            _reranker_failed = True
+            return None
+    return _reranker
+
+
+def _rerank(query, docs):
+    reranker = _get_reranker()
+    if reranker is None or len(docs) < 2:
+        return docs
+    scores = reranker.predict([(query, d.page_content) for d in docs])
+    return [d for _, d in sorted(zip(scores, docs), key=lambda p: p[0], reverse=True)]
+
+
+def hybrid_search(query, subject_id, k=CONTEXT_K, query_embedding=None):
+    """Top k Documents for a query from vector and BM25 retrieval combined."""
+    _ensure_lexical_index(subject_id)
+    with span("vector_search"):
+        vector_hits = _vector_ranked(subject_id, query, query_embedding, VECTOR_CANDIDATES)
+    with span("lexical_search"):
+        lexical_ids = _lexical_ranked(subject_id, query, LEXICAL_CANDIDATES)
+
+    docs_by_id = dict(vector_hits)
+    fused = _rrf([doc_id for doc_id, _ in vector_hits], lexical_ids)
+    candidates = fused[:max(k, VECTOR_CANDIDATES if RERANKER_MODEL else k)]
+
+    lexical_only = [doc_id for doc_id in candidates if doc_id not in docs_by_id]
+    if lexical_only:
+        with span("fetch_chunks"):
+            for c in get_chunks(subject_id, ids=lexical_only):
+                docs_by_id[c["id"]] = Document(page_content=c["text"], metadata=c["metadata"])
+
+    docs = [docs_by_id[doc_id] for doc_id in candidates if doc_id in docs_by_id]
+    if RERANKER_MODEL is None:
+        return docs[:k]
+    with span("rerank"):
+        return _rerank(query, docs)[:k]
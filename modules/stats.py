@@ -0,0 +1,73 @@
+# ==============================================================
+# 📊 STATS MODULE — StudyBuddy AI
+# Per-subject quiz statistics shared by the dashboards
+# ==============================================================
+
+from datetime import datetime
+from database.connection import get_db_connection
+
+
+def get_subject_stats(user_id):
+    """
+    Correct/wrong/attempt counts and accuracy for every subject of a user,
+    read from the subject_stats rollup (one row per subject).
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT
+                s.subject_id,
+                s.subject_name,
+                COALESCE(st.correct, 0) AS correct,
+                COALESCE(st.wrong, 0) AS wrong,
+                COALESCE(st.attempts, 0) AS attempts,
+                st.accuracy_sum / NULLIF(st.attempts, 0) AS avg_accuracy,
+                st.last_attempt_at
+            FROM subjects s
+            LEFT JOIN subject_stats st
+                ON st.user_id = %s AND st.subject_id = s.subject_id
+            WHERE s.user_id = %s
+            ORDER BY s.subject_id
+        """, (user_id, user_id))
+        rows = cursor.fetchall()
+
+    stats = []
+    for row in rows:
+        correct = int(row["correct"] or 0)
+        wrong = int(row["wrong"] or 0)
+        answered = correct + wrong
+        stats.append({
+            "subject_id": row["subject_id"],
+            "subject_name": row["subject_name"],
+            "correct": correct,
+            "wrong": wrong,
+            "attempts": int(row["attempts"] or 0),
+            "success_rate": round(correct / answered * 100, 1) if answered > 0 else 0,
+            "avg_accuracy": float(row["avg_accuracy"]) if row["avg_accuracy"] is not None else None,
+            "last_attempt_at": row["last_attempt_at"],
+        })
+    return stats
+
+
+def record_quiz_attempt(cursor, user_id, subject_id, score, total, accuracy):
+    """
+    Add one quiz attempt to the subject_stats rollup and return the new
+    average accuracy. Runs on the caller's cursor so it shares the
+    transaction of the quiz_scores insert; cost does not grow with history.
+    """
+    cursor.execute("""
+        INSERT INTO subject_stats (user_id, subject_id, correct, wrong, attempts, accuracy_sum, last_attempt_at)
+        VALUES (%s, %s, %s, %s, 1, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            correct = correct + VALUES(correct),
+            wrong = wrong + VALUES(wrong),
+            attempts = attempts + 1,
+            accuracy_sum = accuracy_sum + VALUES(accuracy_sum),
+            last_attempt_at = VALUES(last_attempt_at)
+    """, (user_id, subject_id, score, total - score, accuracy, datetime.now()))
+    cursor.execute(
+        "SELECT accuracy_sum / attempts AS avg_acc FROM subject_stats WHERE user_id=%s AND subject_id=%s",
+        (user_id, subject_id),
+    )
+    row = cursor.fetchone()
+    return float(row["avg_acc"] or 0) if row else 0.0
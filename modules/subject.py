@@ -1,5 +1,9 @@
+import logging
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from database.connection import get_db_connection
+from modules.cleanup import purge_subject
+
+logger = logging.getLogger(__name__)
 
 subject_bp = Blueprint('subject', __name__, url_prefix='/subjects')
 
@@ -11,11 +15,10 @@ def subjects():
         return redirect(url_for('login'))
     
     user_id = session.get('user_id')
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM subjects WHERE user_id = %s", (user_id,))
-    subjects = cursor.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM subjects WHERE user_id = %s", (user_id,))
+        subjects = cursor.fetchall()
 
     return render_template('subjects.html', subjects=subjects)
 
@@ -30,14 +33,13 @@ def add_subject():
     description = request.form.get('description', '')
     user_id = session.get('user_id')
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO subjects (user_id, subject_name, description) VALUES (%s, %s, %s)",
-        (user_id, subject_name, description)
-    )
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO subjects (user_id, subject_name, description) VALUES (%s, %s, %s)",
+            (user_id, subject_name, description)
+        )
+        conn.commit()
 
     flash("✅ Subject added successfully!", "success")
     return redirect(url_for('subject.subjects'))
@@ -52,14 +54,13 @@ def edit_subject(subject_id):
     subject_name = request.form['subject_name']
     description = request.form.get('description', '')
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE subjects SET subject_name=%s, description=%s WHERE subject_id=%s",
-        (subject_name, description, subject_id)
-    )
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE subjects SET subject_name=%s, description=%s WHERE subject_id=%s",
+            (subject_name, description, subject_id)
+        )
+        conn.commit()
 
     flash("✏️ Subject updated successfully!", "success")
     return redirect(url_for('subject.subjects'))
@@ -71,11 +72,17 @@ def delete_subject(subject_id):
         flash("Please login first.", "warning")
         return redirect(url_for('login'))
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM subjects WHERE subject_id = %s", (subject_id,))
-    conn.commit()
-    conn.close()
+    try:
+        purge_subject(subject_id)
+    except Exception as e:
+        logger.error("❌ ERROR purging subject: %s", e)
+        flash(f"❌ Could not remove the subject's data: {e}", "danger")
+        return redirect(url_for('subject.subjects'))
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM subjects WHERE subject_id = %s", (subject_id,))
+        conn.commit()
 
     flash("🗑️ Subject deleted successfully!", "info")
     return redirect(url_for('subject.subjects'))
@@ -2,78 +2,798 @@
 # 🧠 VECTOR STORE MODULE — StudyBuddy AI (LangChain v1.0+ & Ollama)
 # ==============================================================
 
+import itertools
+import logging
 import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
 from langchain_community.vectorstores import Chroma
 from langchain_ollama import OllamaEmbeddings  # ✅ Updated import — new official embedding class
+from modules.chunking import chunk_pages, iter_file_pages, CHUNK_SIZE, CHUNK_OVERLAP
+from modules.answer_cache import answer_cache
+from modules.embedding_cache import CachedEmbeddings
+from modules.dedup import chunk_sha256, find_chunk_vectors, record_file_chunks, delete_file_chunks
+from modules import lexical_index
+from modules.compact_store import CompactStore, CompactCollection, is_compact_store, META_FILE as COMPACT_META_FILE
+from modules.metrics import span
 
-# ✅ Use a supported embedding model (works locally with Ollama)
-EMBED_MODEL = "nomic-embed-text"
+try:
+    import fcntl  # POSIX only: serializes store writes across worker processes
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ✅ Use a supported embedding model (works locally with Ollama).
+# Existing stores must be re-embedded when it changes: `manage_indexes.py migrate`.
+EMBED_MODEL = os.environ.get("STUDYBUDDY_EMBED_MODEL", "nomic-embed-text")
+
+# Number of chunks sent to the embedding model per request
+EMBED_BATCH_SIZE = 64
+
+# Larger batches for bulk uploads (fewer embedding requests and store writes)
+BULK_EMBED_BATCH_SIZE = 256
 
 # Base directory for all vector databases
 VECTOR_DB_DIR = os.path.join("vector_dbs")
 os.makedirs(VECTOR_DB_DIR, exist_ok=True)
 
+# Backend for new (and compacted) subject stores: "chroma" (float32 HNSW)
+# or "compact" (NumPy memmap, int8/float16 — see modules/compact_store.py).
+# Existing stores are opened with whatever backend wrote them.
+VECTOR_BACKEND = os.environ.get("STUDYBUDDY_VECTOR_BACKEND", "chroma")
+
+# Maximum number of subject stores kept open at once (each holds SQLite + HNSW files)
+MAX_OPEN_STORES = 16
+
+# Vectors copied per request when a store is rebuilt by compaction
+COMPACT_BATCH_SIZE = 1000
+
+# Suffix of the side-by-side store a migration fills before swapping it in
+STAGED_SUFFIX = ".migrate"
+
+_embeddings = None
+_stores = OrderedDict()  # subject_id -> (Chroma, sqlite mtime seen at open/last write)
+_writers = {}  # subject_id -> number of in-process writes in progress
+_subject_locks = {}  # subject_id -> Lock serializing writes to that store
+_open_locks = {}  # subject_id -> Lock held while that store is being opened
+_generations = {}  # subject_id -> bumped whenever a cached handle is dropped
+_stores_lock = threading.RLock()
+
+
+# -------------------------------------------------------------
+# ♻️ Shared embedding client + open store registry
+# -------------------------------------------------------------
+def get_embeddings():
+    """Return the process-wide embedding client (behind the on-disk embedding cache)."""
+    global _embeddings
+    if _embeddings is None:
+        with _stores_lock:
+            if _embeddings is None:
+                _embeddings = CachedEmbeddings(OllamaEmbeddings(model=EMBED_MODEL), EMBED_MODEL)
+    return _embeddings
+
+
+def embedding_cache_stats():
+    """Hits, misses and entries of the embedding cache (None before first use)."""
+    embeddings = _embeddings
+    return embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
+
+
+def _subject_db_dir(subject_id):
+    return os.path.join(VECTOR_DB_DIR, f"subject_{subject_id}")
+
+
+def _store_mtime(subject_db_dir):
+    for name in ("chroma.sqlite3", COMPACT_META_FILE):
+        try:
+            return os.path.getmtime(os.path.join(subject_db_dir, name))
+        except OSError:
+            continue
+    return None
+
+
+def _store_backend(subject_db_dir):
+    """"chroma" or "compact" for an existing store directory, else None."""
+    if os.path.exists(os.path.join(subject_db_dir, "chroma.sqlite3")):
+        return "chroma"
+    if is_compact_store(subject_db_dir):
+        return "compact"
+    return None
+
+
+def _new_store(subject_db_dir, backend=None):
+    """Open (or create) a store directory with the backend that wrote it."""
+    if backend is None:
+        backend = _store_backend(subject_db_dir) or VECTOR_BACKEND
+    if backend == "compact":
+        return CompactStore(persist_directory=subject_db_dir, embedding_function=get_embeddings())
+    return Chroma(persist_directory=subject_db_dir, embedding_function=get_embeddings())
+
+
+def _close_store(db):
+    """Release the SQLite/HNSW (or memmap) handles held by a store."""
+    if isinstance(db, CompactStore):
+        db.close()
+        return
+    client = getattr(db, "_client", None)
+    system = getattr(client, "_system", None)
+    if system is None:
+        return
+    try:
+        system.stop()
+    except Exception as e:
+        logger.warning("⚠️ Could not close vector store cleanly: %s", e)
+        return
+    # chromadb caches one system per path; drop it so a reopen reads from disk.
+    # The cache is private (and misspelled) in the pinned chromadb version, so
+    # look it up defensively and fall back to clearing the whole (public) cache.
+    try:
+        from chromadb.api.client import SharedSystemClient
+    except ImportError:
+        return
+    systems = getattr(SharedSystemClient, "_identifer_to_system", None)
+    if systems is None:
+        systems = getattr(SharedSystemClient, "_identifier_to_system", None)
+    if isinstance(systems, dict):
+        systems.pop(getattr(system.settings, "persist_directory", None), None)
+    elif hasattr(SharedSystemClient, "clear_system_cache"):
+        logger.warning("⚠️ chromadb system cache not found; clearing all cached systems")
+        SharedSystemClient.clear_system_cache()
+
+
+def _cached_store(subject_id, subject_db_dir):
+    """The cached handle if it is still current (call with _stores_lock held)."""
+    entry = _stores.get(subject_id)
+    if entry is None:
+        return None
+    db, mtime = entry
+    if subject_id in _writers or _store_mtime(subject_db_dir) == mtime:
+        _stores.move_to_end(subject_id)
+        return db
+    # store changed on disk underneath us
+    del _stores[subject_id]
+    _close_store(db)
+    return None
+
+
+def _forget_store(subject_id):
+    """Drop the cached handle (returned for closing) and void opens still in flight."""
+    with _stores_lock:
+        _generations[subject_id] = _generations.get(subject_id, 0) + 1
+        entry = _stores.pop(subject_id, None)
+    return entry[0] if entry is not None else None
+
+
+def _open_store(subject_id, create=False):
+    """
+    Return a cached Chroma handle for the subject, opening it if needed.
+    Handles are reopened when another process has written to the store
+    and the least recently used handle is closed beyond MAX_OPEN_STORES.
+    Different subjects are opened concurrently (e.g. by global search).
+    """
+    subject_db_dir = _subject_db_dir(subject_id)
+    while True:
+        with _stores_lock:
+            db = _cached_store(subject_id, subject_db_dir)
+            if db is not None:
+                return db
+            open_lock = _open_locks.setdefault(subject_id, threading.Lock())
+
+        with open_lock:
+            with _stores_lock:
+                db = _cached_store(subject_id, subject_db_dir)  # opened by another thread meanwhile
+                if db is not None:
+                    return db
+                generation = _generations.get(subject_id, 0)
+
+            if not os.path.exists(subject_db_dir):
+                if not create:
+                    raise FileNotFoundError(
+                        f"Vector DB for subject {subject_id} not found at {subject_db_dir}"
+                    )
+                os.makedirs(subject_db_dir, exist_ok=True)
+
+            # loading a store can take a while: only this subject waits for it
+            with span("vector_store_open"):
+                db = _new_store(subject_db_dir)
+
+            with _stores_lock:
+                if _generations.get(subject_id, 0) == generation:
+                    _stores[subject_id] = (db, _store_mtime(subject_db_dir))
+                    for old_id in list(_stores):
+                        if len(_stores) <= MAX_OPEN_STORES:
+                            break
+                        if old_id == subject_id or old_id in _writers:
+                            continue
+                        old_db, _ = _stores.pop(old_id)
+                        _close_store(old_db)
+                    logger.info("✅ Opened vector store for subject %s", subject_id)
+                    return db
+            # deleted or rebuilt while we were opening it: open again
+            _close_store(db)
+
+
+def _begin_write(subject_id):
+    with _stores_lock:
+        _writers[subject_id] = _writers.get(subject_id, 0) + 1
+
+
+def _end_write(subject_id):
+    """Record our own write so the cached handle is not treated as stale."""
+    with _stores_lock:
+        _writers[subject_id] -= 1
+        if not _writers[subject_id]:
+            del _writers[subject_id]
+        entry = _stores.get(subject_id)
+        if entry is not None:
+            _stores[subject_id] = (entry[0], _store_mtime(_subject_db_dir(subject_id)))
+
+
+@contextmanager
+def _subject_lock(subject_id):
+    """Serialize writes to one subject store across threads and (on POSIX) processes."""
+    with _stores_lock:
+        lock = _subject_locks.setdefault(subject_id, threading.Lock())
+    with lock:
+        with open(os.path.join(VECTOR_DB_DIR, f"subject_{subject_id}.lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+def invalidate_vector_store(subject_id):
+    """Close and forget the cached handle for a subject (after delete/rebuild)."""
+    db = _forget_store(subject_id)
+    if db is not None:
+        _close_store(db)
+    answer_cache.invalidate_subject(subject_id)
+
 
 # -------------------------------------------------------------
 # 🧠 Add a text file into the vector database for a specific subject
 # -------------------------------------------------------------
-def add_text_file_to_vector_db(text_file_path, subject_id):
-    """Add extracted text into a Chroma vector store for a specific subject."""
+def _iter_batches(chunks, size=EMBED_BATCH_SIZE):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _reuse_embeddings(chunk_hashes):
+    """
+    Look up chunks that were already embedded (in any subject) and fetch
+    their vectors from the owning stores. Returns {chunk_hash: embedding}.
+    Compact stores only hold quantized vectors, so they are not used as
+    sources; those chunks are embedded again (or come from the cache).
+    """
+    found = {}
     try:
-        with open(text_file_path, "r", encoding="utf-8") as f:
-            text_data = f.read()
+        known = find_chunk_vectors(chunk_hashes)
+    except Exception as e:
+        logger.warning("⚠️ Embedding reuse lookup failed: %s", e)
+        return found
 
-        if not text_data.strip():
-            print(f"⚠️ Empty text file: {text_file_path}")
-            return 0
+    by_subject = {}
+    for h, (sid, vector_id) in known.items():
+        by_subject.setdefault(sid, {})[vector_id] = h
+    for sid, id_to_hash in by_subject.items():
+        if _store_backend(_subject_db_dir(sid)) == "compact":
+            continue
+        try:
+            store = _open_store(sid)
+            result = store._collection.get(ids=list(id_to_hash), include=["embeddings"])
+        except Exception as e:
+            logger.warning("⚠️ Could not reuse embeddings from subject %s: %s", sid, e)
+            continue
+        for vector_id, embedding in zip(result["ids"], result["embeddings"]):
+            found[id_to_hash[vector_id]] = list(embedding)
+    return found
 
-        # ✅ Initialize embeddings with the new class
-        embeddings = OllamaEmbeddings(model=EMBED_MODEL)
 
-        # Folder for this subject’s vector store
-        subject_db_dir = os.path.join(VECTOR_DB_DIR, f"subject_{subject_id}")
-        os.makedirs(subject_db_dir, exist_ok=True)
+def _tag_chunks(chunks, file_id, source):
+    """Attach the owning file, its source name and the per-file chunk index to each chunk."""
+    for i, chunk in enumerate(chunks):
+        yield dict(chunk, file_id=file_id, source=source, chunk_index=i)
 
-        # Create Chroma vector store and persist
-        db = Chroma.from_texts(
-            [text_data],
-            embedding=embeddings,
-            persist_directory=subject_db_dir
-        )
+
+def _chunk_records(batch, subject_id):
+    """(ids, texts, content hashes, metadatas) of a batch of tagged chunks."""
+    texts = [c["text"] for c in batch]
+    hashes = [chunk_sha256(t) for t in texts]
+    metadatas = [
+        {
+            "subject_id": subject_id,
+            "file_id": c["file_id"] if c["file_id"] is not None else -1,
+            "source": c["source"],
+            "chunk_index": c["chunk_index"],
+            "page": c["page"],
+            "offset": c["offset"],
+            "chunk_hash": h,
+        }
+        for c, h in zip(batch, hashes)
+    ]
+    ids = [
+        f"{c['file_id']}-{c['chunk_index']}" if c["file_id"] is not None else str(uuid.uuid4())
+        for c in batch
+    ]
+    return ids, texts, hashes, metadatas
+
+
+def _add_chunks(db, chunks, subject_id, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embed and store an iterable of tagged chunks (see _tag_chunks) in
+    batches, which may span several files. Chunks whose content hash was
+    embedded before reuse that vector instead of calling Ollama.
+    Returns {file_id: chunk count}.
+    """
+    counts = {}
+    for batch in _iter_batches(chunks, batch_size):
+        ids, texts, hashes, metadatas = _chunk_records(batch, subject_id)
+        vectors = {}
+        reusable = {h for c, h in zip(batch, hashes) if c["file_id"] is not None}
+        if reusable:
+            with span("embedding_reuse"):
+                vectors = _reuse_embeddings(reusable)
+
+        missing = {h: t for h, t in zip(hashes, texts) if h not in vectors}
+        reused = sum(1 for h in hashes if h not in missing)
+        if missing:
+            with span("embed_documents"):
+                embedded = get_embeddings().embed_documents(list(missing.values()))
+            vectors.update(zip(missing.keys(), embedded))
+
+        with span("vector_write"):
+            db._collection.upsert(
+                ids=ids,
+                embeddings=[vectors[h] for h in hashes],
+                metadatas=metadatas,
+                documents=texts,
+            )
+        with span("lexical_write"):
+            lexical_index.add_documents(subject_id, [
+                (vid, m["file_id"], t) for vid, m, t in zip(ids, metadatas, texts)
+            ])
+
+        file_rows = {}
+        for c, h, vid in zip(batch, hashes, ids):
+            counts[c["file_id"]] = counts.get(c["file_id"], 0) + 1
+            if c["file_id"] is not None:
+                file_rows.setdefault(c["file_id"], []).append((c["chunk_index"], h, vid))
+        for file_id, rows in file_rows.items():
+            record_file_chunks(file_id, subject_id, rows)
+        logger.info("🧩 Batch of %s chunks: %s reused, %s embedded", len(batch), reused, len(missing))
+    if counts:
         db.persist()
+    return counts
+
+
+def _write_chunks(subject_id, chunks, batch_size):
+    """Add tagged chunks to the subject's store under its write lock."""
+    with _subject_lock(subject_id):
+        _begin_write(subject_id)
+        try:
+            db = _open_store(subject_id, create=True)
+            return _add_chunks(db, chunks, subject_id, batch_size)
+        finally:
+            _end_write(subject_id)
+
+
+def add_text_file_to_vector_db(text_file_path, subject_id, file_id=None,
+                               chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                               raise_errors=False):
+    """
+    Chunk an extracted text file and add it to the subject's Chroma store.
+    Each chunk carries file id, page and character offset metadata and
+    chunks are embedded in batches of EMBED_BATCH_SIZE.
+    Returns the number of chunks indexed (errors are re-raised when
+    raise_errors is set, e.g. so background jobs can retry).
+    """
+    try:
+        # pages are read and chunked lazily, so large notes never sit in memory whole
+        chunks = chunk_pages(iter_file_pages(text_file_path), chunk_size, chunk_overlap)
+        tagged = _tag_chunks(chunks, file_id, os.path.basename(text_file_path))
+        count = sum(_write_chunks(subject_id, tagged, EMBED_BATCH_SIZE).values())
+
+        if not count:
+            logger.warning("⚠️ Empty text file: %s", text_file_path)
+            return 0
 
-        print(f"✅ Added text to vector DB for subject {subject_id}")
-        return 1
+        # cached chat answers no longer reflect the subject's notes
+        answer_cache.invalidate_subject(subject_id)
+
+        logger.info("✅ Added %s chunks to vector DB for subject %s", count, subject_id)
+        return count
 
     except Exception as e:
-        print(f"❌ Error adding to vector DB: {e}")
+        logger.error("❌ Error adding to vector DB: %s", e)
+        if raise_errors:
+            raise
         return 0
 
 
+def add_text_files_to_vector_db(files, subject_id, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                batch_size=BULK_EMBED_BATCH_SIZE, raise_errors=False):
+    """
+    Bulk form of add_text_file_to_vector_db for [(text_file_path, file_id)]:
+    the store is locked and opened once for all files, and their chunks are
+    embedded together in batches of batch_size.
+    Returns {file_id: chunks indexed}.
+    """
+    try:
+        tagged = itertools.chain.from_iterable(
+            _tag_chunks(chunk_pages(iter_file_pages(path), chunk_size, chunk_overlap),
+                        file_id, os.path.basename(path))
+            for path, file_id in files
+        )
+        counts = _write_chunks(subject_id, tagged, batch_size)
+        total = sum(counts.values())
+        if total:
+            answer_cache.invalidate_subject(subject_id)
+        logger.info("✅ Added %s chunks from %s files to vector DB for subject %s",
+                    total, len(files), subject_id)
+        return {file_id: counts.get(file_id, 0) for _, file_id in files}
+
+    except Exception as e:
+        logger.error("❌ Error adding files to vector DB: %s", e)
+        if raise_errors:
+            raise
+        return {file_id: 0 for _, file_id in files}
+
+
 # -------------------------------------------------------------
-# 🔍 Retrieve the vector store for a given subject
+# 🗑 Deletion and compaction
 # -------------------------------------------------------------
-def get_vector_store(subject_id):
-    """Load an existing Chroma vector store for the given subject."""
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def delete_vectors(subject_id, ids=None, file_id=None):
+    """
+    Remove vectors from a subject's store, by vector id and/or by the
+    file_id metadata every chunk of an uploaded file carries.
+    Returns the number of vectors removed.
+    """
+    if not os.path.exists(_subject_db_dir(subject_id)):
+        return 0
+    with _subject_lock(subject_id):
+        _begin_write(subject_id)
+        try:
+            db = _open_store(subject_id)
+            collection = db._collection
+            before = collection.count()
+            if ids:
+                collection.delete(ids=list(ids))
+            if file_id is not None:
+                collection.delete(where={"file_id": file_id})
+            removed = before - collection.count()
+            if removed:
+                db.persist()
+            lexical_index.remove_documents(subject_id, doc_ids=ids, file_id=file_id)
+        finally:
+            _end_write(subject_id)
+
+    answer_cache.invalidate_subject(subject_id)
+    logger.info("🗑 Removed %s vectors from subject %s", removed, subject_id)
+    return removed
+
+
+def drop_vector_store(subject_id):
+    """Close and delete a subject's whole store from disk."""
+    subject_db_dir = _subject_db_dir(subject_id)
+    with _subject_lock(subject_id):
+        invalidate_vector_store(subject_id)
+        shutil.rmtree(subject_db_dir, ignore_errors=True)
+        lexical_index.drop_index(subject_id)
     try:
-        subject_db_dir = os.path.join(VECTOR_DB_DIR, f"subject_{subject_id}")
+        os.remove(os.path.join(VECTOR_DB_DIR, f"subject_{subject_id}.lock"))
+    except OSError:
+        pass
+    logger.info("🗑 Dropped vector store of subject %s", subject_id)
 
-        if not os.path.exists(subject_db_dir):
-            raise FileNotFoundError(
-                f"Vector DB for subject {subject_id} not found at {subject_db_dir}"
-            )
 
-        # ✅ Use the updated embedding function
-        embeddings = OllamaEmbeddings(model=EMBED_MODEL)
+def _replace_store_dir(subject_id, new_dir):
+    """Swap a rebuilt store directory in for the subject's store (caller holds the subject lock)."""
+    subject_db_dir = _subject_db_dir(subject_id)
+    # the old handle is closed first
+    db = _forget_store(subject_id)
+    if db is not None:
+        _close_store(db)
+    old_dir = subject_db_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(subject_db_dir):
+        os.replace(subject_db_dir, old_dir)
+    os.replace(new_dir, subject_db_dir)
+    reopened = _forget_store(subject_id)  # the old directory may have been reopened meanwhile
+    if reopened is not None:
+        _close_store(reopened)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
 
-        # Load the stored Chroma DB
-        db = Chroma(
-            persist_directory=subject_db_dir,
-            embedding_function=embeddings
+def compact_vector_store(subject_id):
+    """
+    Rebuild a subject's store from its live vectors so deleted entries no
+    longer take space, writing it with VECTOR_BACKEND (this is also how a
+    subject moves between Chroma and the compact store). Returns the vector count.
+    """
+    subject_db_dir = _subject_db_dir(subject_id)
+    if not os.path.exists(subject_db_dir):
+        return 0
+
+    with _subject_lock(subject_id):
+        size_before = _dir_size(subject_db_dir)
+        data = _open_store(subject_id)._collection.get(
+            include=["embeddings", "metadatas", "documents"]
         )
-        print(f"✅ Loaded vector store for subject {subject_id}")
-        return db
+        ids = data["ids"]
+        if not ids:
+            invalidate_vector_store(subject_id)
+            shutil.rmtree(subject_db_dir, ignore_errors=True)
+            lexical_index.drop_index(subject_id)
+            logger.info("🗜️ Subject %s store was empty and has been removed", subject_id)
+            return 0
+
+        compact_dir = subject_db_dir + ".compact"
+        shutil.rmtree(compact_dir, ignore_errors=True)
+        # rebuilt with the configured backend, so compaction also migrates stores
+        new_db = _new_store(compact_dir, VECTOR_BACKEND)
+        for start in range(0, len(ids), COMPACT_BATCH_SIZE):
+            end = start + COMPACT_BATCH_SIZE
+            new_db._collection.upsert(
+                ids=ids[start:end],
+                embeddings=[list(e) for e in data["embeddings"][start:end]],
+                metadatas=data["metadatas"][start:end],
+                documents=data["documents"][start:end],
+            )
+        new_db.persist()
+        if isinstance(new_db, CompactStore):
+            new_db._collection.build_ivf()
+        _close_store(new_db)
+
+        _replace_store_dir(subject_id, compact_dir)
+        lexical_index.compact_index(subject_id)
+
+    size_after = _dir_size(subject_db_dir)
+    logger.info("🗜️ Compacted subject %s store: %d vectors, %.1f MB → %.1f MB",
+                subject_id, len(ids), size_before / 1e6, size_after / 1e6)
+    return len(ids)
+
+
+# -------------------------------------------------------------
+# 🔍 Retrieve the vector store for a given subject
+# -------------------------------------------------------------
+def get_vector_store(subject_id):
+    """Return the (cached) Chroma vector store for the given subject."""
+    try:
+        return _open_store(subject_id)
 
     except Exception as e:
-        print(f"❌ Error loading vector store: {e}")
+        logger.error("❌ Error loading vector store: %s", e)
         raise
+
+
+def get_chunks(subject_id, ids=None, limit=None, offset=None):
+    """
+    Stored chunks of a subject as dicts with id, text and metadata,
+    either by vector id or as a limit/offset slice of the collection.
+    """
+    if not os.path.exists(_subject_db_dir(subject_id)):
+        return []
+    collection = _open_store(subject_id)._collection
+    if ids is not None:
+        result = collection.get(ids=list(ids), include=["documents", "metadatas"])
+    else:
+        result = collection.get(limit=limit, offset=offset, include=["documents", "metadatas"])
+    return [
+        {"id": vid, "text": text, "metadata": meta or {}}
+        for vid, text, meta in zip(result["ids"], result["documents"], result["metadatas"])
+    ]
+
+
+def count_chunks(subject_id):
+    """Number of chunks stored for a subject."""
+    if not os.path.exists(_subject_db_dir(subject_id)):
+        return 0
+    return _open_store(subject_id)._collection.count()
+
+
+def rebuild_lexical_index(subject_id, batch_size=COMPACT_BATCH_SIZE):
+    """
+    Rebuild a subject's BM25 index from its stored chunks. Holds the subject
+    lock so a concurrent delete can't leave postings for removed vectors.
+    Returns the number of chunks indexed.
+    """
+    with _subject_lock(subject_id):
+        lexical_index.drop_index(subject_id)
+        if not os.path.exists(_subject_db_dir(subject_id)):
+            return 0
+        collection = _open_store(subject_id)._collection
+        indexed = 0
+        while True:
+            result = collection.get(limit=batch_size, offset=indexed, include=["documents", "metadatas"])
+            if not result["ids"]:
+                break
+            lexical_index.add_documents(subject_id, [
+                (vid, (meta or {}).get("file_id"), text)
+                for vid, meta, text in zip(result["ids"], result["metadatas"], result["documents"])
+            ])
+            indexed += len(result["ids"])
+    return indexed
+
+
+def search_subject(subject_id, query_embedding, k):
+    """
+    Top k chunks of a subject for an embedded query, as dicts with id, text,
+    metadata and score = cosine similarity, so scores from different stores
+    (Chroma or compact) can be compared and merged.
+    """
+    if not os.path.exists(_subject_db_dir(subject_id)):
+        return []
+    collection = _open_store(subject_id)._collection
+    if not collection.count():
+        return []
+    compact = isinstance(collection, CompactCollection)
+    result = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=k,
+        include=["documents", "metadatas", "distances" if compact else "embeddings"],
+    )
+    if compact:
+        # the compact store already ranks by cosine (distance = 1 - cosine)
+        scores = [1.0 - d for d in result["distances"][0]]
+    else:
+        # Chroma's distance depends on the collection's space: compute cosine directly
+        vectors = np.asarray(result["embeddings"][0], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        scores = (vectors @ query / np.maximum(norms, 1e-12)).tolist()
+    return [
+        {"id": vid, "text": text, "metadata": meta or {}, "score": float(score)}
+        for vid, text, meta, score in zip(result["ids"][0], result["documents"][0],
+                                          result["metadatas"][0], scores)
+    ]
+
+
+# -------------------------------------------------------------
+# 🛠️ Maintenance (used by manage_indexes.py)
+# -------------------------------------------------------------
+def list_store_subjects():
+    """Ids of the subjects that have a store directory."""
+    subject_ids = []
+    for name in os.listdir(VECTOR_DB_DIR):
+        suffix = name[len("subject_"):]
+        if name.startswith("subject_") and suffix.isdigit() and os.path.isdir(os.path.join(VECTOR_DB_DIR, name)):
+            subject_ids.append(int(suffix))
+    return sorted(subject_ids)
+
+
+def store_info(subject_id):
+    """Backend, bytes on disk and vector count of a subject's store (None without one)."""
+    subject_db_dir = _subject_db_dir(subject_id)
+    if not os.path.isdir(subject_db_dir):
+        return None
+    backend = _store_backend(subject_db_dir)
+    return {
+        "backend": backend,
+        "bytes": _dir_size(subject_db_dir),
+        "vectors": count_chunks(subject_id) if backend else 0,
+    }
+
+
+def vector_files(subject_id):
+    """{vector_id: file_id} of every chunk in a subject's store."""
+    if not os.path.exists(_subject_db_dir(subject_id)):
+        return {}
+    collection = _open_store(subject_id)._collection
+    owners = {}
+    offset = 0
+    while True:
+        result = collection.get(limit=COMPACT_BATCH_SIZE, offset=offset, include=["metadatas"])
+        if not result["ids"]:
+            break
+        for vid, meta in zip(result["ids"], result["metadatas"]):
+            owners[vid] = (meta or {}).get("file_id")
+        offset += COMPACT_BATCH_SIZE
+    return owners
+
+
+def staged_store_dir(subject_id):
+    return _subject_db_dir(subject_id) + STAGED_SUFFIX
+
+
+def stage_text_file(text_file_path, subject_id, file_id, batch_size=EMBED_BATCH_SIZE, on_batch=None):
+    """
+    Chunk and embed a text file into the subject's staged store with the
+    current EMBED_MODEL and chunking settings; the live store is untouched.
+    A file staged before is replaced. on_batch(n) runs after every batch
+    of n chunks (for throttling). Returns the number of chunks staged.
+    """
+    db = _new_store(staged_store_dir(subject_id))
+    try:
+        db._collection.delete(where={"file_id": file_id})
+        chunks = _tag_chunks(chunk_pages(iter_file_pages(text_file_path)), file_id,
+                             os.path.basename(text_file_path))
+        count = 0
+        for batch in _iter_batches(chunks, batch_size):
+            ids, texts, _, metadatas = _chunk_records(batch, subject_id)
+            with span("embed_documents"):
+                embeddings = get_embeddings().embed_documents(texts)
+            db._collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+            count += len(batch)
+            if on_batch is not None:
+                on_batch(len(batch))
+        db.persist()
+        return count
+    finally:
+        _close_store(db)
+
+
+def unstage_file(subject_id, file_id):
+    """Remove a file (e.g. deleted meanwhile) from the subject's staged store."""
+    staged_dir = staged_store_dir(subject_id)
+    if _store_backend(staged_dir) is None:
+        return
+    db = _new_store(staged_dir)
+    try:
+        db._collection.delete(where={"file_id": file_id})
+        db.persist()
+    finally:
+        _close_store(db)
+
+
+def drop_staged_store(subject_id):
+    shutil.rmtree(staged_store_dir(subject_id), ignore_errors=True)
+
+
+def swap_in_staged_store(subject_id):
+    """
+    Replace a subject's store with its staged one, then rebuild the BM25
+    index and the file_chunks records from the new vectors (their ids and
+    hashes change with the chunking). Returns the vector count.
+    """
+    staged_dir = staged_store_dir(subject_id)
+    with _subject_lock(subject_id):
+        db = _new_store(staged_dir)
+        try:
+            if isinstance(db, CompactStore):
+                db._collection.build_ivf()
+            count = db._collection.count()
+        finally:
+            _close_store(db)
+        _replace_store_dir(subject_id, staged_dir)
+
+        lexical_index.drop_index(subject_id)
+        delete_file_chunks(subject_id=subject_id)
+        collection = _open_store(subject_id)._collection
+        for offset in range(0, count, COMPACT_BATCH_SIZE):
+            result = collection.get(limit=COMPACT_BATCH_SIZE, offset=offset, include=["documents", "metadatas"])
+            metadatas = [meta or {} for meta in result["metadatas"]]
+            lexical_index.add_documents(subject_id, [
+                (vid, meta.get("file_id"), text)
+                for vid, meta, text in zip(result["ids"], metadatas, result["documents"])
+            ])
+            file_rows = {}
+            for vid, meta in zip(result["ids"], metadatas):
+                if meta.get("file_id", -1) >= 0:
+                    file_rows.setdefault(meta["file_id"], []).append((meta["chunk_index"], meta["chunk_hash"], vid))
+            for file_id, rows in file_rows.items():
+                record_file_chunks(file_id, subject_id, rows)
+
+    answer_cache.invalidate_subject(subject_id)
+    logger.info("🔁 Swapped in migrated store of subject %s (%s vectors)", subject_id, count)
+    return count
@@ -1,41 +1,130 @@
 # text_extraction.py
+import logging
+import multiprocessing
 import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pypdf import PdfReader
 from docx import Document
+from modules.chunking import PAGE_BREAK
 
-def extract_text(file_path):
-    """Extract text from PDF, DOCX, or TXT and save it to /processed_texts/"""
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# PDFs with more pages than this are parsed in parallel page ranges
+PARALLEL_PAGE_THRESHOLD = 40
+PAGES_PER_TASK = 20
+EXTRACT_PROCESSES = max(1, (os.cpu_count() or 2) - 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_extract_process():
+    """Set up an extraction process: plain stderr logging, Ctrl-C left to the parent."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the pool is started from threaded gunicorn workers and
+            # job threads, and a forked child can inherit locks held by other threads
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_PROCESSES,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_extract_process)
+        return _pool
+
+
+def _extract_pdf_range(file_path, start, end):
+    """Extract pages [start, end) of a PDF (runs in a worker process)."""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pages(file_path, parallel=True):
+    """
+    Yield the text of a PDF, DOCX or TXT file page by page.
+    DOCX and TXT files have no pages and are yielded as one page.
+    Large PDFs are parsed in the worker processes unless parallel is False.
+    """
     ext = os.path.splitext(file_path)[1].lower()
-    text = ""
 
     if ext == ".pdf":
         reader = PdfReader(file_path)
-        for page in reader.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
+        page_count = len(reader.pages)
+        if not parallel or page_count <= PARALLEL_PAGE_THRESHOLD:
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+
+        ranges = [(s, min(s + PAGES_PER_TASK, page_count)) for s in range(0, page_count, PAGES_PER_TASK)]
+        futures = [_get_pool().submit(_extract_pdf_range, file_path, s, e) for s, e in ranges]
+        for future in futures:  # in page order
+            yield from future.result()
 
     elif ext == ".docx":
         doc = Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        yield "\n".join(para.text for para in doc.paragraphs)
 
     elif ext == ".txt":
         with open(file_path, "r", encoding="utf8", errors="ignore") as f:
-            text = f.read()
+            yield f.read()
 
     else:
-        print(f"[!] Unsupported file format: {ext}")
+        raise ValueError(f"Unsupported file format: {ext}")
+
+
+def extract_text(file_path, output_path=None, parallel=True):
+    """Extract text from PDF, DOCX, or TXT and save it to output_path (default: /processed_texts/)"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        logger.warning("[!] Unsupported file format: %s", ext)
         return None
 
-    # Save processed text
-    processed_dir = os.path.join("static", "uploads", "processed_texts")
-    os.makedirs(processed_dir, exist_ok=True)
-    output_path = os.path.join(
-        processed_dir, os.path.basename(file_path).replace(ext, ".txt")
-    )
+    # Save processed text, page by page (pages separated by PAGE_BREAK)
+    if output_path is None:
+        processed_dir = os.path.join("static", "uploads", "processed_texts")
+        os.makedirs(processed_dir, exist_ok=True)
+        output_path = os.path.join(
+            processed_dir, os.path.basename(file_path).replace(ext, ".txt")
+        )
 
-    with open(output_path, "w", encoding="utf8") as out:
-        out.write(text.strip())
+    # plain "\n" newlines keep character and byte offsets of the file in step
+    with open(output_path, "w", encoding="utf8", newline="\n") as out:
+        for i, page_text in enumerate(iter_pages(file_path, parallel)):
+            if i:
+                out.write(PAGE_BREAK)
+            out.write(page_text.replace("\r\n", "\n").replace("\r", "\n"))
 
-    print(f"[+] Text extracted → {output_path}")
+    logger.info("[+] Text extracted → %s", output_path)
     return output_path
+
+
+def _extract_file(file_path, output_path):
+    """Extract one whole file (runs in a worker process)."""
+    return extract_text(file_path, output_path, parallel=False)
+
+
+def extract_texts(files):
+    """
+    Extract several files at once, one per worker process.
+    files is [(file_path, output_path)]; yields (file_path, output_path, error)
+    as each finishes, with output_path None when extraction failed.
+    """
+    futures = {_get_pool().submit(_extract_file, src, dest): src for src, dest in files}
+    for future in as_completed(futures):
+        file_path = futures[future]
+        try:
+            output_path = future.result()
+        except Exception as e:
+            yield file_path, None, e
+            continue
+        if output_path is None:
+            yield file_path, None, ValueError(f"Unsupported file format: {file_path}")
+        else:
+            yield file_path, output_path, None